@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import heapq
 from datetime import date,timedelta
 import matplotlib
 matplotlib.use("Agg")
@@ -7,7 +8,33 @@ import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import streamlit as st
 from sklearn.linear_model import LinearRegression
-from db import df_query
+from sqlalchemy import text
+from db import df_query,df_query_typed,compact_frame
+from tracing import span,traced
+from forecasting import get_forecast
+from rollup import PERIOD_TABLES
+from metrics_store import STORE
+
+
+PLATFORM_COLS=["youtube_views","spotify_streams","soundcloud_plays"]
+# (해상도,한 포인트가 덮는 대략의 일수): 세밀한 것부터. 주·월은 rollup.py가 동기화 때 갱신하는 집계 테이블에서 읽음
+RESOLUTIONS=[("day",1),("week",7),("month",30)]
+MAX_POINTS=400
+
+
+def _as_numeric(s):
+    # df_query_typed로 읽은 열은 이미 결측 없는 정수형이므로 변환·복사를 건너뜀
+    if pd.api.types.is_integer_dtype(s):
+        return s
+    return pd.to_numeric(s,errors="coerce").fillna(0)
+
+
+def load_catalog_daily_metrics():
+    # 배치 분석용 전체 카탈로그: 아티스트 이름은 category, 수치는 축소된 정수형
+    return df_query_typed(
+        "SELECT a.name AS artist,m.artist_id,m.date,m.youtube_views,m.spotify_streams,m.soundcloud_plays FROM daily_metrics m JOIN artists a ON a.id=m.artist_id ORDER BY m.artist_id,m.date;",
+        categories=("artist",),numeric=PLATFORM_COLS,fill=0
+    )
 
 
 def set_font():
@@ -22,12 +49,22 @@ def set_font():
     plt.rcParams["axes.unicode_minus"]=False
 
 
-def plot_artist_growth_matplotlib(artist_name,pg_engine):
-    query=f"SELECT metric_type,date,SUM(value) as total_value FROM artist_growth_data WHERE artist_name='{artist_name}' AND date<CURRENT_DATE GROUP BY metric_type,date ORDER BY date ASC"
-    df=pd.read_sql(query,pg_engine)
+@st.cache_data(ttl=300)
+def load_artist_growth(artist_name,generation,_pg_engine):
+    sql="SELECT metric_type,date,SUM(value) as total_value FROM artist_growth_data WHERE artist_name=:a AND date<CURRENT_DATE GROUP BY metric_type,date ORDER BY date ASC"
+    with span("pd.read_sql","sql",sql) as s:
+        df=pd.read_sql(text(sql),_pg_engine,params={"a":artist_name})
+        if s is not None:
+            s.rows=len(df)
+    return compact_frame(df,categories=("metric_type",),numeric=("total_value",),fill=0)
+
+
+@traced("render")
+def plot_artist_growth_matplotlib(artist_name,pg_engine,generation=0):
+    df=load_artist_growth(artist_name,generation,pg_engine)
     if df.empty:
         return None
-    active_platforms=df.groupby("metric_type")["total_value"].max()
+    active_platforms=df.groupby("metric_type",observed=True)["total_value"].max()
     active_list=active_platforms[active_platforms>0].index.tolist()
     pivoted=df.pivot(index="date",columns="metric_type",values="total_value").fillna(0)
     for plat in active_list:
@@ -47,34 +84,28 @@ def plot_artist_growth_matplotlib(artist_name,pg_engine):
     return fig
 
 
-@st.cache_data(ttl=60)
-def get_artists():
-    return df_query("SELECT id,name FROM artists WHERE name!='TaeRyong' ORDER BY name;")
+# 단순 조회는 db 결과 캐시(쓰기 시 테이블 단위 무효화)를 사용. generation 인자는 기존 호출부와의 호환용
+def get_artists(generation=0):
+    return df_query("SELECT id,name FROM artists WHERE name!='TaeRyong' ORDER BY name;",cache=True)
 
 
-@st.cache_data(ttl=30)
-def get_artist_metrics_cached(artist_id,days):
-    end_date=date.today()-timedelta(days=1)
-    start_date=end_date-timedelta(days=days)
-    data=df_query(
-        "SELECT date,youtube_views,spotify_streams,soundcloud_plays FROM daily_metrics WHERE artist_id=%s AND date>=%s AND date<=%s ORDER BY date ASC;",
-        (artist_id,start_date.isoformat(),end_date.isoformat())
-    )
-    if data.empty:
-        return None
-    df=data.copy()
-    df["date"]=pd.to_datetime(df["date"])
-    cols=["youtube_views","spotify_streams","soundcloud_plays"]
-    for c in cols:
-        df[c]=pd.to_numeric(df[c],errors="coerce").fillna(0)
-    active_cols=[c for c in cols if df[c].max()>0]
+def get_artist_daily_metrics(artist_id,generation=0):
+    # 공유 메모리 저장소가 켜져 있으면 복사 없는 읽기 전용 조각을 반환
+    snap=STORE.snapshot()
+    if snap is not None:
+        return snap.frame(int(artist_id))
+    return df_query_typed("SELECT date,youtube_views,spotify_streams,soundcloud_plays FROM daily_metrics WHERE artist_id=%s",(artist_id,),numeric=PLATFORM_COLS,fill=0,cache=True)
+
+
+def _score_metrics(df):
+    # 기간 내 일별 지표로 파이어·가속도·안정성을 계산 (100,000 미만인 날은 제외)
+    active_cols=[c for c in PLATFORM_COLS if df[c].max()>0]
     if not active_cols:
         return None
-    for c in active_cols:
-        df=df[df[c]>100000]
+    df=df[(df[active_cols]>100000).all(axis=1)]
     if len(df)<2:
         return None
-    df["total"]=df[active_cols].sum(axis=1)
+    df=df.assign(total=df[active_cols].sum(axis=1))
     df["growth"]=df["total"].diff().fillna(0)
     fire=df["growth"].tail(7).mean()/(df["growth"].mean()+1e-9)
     mid=len(df)//2
@@ -83,6 +114,115 @@ def get_artist_metrics_cached(artist_id,days):
     return {"df":df,"fire":fire,"accel":accel,"stab":stab,"active":active_cols}
 
 
+def _period(days):
+    # days=None이면 전체 기간 (시작일 없음)
+    end_date=date.today()-timedelta(days=1)
+    return (None if days is None else end_date-timedelta(days=days)),end_date
+
+
+def resolution_for(days,max_points=MAX_POINTS):
+    # days일을 max_points개 이하로 그릴 수 있는 가장 세밀한 해상도. 어느 것도 안 되면 가장 거친 해상도
+    for name,step in RESOLUTIONS:
+        if days/step<=max_points:
+            return name
+    return RESOLUTIONS[-1][0]
+
+
+def _history_days(artist_ids):
+    snap=STORE.snapshot()
+    if snap is not None:
+        firsts=[snap.dates[lo] for lo,hi in (snap.bounds(int(a)) for a in artist_ids) if hi>lo]
+        return max(1,(date.today()-pd.Timestamp(min(firsts)).date()).days) if firsts else 1
+    first=df_query("SELECT MIN(date) AS first FROM daily_metrics WHERE artist_id=ANY(%s);",(list(artist_ids),),cache=True)
+    if first.empty or pd.isna(first.iloc[0]["first"]):
+        return 1
+    return max(1,(date.today()-first.iloc[0]["first"]).days)
+
+
+def load_metrics_window(artist_ids,days,max_points=MAX_POINTS):
+    # 기간·포인트 예산에 맞는 해상도로 (artist_id,date,플랫폼 열)을 읽음. 주·월 해상도의 값은 구간 마지막 값(누적 수치)
+    # 반환: (DataFrame,해상도)
+    ids=[int(i) for i in artist_ids]
+    start_date,end_date=_period(days)
+    res=resolution_for(days if days is not None else _history_days(ids),max_points)
+    snap=STORE.snapshot() if res=="day" else None
+    if snap is not None:
+        return snap.frames(ids,start_date,end_date),res
+    if res=="day":
+        sql="SELECT artist_id,date,youtube_views,spotify_streams,soundcloud_plays FROM daily_metrics WHERE artist_id=ANY(%s) AND date<=%s"
+        params=[ids,end_date.isoformat()]
+        if start_date is not None:
+            sql+=" AND date>=%s"
+            params.append(start_date.isoformat())
+    else:
+        table,unit,_=PERIOD_TABLES[res]
+        sql=f"SELECT artist_id,period_start AS date,{','.join(f'{c}_last AS {c}' for c in PLATFORM_COLS)} FROM {table} WHERE artist_id=ANY(%s) AND period_start<=%s"
+        params=[ids,end_date.isoformat()]
+        if start_date is not None:
+            # 시작일이 걸친 구간도 포함
+            sql+=f" AND period_start>=date_trunc('{unit}',%s::date)::date"
+            params.append(start_date.isoformat())
+    df=df_query_typed(sql+" ORDER BY artist_id,date ASC;",tuple(params),numeric=PLATFORM_COLS,fill=0)
+    if res!="day":
+        missing=sorted(set(ids)-set(df["artist_id"].astype(int)))
+        if missing:
+            # 주·월 테이블이 아직 채워지지 않은 아티스트는 daily_metrics에서 같은 구간 마지막 값으로 바로 집계
+            extra=_period_from_daily(missing,res,start_date,end_date)
+            if df.empty:
+                df=extra
+            elif not extra.empty:
+                df=pd.concat([df,extra],ignore_index=True).sort_values(["artist_id","date"],kind="stable").reset_index(drop=True)
+    return df,res
+
+
+def _period_from_daily(ids,res,start_date,end_date):
+    _,unit,_=PERIOD_TABLES[res]
+    lasts=",".join(f"(ARRAY_AGG({c} ORDER BY date DESC) FILTER (WHERE {c} IS NOT NULL))[1] AS {c}" for c in PLATFORM_COLS)
+    sql=f"SELECT artist_id,date_trunc('{unit}',date)::date AS date,{lasts} FROM daily_metrics WHERE artist_id=ANY(%s) AND date<=%s"
+    params=[ids,end_date.isoformat()]
+    if start_date is not None:
+        sql+=f" AND date>=date_trunc('{unit}',%s::date)::date"
+        params.append(start_date.isoformat())
+    return df_query_typed(sql+" GROUP BY 1,2 ORDER BY 1,2;",tuple(params),numeric=PLATFORM_COLS,fill=0)
+
+
+@st.cache_data(ttl=30)
+@traced("analytics")
+def get_artist_metrics_cached(artist_id,days,generation=0):
+    # days=None이면 전체 기간. 긴 기간은 주·월 집계 테이블에서 읽으므로 점수도 그 해상도의 증가분 기준
+    df,res=load_metrics_window([artist_id],days)
+    if df.empty:
+        return None
+    out=_score_metrics(df.drop(columns="artist_id"))
+    if out is not None:
+        out["resolution"]=res
+    return out
+
+
+@st.cache_data(ttl=30)
+@traced("analytics")
+def get_metrics_for_artists(artist_ids,days,generation=0):
+    # 여러 아티스트를 한 번의 조회로 가져와 아티스트별로 점수 계산. 반환: {artist_id: 결과 또는 None}
+    ids=sorted({int(i) for i in artist_ids})
+    out=dict.fromkeys(ids)
+    if not ids:
+        return out
+    df,res=load_metrics_window(ids,days)
+    for a_id,g in df.groupby("artist_id",sort=False):
+        r=_score_metrics(g.drop(columns="artist_id"))
+        if r is not None:
+            r["resolution"]=res
+        out[int(a_id)]=r
+    return out
+
+
+def top_artists(results,by="fire",n=10):
+    # 전체 정렬 없이 힙으로 상위 n명만 선택. 반환: [(artist_id,결과),...] 점수 내림차순
+    scored=((float(r[by]),a_id) for a_id,r in results.items() if r is not None and np.isfinite(r[by]))
+    return [(a_id,results[a_id]) for _,a_id in heapq.nlargest(n,scored)]
+
+
+@traced("analytics")
 def predict_milestone(df,column,target=100000000):
     if len(df)<5:
         return None
@@ -100,7 +240,7 @@ def predict_milestone(df,column,target=100000000):
     return df_sorted["date"].min()+timedelta(days=int(days_to_target))
 
 
-def plot_with_forecast(df,column):
+def forecast_linear(df,column,horizon=30):
     if len(df)<5:
         return None
     df_filtered=df[df[column]>100000].sort_values("date")
@@ -109,9 +249,23 @@ def plot_with_forecast(df,column):
     X=np.array((df_filtered["date"]-df_filtered["date"].min()).dt.days).reshape(-1,1)
     y=df_filtered[column].values
     model=LinearRegression().fit(X,y)
-    future_days=np.array(range(int(X[-1][0]),int(X[-1][0])+31)).reshape(-1,1)
+    future_days=np.array(range(int(X[-1][0]),int(X[-1][0])+horizon+1)).reshape(-1,1)
     future_preds=model.predict(future_days)
     future_dates=[df_filtered["date"].min()+timedelta(days=int(d)) for d in future_days.flatten()]
+    return {"actual":df_filtered,"dates":future_dates,"preds":future_preds,"slope":float(model.coef_[0])}
+
+
+@traced("render")
+def plot_with_forecast(df,column,artist_id=None):
+    # 동기화 때 저장된 감쇠 추세 예측(시나리오 구간 포함)이 있으면 그것을, 없으면 선형 예측을 즉석에서 그림
+    stored=get_forecast(artist_id,column) if artist_id is not None else {}
+    if "damped" in stored:
+        return plot_stored_forecast(df,column,stored)
+    fc=forecast_linear(df,column)
+    if fc is None:
+        return None
+    df_filtered,y=fc["actual"],fc["actual"][column].values
+    future_dates,future_preds=fc["dates"],fc["preds"]
     fig,ax=plt.subplots(figsize=(10,4))
     ax.plot(df_filtered["date"],y,label="Actual",color="blue")
     ax.plot(future_dates,future_preds,label="Forecast",linestyle="--",color="orange")
@@ -120,10 +274,25 @@ def plot_with_forecast(df,column):
     return fig
 
 
+def plot_stored_forecast(df,column,stored):
+    actual=df[df[column]>100000].sort_values("date").tail(180)
+    damped=stored["damped"]
+    fig,ax=plt.subplots(figsize=(10,4))
+    ax.plot(actual["date"],actual[column],label="Actual",color="blue")
+    ax.fill_between(damped["date"],damped["low"],damped["high"],color="orange",alpha=0.25,label="p10-p90")
+    ax.plot(damped["date"],damped["base"],label="Base (damped trend)",color="orange")
+    if "linear" in stored:
+        ax.plot(stored["linear"]["date"],stored["linear"]["base"],label="Linear baseline",linestyle="--",color="gray")
+    ax.set_title(f"{column} {len(damped)}-Day Forecast")
+    ax.legend()
+    return fig
+
+
+@traced("analytics")
 def calculate_engagement_ratio(df):
-    cols=["youtube_views","spotify_streams","soundcloud_plays"]
-    d=df[cols].copy()
-    d=d.apply(pd.to_numeric,errors="coerce").fillna(0)
+    d=df[PLATFORM_COLS]
+    if not all(pd.api.types.is_integer_dtype(d[c]) for c in PLATFORM_COLS):
+        d=d.apply(pd.to_numeric,errors="coerce").fillna(0)
     d=d[d.sum(axis=1)>0]
     if d.empty:
         return None
@@ -139,14 +308,14 @@ def calculate_engagement_ratio(df):
     return ratios
 
 
+@traced("analytics")
 def calculate_volatility_index(df,column,window=30):
-    d=df[["date",column]].copy()
-    d=d.sort_values("date")
-    d[column]=pd.to_numeric(d[column],errors="coerce").fillna(0)
-    d=d[d[column]>100000].copy()
-    if len(d)<15:
+    d=df[["date",column]].sort_values("date")
+    v=_as_numeric(d[column])
+    v=v[v>100000]
+    if len(v)<15:
         return None
-    r=d[column].pct_change().replace([np.inf,-np.inf],np.nan).dropna()
+    r=v.pct_change().replace([np.inf,-np.inf],np.nan).dropna()
     if len(r)<14:
         return None
     r=r.tail(window)
@@ -155,21 +324,19 @@ def calculate_volatility_index(df,column,window=30):
     return round(vol,2)
 
 
+@traced("analytics")
 def calculate_momentum_score(df,column,window=7):
-    d=df[["date",column]].copy()
-    d["date"]=pd.to_datetime(d["date"])
-    d=d.sort_values("date")
-    d[column]=pd.to_numeric(d[column],errors="coerce").fillna(0)
-    d=d[d[column]>100000].copy()
-    if len(d)<window*2+2:
-        return None
-    d["daily"]=d[column].diff()
-    d=d.dropna()
-    d=d[d["daily"]>0]
-    if len(d)<window*2:
-        return None
-    recent_avg=float(d["daily"].tail(window).mean())
-    prev_avg=float(d["daily"].iloc[-window*2:-window].mean())
+    dates=df["date"] if pd.api.types.is_datetime64_any_dtype(df["date"]) else pd.to_datetime(df["date"])
+    v=_as_numeric(df[column]).iloc[np.argsort(dates.values,kind="stable")]
+    v=v[v>100000]
+    if len(v)<window*2+2:
+        return None
+    daily=v.diff().dropna()
+    daily=daily[daily>0]
+    if len(daily)<window*2:
+        return None
+    recent_avg=float(daily.tail(window).mean())
+    prev_avg=float(daily.iloc[-window*2:-window].mean())
     if prev_avg<=0:
         return None
     ratio=recent_avg/prev_avg
@@ -0,0 +1,185 @@
+import argparse
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from psycopg2.extras import execute_values
+from db import get_db_connection, df_query, df_query_typed
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+MIN_VALUE = 100000
+WINDOW = 28
+MIN_PERIODS = 14
+Z_THRESHOLD = 6.0
+MAD_SCALE = 1.4826
+ARTIST_BATCH = 200
+# 한 번에 창을 펼치는 후보 행 수. 창 행렬과 임시 배열이 행당 window*8바이트씩이므로 최대 메모리를 수십 MB로 묶어 둠
+WINDOW_CHUNK = 50000
+
+
+def _window_stats(growth, pos, idx, window, chunk):
+    """idx 각 행 직전 window개 증가분(같은 그룹 안, 첫 행 제외)의 중앙값과 MAD를 chunk행씩 나눠 계산합니다."""
+    padded = np.r_[np.full(window, np.nan), growth]
+    view = sliding_window_view(padded, window)
+    offsets = np.arange(window) - window
+    med = np.empty(idx.size)
+    mad = np.empty(idx.size)
+    for lo in range(0, idx.size, chunk):
+        part = idx[lo:lo + chunk]
+        # windows[i]는 i 직전 window개의 증가분. 다른 그룹이나 그룹의 첫 행(증가분 없음)에 걸친 칸은 NaN으로 가림
+        windows = view[part].copy()
+        windows[offsets[None, :] + pos[part, None] < 1] = np.nan
+        m = np.nanmedian(windows, axis=1)
+        np.subtract(windows, m[:, None], out=windows)
+        np.abs(windows, out=windows)
+        med[lo:lo + chunk] = m
+        mad[lo:lo + chunk] = np.nanmedian(windows, axis=1)
+    return med, mad
+
+
+def detect_anomalies(df, since=None, window=WINDOW, min_periods=MIN_PERIODS, threshold=Z_THRESHOLD, chunk=WINDOW_CHUNK):
+    """
+    일별 지표(artist_id, date, 플랫폼 열)에서 (아티스트, 플랫폼)별 일일 증가분의 robust z-score를 계산해 이상 징후 행을 반환합니다.
+    기준값은 직전 window일 증가분의 중앙값, 척도는 MAD*1.4826이며, 전날 값이 100,000을 넘는 날만 평가합니다.
+    since는 {artist_id: date 또는 None}이며 그 날짜 이후의 행만 결과에 포함합니다(앞선 날짜는 기준 구간으로만 사용).
+    """
+    cols = ["artist_id", "platform", "date", "kind", "value", "growth", "baseline", "z_score"]
+    if df.empty:
+        return pd.DataFrame(columns=cols)
+    long = df.melt(id_vars=["artist_id", "date"], value_vars=PLATFORM_COLS, var_name="platform", value_name="value")
+    long = long.sort_values(["artist_id", "platform", "date"], kind="stable", ignore_index=True)
+    key = long["artist_id"].to_numpy(dtype=np.int64) * len(PLATFORM_COLS) + pd.Categorical(long["platform"], categories=PLATFORM_COLS).codes
+    values = long["value"].to_numpy(dtype=np.float64)
+    n = len(values)
+
+    # 그룹 경계와 그룹 내 위치: 정렬된 배열 하나에서 모든 (아티스트, 플랫폼)을 한 번에 처리
+    start = np.r_[True, key[1:] != key[:-1]]
+    group_start = np.flatnonzero(start)[np.cumsum(start) - 1]
+    pos = np.arange(n) - group_start
+    prev = np.r_[np.nan, values[:-1]]
+    prev[start] = np.nan
+    growth = values - prev
+
+    candidates = (pos - 1 >= min_periods) & (prev > MIN_VALUE) & ~np.isnan(values)
+    if since:
+        cutoff = long["artist_id"].map({a: pd.Timestamp(s) if s is not None else pd.NaT for a, s in since.items()})
+        candidates &= (cutoff.isna() | (long["date"] >= cutoff)).to_numpy()
+    idx = np.flatnonzero(candidates)
+    if idx.size == 0:
+        return pd.DataFrame(columns=cols)
+
+    med, mad = _window_stats(growth, pos, idx, window, chunk)
+    # 증가분이 매일 같으면 MAD가 0이 되므로 중앙값의 1%(최소 1)를 하한으로 둠
+    scale = np.maximum(MAD_SCALE * mad, np.maximum(np.abs(med) * 0.01, 1.0))
+    z = (growth[idx] - med) / scale
+
+    zero = values[idx] == 0
+    flagged = zero | (np.abs(z) >= threshold)
+    sel = idx[flagged]
+    out = long.loc[sel, ["artist_id", "platform", "date", "value"]].reset_index(drop=True)
+    out["growth"] = growth[sel]
+    out["baseline"] = med[flagged]
+    out["z_score"] = np.round(z[flagged], 2)
+    out["kind"] = np.where(zero[flagged], "zero", np.where(z[flagged] > 0, "spike", "drop"))
+    return out[cols]
+
+
+def _load_batch(targets):
+    """targets {artist_id: since}의 일별 지표를 기준 구간(window+1일)까지 포함해 한 번에 읽습니다."""
+    ids = list(targets)
+    sinces = [targets[a] for a in ids]
+    return df_query_typed(
+        """
+        SELECT m.artist_id, m.date, m.youtube_views, m.spotify_streams, m.soundcloud_plays
+        FROM daily_metrics m
+        JOIN unnest(%s::int[], %s::date[]) AS t(artist_id, since) ON t.artist_id = m.artist_id
+        WHERE t.since IS NULL OR m.date >= t.since - %s
+        ORDER BY m.artist_id, m.date;
+        """,
+        (ids, sinces, WINDOW + 1),
+        numeric=PLATFORM_COLS,
+    )
+
+
+def _write_alerts(targets, alerts):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        full = [a for a, s in targets.items() if s is None]
+        partial = [(a, s) for a, s in targets.items() if s is not None]
+        if full:
+            cursor.execute("DELETE FROM metric_alerts WHERE artist_id = ANY(%s);", (full,))
+        if partial:
+            execute_values(
+                cursor,
+                "DELETE FROM metric_alerts m USING (VALUES %s) AS t(artist_id, since) WHERE m.artist_id = t.artist_id AND m.date >= t.since::date;",
+                partial,
+            )
+        if not alerts.empty:
+            rows = [
+                (int(r.artist_id), r.platform, r.date.date(), r.kind, None if pd.isna(r.value) else int(r.value), float(r.growth), float(r.baseline), float(r.z_score))
+                for r in alerts.itertuples(index=False)
+            ]
+            execute_values(
+                cursor,
+                """
+                INSERT INTO metric_alerts (artist_id, platform, date, kind, value, growth, baseline, z_score)
+                VALUES %s
+                ON CONFLICT (artist_id, platform, date) DO UPDATE SET
+                  kind=EXCLUDED.kind, value=EXCLUDED.value, growth=EXCLUDED.growth,
+                  baseline=EXCLUDED.baseline, z_score=EXCLUDED.z_score, detected_at=NOW();
+                """,
+                rows,
+                page_size=1000,
+            )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def scan_anomalies(touched=None, threshold=Z_THRESHOLD):
+    """
+    이상 징후를 다시 계산해 metric_alerts에 기록하고 기록한 건수를 반환합니다.
+    touched가 {artist_id: since}이면 해당 아티스트의 since 이후 날짜만(None이면 전체 기간) 다시 평가하고,
+    touched가 None이면 카탈로그 전체를 처음부터 스캔합니다. 아티스트는 ARTIST_BATCH명씩 묶어 조회합니다.
+    """
+    if touched is None:
+        ids = df_query("SELECT id FROM artists ORDER BY id;")["id"].astype(int).tolist()
+        touched = dict.fromkeys(ids)
+    touched = {int(a): (None if s is None or s == date.min else s) for a, s in touched.items()}
+    items = sorted(touched.items())
+    written = 0
+    for i in range(0, len(items), ARTIST_BATCH):
+        targets = dict(items[i:i + ARTIST_BATCH])
+        alerts = detect_anomalies(_load_batch(targets), targets, threshold=threshold)
+        _write_alerts(targets, alerts)
+        written += len(alerts)
+    return written
+
+
+def get_alerts(artist_id=None, days=90, limit=200):
+    """최근 days일의 이상 징후를 최신 날짜순(같은 날은 |z| 큰 순)으로 반환합니다. artist_id가 없으면 카탈로그 전체입니다."""
+    sql = """
+        SELECT a.name AS artist, m.artist_id, m.platform, m.date, m.kind, m.value, m.growth, m.baseline, m.z_score
+        FROM metric_alerts m JOIN artists a ON a.id = m.artist_id
+        WHERE m.date >= %s
+    """
+    params = [date.today() - timedelta(days=days)]
+    if artist_id is not None:
+        sql += " AND m.artist_id = %s"
+        params.append(int(artist_id))
+    sql += " ORDER BY m.date DESC, ABS(m.z_score) DESC LIMIT %s;"
+    params.append(int(limit))
+    return df_query(sql, tuple(params), cache=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="일별 지표 이상 징후 전체 스캔")
+    parser.add_argument("--threshold", type=float, default=Z_THRESHOLD, help="robust z-score 임계값")
+    args = parser.parse_args()
+    print(f"이상 징후 {scan_anomalies(threshold=args.threshold)}건 기록")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+Next.js 프론트엔드용 경량 JSON API 서버입니다.
+
+Streamlit 스크립트 전체를 다시 실행하지 않고 db/analytics 계층만 사용해 아티스트 목록, 일별 지표(페이지네이션,
+날짜 범위), 요약 점수, 예측을 제공합니다. 응답은 Accept-Encoding에 따라 gzip으로 압축되며, ETag는
+데이터 세대 번호(data_generations)로 만들어지므로 데이터가 바뀌지 않았으면 본문 계산 없이 304를 반환합니다.
+
+/api/audition/stream은 심사위원 3명의 토큰 스트림을 하나의 Server-Sent Events 연결로 중계합니다.
+
+실행 (backend 디렉터리에서):
+    python api.py --port 8505
+"""
+import re
+import json
+import gzip
+import time
+import queue
+import hashlib
+import argparse
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from db import df_query, get_generation, observe_generation, CATALOG_SCOPE
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+MAX_PAGE = 1000
+DEFAULT_PAGE = 365
+GZIP_MIN_BYTES = 1024
+# SSE 심사 스트림: 심사 스레드와 클라이언트 사이 버퍼 크기(튜플 수), 이벤트 하나에 합칠 최대 글자 수, 유휴 핑 간격
+SSE_QUEUE_SIZE = 64
+SSE_MAX_COALESCE = 2000
+SSE_PING_SECONDS = 15
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(o):
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _int_arg(qs, name, default, lo=None, hi=None):
+    raw = qs.get(name, [None])[0]
+    if raw is None or raw == "":
+        return default
+    try:
+        v = int(raw)
+    except ValueError:
+        raise ApiError(400, f"{name}는 정수여야 합니다")
+    if lo is not None:
+        v = max(lo, v)
+    if hi is not None:
+        v = min(hi, v)
+    return v
+
+
+def _date_arg(qs, name, default=None):
+    raw = qs.get(name, [None])[0]
+    if not raw:
+        return default
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ApiError(400, f"{name}는 YYYY-MM-DD 형식이어야 합니다")
+
+
+def _artist(artist_id):
+    """
+    아티스트 이름과 데이터 세대 번호를 한 번에 조회합니다. 없으면 404입니다.
+    카탈로그 세대도 함께 읽어 다른 프로세스가 쓴 뒤라면 이 프로세스의 결과 캐시를 비웁니다 (ETag와 본문의 세대를 맞춤).
+    """
+    df = df_query(
+        """
+        SELECT a.name, COALESCE(g.generation, 0) AS generation,
+          COALESCE((SELECT generation FROM data_generations WHERE scope=%s), 0) AS catalog
+        FROM artists a LEFT JOIN data_generations g ON g.scope=a.name WHERE a.id=%s;
+        """,
+        (CATALOG_SCOPE, artist_id),
+    )
+    if df.empty:
+        raise ApiError(404, "아티스트를 찾을 수 없습니다")
+    observe_generation(int(df.iloc[0]["catalog"]))
+    return str(df.iloc[0]["name"]), int(df.iloc[0]["generation"])
+
+
+def list_artists(qs):
+    df = df_query("SELECT id AS artist_id, name FROM artists WHERE name!='TaeRyong' ORDER BY name;", cache=True)
+    return _records(df)
+
+
+def artist_metrics(artist_id, qs):
+    end = _date_arg(qs, "end", date.today() - timedelta(days=1))
+    start = _date_arg(qs, "start", date.min)
+    limit = _int_arg(qs, "limit", DEFAULT_PAGE, 1, MAX_PAGE)
+    offset = _int_arg(qs, "offset", 0, 0)
+    df = df_query(
+        """
+        SELECT date, youtube_views, spotify_streams, soundcloud_plays, COUNT(*) OVER () AS total
+        FROM daily_metrics WHERE artist_id=%s AND date>=%s AND date<=%s
+        ORDER BY date ASC LIMIT %s OFFSET %s;
+        """,
+        (artist_id, start, end, limit, offset),
+        cache=True,
+    )
+    total = int(df["total"].iloc[0]) if not df.empty else 0
+    items = _records(df.drop(columns=["total"]))
+    return {"artist_id": artist_id, "start": start, "end": end, "limit": limit, "offset": offset, "total": total, "items": items}
+
+
+def artist_summary(artist_id, qs, generation):
+    from analytics import get_artist_metrics_cached, calculate_engagement_ratio
+    from rolling_stats import get_current_indicators
+    days = _int_arg(qs, "days", 30, 1, 3650)
+    res = get_artist_metrics_cached(artist_id, days, generation)
+    out = {"artist_id": artist_id, "days": days, "fire": None, "accel": None, "stab": None, "active": [], "engagement": None}
+    if res:
+        out.update({"fire": float(res["fire"]), "accel": float(res["accel"]), "stab": float(res["stab"]), "active": res["active"], "resolution": res["resolution"]})
+        out["engagement"] = calculate_engagement_ratio(res["df"])
+    out["indicators"] = get_current_indicators(artist_id)
+    return out
+
+
+def artist_forecast(artist_id, qs, generation):
+    from analytics import get_artist_daily_metrics, forecast_linear
+    from forecasting import get_forecast
+    column = qs.get("column", ["spotify_streams"])[0]
+    if column not in PLATFORM_COLS:
+        raise ApiError(400, f"column은 {', '.join(PLATFORM_COLS)} 중 하나여야 합니다")
+    horizon = _int_arg(qs, "horizon", 30, 1, 365)
+    stored = get_forecast(artist_id, column)
+    if "damped" in stored and horizon <= len(stored["damped"]):
+        # 동기화 때 저장된 감쇠 추세 예측: value는 p50, low/high는 p10/p90 시나리오
+        damped = stored["damped"].head(horizon)
+        linear = stored.get("linear")
+        return {
+            "artist_id": artist_id,
+            "column": column,
+            "model": "damped",
+            "points": [
+                {"date": r.date.date(), "value": float(r.base), "low": float(r.low), "high": float(r.high)}
+                for r in damped.itertuples(index=False)
+            ],
+            "baseline": [] if linear is None else [
+                {"date": r.date.date(), "value": float(r.base)} for r in linear.head(horizon).itertuples(index=False)
+            ],
+        }
+    fc = forecast_linear(get_artist_daily_metrics(artist_id, generation), column, horizon)
+    if fc is None:
+        return {"artist_id": artist_id, "column": column, "model": "linear", "points": []}
+    return {
+        "artist_id": artist_id,
+        "column": column,
+        "model": "linear",
+        "slope_per_day": fc["slope"],
+        "points": [{"date": d, "value": float(v)} for d, v in zip(fc["dates"], fc["preds"])],
+    }
+
+
+class ClosableQueue(queue.Queue):
+    """
+    크기가 제한된 큐입니다. 가득 차면 생산자(심사 스레드)가 블록되어 느린 클라이언트 때문에 토큰이
+    메모리에 무한히 쌓이지 않습니다. close() 이후의 put은 PanelCancelled로 생산자를 멈춥니다.
+    block/timeout은 queue.Queue.put과 같으며, 기다리는 동안에도 close()를 0.5초 안에 알아챕니다.
+    """
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.closed = False
+
+    def put(self, item, block=True, timeout=None):
+        from services import PanelCancelled
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.closed:
+                raise PanelCancelled()
+            if not block:
+                return super().put(item, block=False)
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Full
+            try:
+                return super().put(item, timeout=wait)
+            except queue.Full:
+                continue
+
+    def close(self):
+        self.closed = True
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=_json_default, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def stream_audition(handler, qs):
+    """
+    한 곡에 대한 심사위원 3명의 토큰 스트림을 하나의 SSE 연결로 다중화합니다.
+    같은 심사위원의 연속된 청크는 이벤트 하나로 합쳐 보내므로 클라이언트가 느릴수록 이벤트 수가 줄어듭니다.
+    헤더를 보내기 전의 오류는 호출자(do_GET)가 JSON 오류 응답으로 보내고, 보낸 뒤의 오류는 error 이벤트로 알린 뒤 연결을 닫습니다.
+    """
+    from services import JUDGES, start_judge_panel, parse_ai_response, determine_grade_range, get_lastfm_data
+    artist = qs.get("artist", [""])[0].strip()
+    title = qs.get("title", [""])[0].strip()
+    if not artist or not title:
+        raise ApiError(400, "artist와 title이 필요합니다")
+    lyrics = qs.get("lyrics", [None])[0]
+    if lyrics is None:
+        # data_processing은 import 시 PG_HOST를 덮어쓰므로 API 프로세스에서는 부작용 없는 lyrics 모듈만 사용
+        from lyrics import load_lyrics_catalog
+        match = [s for s in load_lyrics_catalog() if s["artist"] == artist and s["title"] == title]
+        if not match:
+            raise ApiError(404, "가사 카탈로그에서 곡을 찾을 수 없습니다")
+        lyrics = match[0]["review"]
+    grade = qs.get("grade", ["GOOD"])[0]
+    if grade not in ("HIT", "GOOD", "SOLID", "BAD"):
+        raise ApiError(400, "grade는 HIT, GOOD, SOLID, BAD 중 하나여야 합니다")
+    song = {"artist": artist, "title": title, "review": lyrics[:500]}
+    _, tags = get_lastfm_data(artist, title)
+
+    handler.send_response(200)
+    handler.send_header("Content-Type", "text/event-stream; charset=utf-8")
+    handler.send_header("Cache-Control", "no-cache")
+    handler.send_header("Access-Control-Allow-Origin", "*")
+    handler.send_header("X-Accel-Buffering", "no")
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    handler.close_connection = True
+
+    q = ClosableQueue(SSE_QUEUE_SIZE)
+    t0 = time.time()
+    results = {}
+    try:
+        handler.wfile.write(_sse("start", {
+            "song": {"artist": artist, "title": title},
+            "tags": tags,
+            "judges": [{"judge": jn, "provider": ji["provider"], "model": ji["model_id"]} for jn, ji in JUDGES.items()],
+        }))
+        handler.wfile.flush()
+        start_judge_panel(song, tags, q, grade)
+        while len(results) < len(JUDGES):
+            try:
+                item = q.get(timeout=SSE_PING_SECONDS)
+            except queue.Empty:
+                handler.wfile.write(b": ping\n\n")
+                handler.wfile.flush()
+                continue
+            batch = [item]
+            while True:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            out = []
+            pending = None
+            for name, text, is_done, state, provider, model, *rest in batch:
+                if is_done:
+                    if pending:
+                        out.append(_sse("chunk", pending))
+                        pending = None
+                    scores, comment = parse_ai_response(text)
+                    results[name] = {"scores": scores, "comment": comment, "elapsed": rest[0], "provider": provider, "model": model, "state": state}
+                    out.append(_sse("judge_done", {"judge": name, **results[name]}))
+                elif text:
+                    if pending and pending["judge"] == name and len(pending["text"]) < SSE_MAX_COALESCE:
+                        pending["text"] += text
+                    else:
+                        if pending:
+                            out.append(_sse("chunk", pending))
+                        pending = {"judge": name, "provider": provider, "state": state, "text": text}
+            if pending:
+                out.append(_sse("chunk", pending))
+            handler.wfile.write(b"".join(out))
+            handler.wfile.flush()
+        total = sum(r["scores"]["Total"] for r in results.values())
+        handler.wfile.write(_sse("done", {
+            "results": results,
+            "total": total,
+            "grade": determine_grade_range(total),
+            "elapsed": round(time.time() - t0, 2),
+        }))
+        handler.wfile.flush()
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+    except Exception as e:
+        # 200과 스트림 헤더가 이미 나갔으므로 do_GET의 500 응답을 덧쓰지 않고 스트림 안에서 끝냄
+        try:
+            handler.wfile.write(_sse("error", {"error": f"{type(e).__name__}: {e}"}))
+            handler.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+    finally:
+        q.close()
+
+
+ROUTES = [
+    (re.compile(r"^/api/audition/stream/?$"), "audition"),
+    (re.compile(r"^/api/artists/?$"), "artists"),
+    (re.compile(r"^/api/artists/(\d+)/metrics/?$"), "metrics"),
+    (re.compile(r"^/api/artists/(\d+)/summary/?$"), "summary"),
+    (re.compile(r"^/api/artists/(\d+)/forecast/?$"), "forecast"),
+    (re.compile(r"^/api/judges/scheduler/?$"), "scheduler"),
+]
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "MusicApi/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(fmt, *args)
+
+    def _send(self, status, body=b"", etag=None, content_type="application/json; charset=utf-8", extra=None):
+        headers = {"Access-Control-Allow-Origin": "*", "Cache-Control": "no-cache", "Vary": "Accept-Encoding", **(extra or {})}
+        if etag:
+            headers["ETag"] = etag
+        if body and len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.send_response(status)
+        if status != 304:
+            headers["Content-Type"] = content_type
+        headers["Content-Length"] = str(len(body))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _etag(self, generation, url):
+        # 날짜가 바뀌면 '어제까지' 기준의 결과도 바뀌므로 오늘 날짜를 함께 넣음
+        raw = f"{generation}|{date.today().isoformat()}|{url.path}?{url.query}"
+        return f'W/"g{generation}-{hashlib.md5(raw.encode("utf-8")).hexdigest()[:12]}"'
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", "If-None-Match, Content-Type")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        try:
+            for pattern, name in ROUTES:
+                m = pattern.match(url.path)
+                if m:
+                    break
+            else:
+                raise ApiError(404, "존재하지 않는 경로입니다")
+
+            if name == "audition":
+                if self.command == "HEAD":
+                    # HEAD가 유료 심사 호출을 시작하지 않도록 스트림 경로는 GET만 허용
+                    self._send(
+                        405,
+                        json.dumps({"error": "GET만 지원합니다"}, ensure_ascii=False).encode("utf-8"),
+                        extra={"Allow": "GET, OPTIONS"},
+                    )
+                    return
+                stream_audition(self, qs)
+                return
+            if name == "scheduler":
+                # 실시간 상태이므로 ETag 없이 매번 계산
+                from scheduler import SCHEDULER
+                self._send(200, json.dumps({"providers": SCHEDULER.stats()}, ensure_ascii=False).encode("utf-8"))
+                return
+            if name == "artists":
+                generation = get_generation()
+            else:
+                artist_id = int(m.group(1))
+                _, generation = _artist(artist_id)
+            etag = self._etag(generation, url)
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                self._send(304, etag=etag)
+                return
+
+            if name == "artists":
+                payload = list_artists(qs)
+            elif name == "metrics":
+                payload = artist_metrics(artist_id, qs)
+            elif name == "summary":
+                payload = artist_summary(artist_id, qs, generation)
+            else:
+                payload = artist_forecast(artist_id, qs, generation)
+            body = json.dumps(payload, default=_json_default, ensure_ascii=False).encode("utf-8")
+            self._send(200, body, etag)
+        except ApiError as e:
+            self._send(e.status, json.dumps({"error": e.message}, ensure_ascii=False).encode("utf-8"))
+        except Exception as e:
+            self._send(500, json.dumps({"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False).encode("utf-8"))
+
+    do_HEAD = do_GET
+
+
+def make_server(host="0.0.0.0", port=8505, verbose=False):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="음악 지표 JSON API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8505)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.verbose)
+    print(f"API 서버 시작: http://{args.host}:{args.port}/api/artists")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
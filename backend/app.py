@@ -2,11 +2,25 @@ import streamlit as st
 
 st.set_page_config(page_title="음악 통합 시스템",layout="wide")
 
+from tracing import start_rerun,span,summarize,to_jsonl,to_prometheus,export_rerun
+trace=start_rerun("app")
+from profiler import Profiler
+# 사이드바 버튼이 예약했거나 ?profile=1이면 이번 재실행 전체를 샘플링
+prof=Profiler().start() if st.session_state.pop("profile_next",False) or st.query_params.get("profile")=="1" else None
+
 import pandas as pd
 import altair as alt
-from db import init_db,df_query
-from data_processing import process_and_upload_excel,delete_artist_and_data,get_lyrics_from_s3,pg_engine
-from analytics import get_artists,get_artist_metrics_cached,plot_artist_growth_matplotlib,predict_milestone,plot_with_forecast,calculate_engagement_ratio,calculate_volatility_index,calculate_momentum_score
+from db import init_db,get_generation,typed_memory_stats,query_cache_stats,connections_opened
+from data_processing import delete_artists,merge_artists,rename_artist,get_lyrics_from_s3,pg_engine
+from analytics import PLATFORM_COLS,get_artists,get_artist_metrics_cached,get_metrics_for_artists,top_artists,get_artist_daily_metrics,plot_artist_growth_matplotlib,predict_milestone,plot_with_forecast,calculate_engagement_ratio
+from correlation import get_correlation,backfill_moments
+from rolling_stats import get_current_indicators,get_indicator_series,backfill_rolling_stats
+from anomalies import get_alerts
+from judge_telemetry import provider_summary,provider_series
+from scheduler import SCHEDULER
+from metrics_store import STORE
+from catalog_stats import load_catalog_stats,rebuild_catalog_stats
+from ingest_worker import get_worker,get_job,get_job_files,latest_job
 from services import get_lastfm_data,run_judge_panel,parse_ai_response,determine_grade_range,JUDGES
 
 
@@ -21,8 +35,57 @@ def ensure_extended_tables():
         st.error(f"테이블 생성 오류: {e}")
 
 
+@st.cache_resource
+def backfill_derived():
+    # 프로세스당 한 번: 배포 전 데이터처럼 누적기·롤링 상태가 없는 아티스트를 채움 (동기화는 바뀐 아티스트만 다룸)
+    for name,fn in (("상관관계 누적기",backfill_moments),("롤링 지표",backfill_rolling_stats)):
+        try:
+            fn()
+        except Exception as e:
+            print(f"{name} 보충 실패: {e}")
+    return True
+
+
 init_db()
 ensure_extended_tables()
+backfill_derived()
+catalog_gen=get_generation()
+
+
+def _ingest_progress():
+    try:
+        job=get_job(st.session_state["ingest_job"]) if "ingest_job" in st.session_state else latest_job()
+    except Exception as e:
+        st.caption(f"동기화 상태 조회 실패: {e}")
+        return
+    active=job is not None and job["status"] in ("queued","running")
+    if active!=st.session_state.get("ingest_active",False):
+        # 작업이 시작되거나 끝나면 전체를 다시 실행해 폴링 주기(run_every)를 바꿈
+        st.session_state["ingest_active"]=active
+        if not active:
+            st.session_state.pop("ingest_job",None)
+        st.rerun(scope="app")
+    if job is None:
+        return
+    total=int(job["total_files"] or 0)
+    done=int(job["done_files"] or 0)+int(job["failed_files"] or 0)
+    if job["status"] in ("queued","running"):
+        st.progress(done/total if total else 0.0,text=f"동기화 #{job['id']} {job['status']} · {done}/{total} {job['current_file'] or ''}")
+        if job["message"]:
+            st.caption(job["message"])
+    elif job["status"]=="done":
+        st.success(f"동기화 #{job['id']} 완료: {job['message']}")
+        if st.session_state.pop("ingest_job",None) is not None:
+            st.rerun(scope="app")
+    else:
+        st.error(f"동기화 #{job['id']} 실패: {job['message']}")
+    if int(job["failed_files"] or 0):
+        files=get_job_files(job["id"])
+        st.dataframe(files[files["status"]=="failed"][["file_name","error"]],use_container_width=True)
+
+
+# 실행 중인 작업이 있을 때만 2초마다 DB를 조회하고, 유휴 상태에서는 재실행 때만 그림
+ingest_progress=st.fragment(run_every=2 if st.session_state.get("ingest_active",False) else None)(_ingest_progress)
 
 
 main_tab1,main_tab2,main_tab3=st.tabs(["아티스트 성장 레이더","AGT 음악 심사 AI","고급 분석 & 데이터 엔지니어링"])
@@ -32,71 +95,135 @@ with main_tab1:
     st.title("아티스트 성장 레이더 대시보드")
     with st.sidebar:
         st.header("관리")
-        t2,t3=st.tabs(["동기화","삭제"])
+        t2,t3,t4=st.tabs(["동기화","삭제","병합/이름 변경"])
         with t2:
+            worker=get_worker()
             if st.button("동기화 실행"):
-                with st.spinner("데이터 동기화 중..."):
+                try:
+                    st.session_state["ingest_job"]=worker.submit()
+                except Exception as e:
+                    st.error(f"동기화 예약 실패: {e}")
+            watch=st.toggle("폴더 자동 감시",value=worker.watching)
+            if watch and not worker.watching:
+                worker.start_watching()
+            elif not watch and worker.watching:
+                worker.stop_watching()
+            ingest_progress()
+        with t3:
+            arts=get_artists(catalog_gen)
+            if not arts.empty:
+                targets=st.multiselect("삭제할 아티스트 선택",arts["name"].tolist())
+                confirm=st.checkbox("이 작업은 되돌릴 수 없음을 이해했습니다")
+                if st.button("삭제 확정",disabled=not (targets and confirm)):
                     try:
-                        process_and_upload_excel()
-                        st.success("동기화가 성공적으로 완료되었습니다")
-                        st.cache_data.clear()
+                        st.session_state["admin_result"]=("삭제",delete_artists(targets))
                         st.rerun()
                     except Exception as e:
-                        st.error(f"동기화 실패: {e}")
-        with t3:
-            arts=get_artists()
+                        st.error(f"삭제 실패: {e}")
+            else:
+                st.warning("데이터베이스에 아티스트가 없습니다")
+        with t4:
+            arts=get_artists(catalog_gen)
             if not arts.empty:
-                target=st.selectbox("삭제할 아티스트 선택",arts["name"].tolist())
-                if st.button("삭제 확정") and st.checkbox("이 작업은 되돌릴 수 없음을 이해했습니다"):
-                    delete_artist_and_data(target)
-                    st.cache_data.clear()
-                    st.rerun()
+                names=arts["name"].tolist()
+                sources=st.multiselect("병합할 아티스트(여러 표기)",names,key="merge_sources")
+                merge_target=st.text_input("병합 후 이름",value=sources[0] if sources else "",key="merge_target")
+                if st.button("병합 실행",disabled=not (sources and merge_target.strip())):
+                    try:
+                        st.session_state["admin_result"]=("병합",merge_artists(sources,merge_target.strip()))
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"병합 실패: {e}")
+                st.divider()
+                old_name=st.selectbox("이름을 바꿀 아티스트",names,key="rename_old")
+                new_name=st.text_input("새 이름",key="rename_new")
+                if st.button("이름 변경",disabled=not new_name.strip()):
+                    try:
+                        st.session_state["admin_result"]=("이름 변경",rename_artist(old_name,new_name.strip()))
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"이름 변경 실패: {e}")
             else:
                 st.warning("데이터베이스에 아티스트가 없습니다")
+        if "admin_result" in st.session_state:
+            op,counts=st.session_state.pop("admin_result")
+            st.success(f"{op} 완료")
+            st.json({k:v for k,v in counts.items() if not k.endswith("ids")})
     
-    with st.expander("디버그 정보"):
+    if st.sidebar.button("다음 재실행 프로파일링"):
+        st.session_state["profile_next"]=True
+        st.rerun()
+    debug_box=st.expander("디버그 정보",expanded=prof is not None)
+    with debug_box:
         try:
-            artist_count=df_query("SELECT COUNT(*) as cnt FROM artists;")
-            st.write(f"DB 아티스트 총 수: {artist_count.iloc[0]['cnt']}")
-            
-            growth_count=df_query("SELECT COUNT(*) as cnt FROM artist_growth_data;")
-            st.write(f"성장 데이터 총 레코드 수: {growth_count.iloc[0]['cnt']}")
-            
-            metrics_count=df_query("SELECT COUNT(*) as cnt FROM daily_metrics;")
-            st.write(f"일별 지표 총 레코드 수: {metrics_count.iloc[0]['cnt']}")
-            
-            import os
-            from config import FOLDER_PATH
-            if os.path.exists(FOLDER_PATH):
-                csv_files=[f for f in os.listdir(FOLDER_PATH) if f.endswith('.csv')]
-                st.write(f"발견된 CSV 파일 수: {len(csv_files)}")
-                st.write(csv_files[:10])
+            stats=load_catalog_stats()
+            labels={"artists":"DB 아티스트 총 수","artist_growth_data":"성장 데이터 총 레코드 수","daily_metrics":"일별 지표 총 레코드 수"}
+            for table,label in labels.items():
+                t=stats["tables"].get(table)
+                if t is None:
+                    continue
+                line=f"{label}: {t['row_count']:,}"
+                if t["estimated"]:
+                    line+=" (추정치)"
+                if t["min_date"] is not None:
+                    line+=f" · {t['min_date']} ~ {t['max_date']}"
+                st.write(line)
+            sync=stats["sync"]
+            if sync:
+                st.write(f"마지막 동기화: {sync['last_sync']} · 발견된 CSV 파일 수: {sync['file_count']}")
+                st.write(sync["files"])
             else:
-                st.error(f"폴더를 찾을 수 없습니다: {FOLDER_PATH}")
+                st.info("동기화 기록이 없습니다.")
+            if st.button("통계 전체 재계산"):
+                rebuild_catalog_stats()
+                st.rerun()
         except Exception as e:
             st.error(f"디버그 오류: {e}")
     
-    days=st.sidebar.selectbox("분석 기간(일)",[7,30,90,180],index=1)
-    artists=get_artists()
+    period_label=lambda d:"전체" if d is None else f"{d//365}년" if d>=365 else f"{d}일"
+    days=st.sidebar.selectbox("분석 기간",[7,30,90,180,365,1095,None],index=1,format_func=period_label)
+    resolution_labels={"day":"일별","week":"주별","month":"월별"}
+    artists=get_artists(catalog_gen)
     if not artists.empty:
         sel=st.selectbox("아티스트 프로필 선택",artists["name"].tolist())
         a_id=int(artists.loc[artists["name"]==sel,"id"].iloc[0])
-        res=get_artist_metrics_cached(a_id,days)
+        sel_gen=get_generation(sel)
+        res=get_artist_metrics_cached(a_id,days,sel_gen)
         if res:
             c1,c2,c3=st.columns(3)
             c1.metric("모멘텀(파이어)",f"{res['fire']:.2f}x")
             c2.metric("성장 가속도",f"{res['accel']:+.1f}%")
             c3.metric("추세 안정성",f"{res['stab']:.0f}/100")
+            if res["resolution"]!="day":
+                st.caption(f"{period_label(days)} 기간은 {resolution_labels[res['resolution']]} 집계(구간 마지막 값) 기준으로 계산했습니다.")
             tab1,tab2=st.tabs(["원시 데이터 & 지표","시각화 트렌드"])
             with tab1:
                 st.line_chart(res["df"].set_index("date")[res["active"]])
                 st.dataframe(res["df"].iloc[::-1],use_container_width=True)
             with tab2:
-                fig=plot_artist_growth_matplotlib(sel,pg_engine)
+                fig=plot_artist_growth_matplotlib(sel,pg_engine,sel_gen)
                 if fig:
-                    st.pyplot(fig)
+                    with span("st.pyplot","render"):
+                        st.pyplot(fig)
         else:
             st.warning("100,000 기준을 넘는 일관된 데이터가 없습니다.")
+        st.divider()
+        st.subheader("트렌딩 리더보드")
+        lb1,lb2=st.columns([3,1])
+        rank_labels={"fire":"모멘텀(파이어)","accel":"성장 가속도","stab":"추세 안정성"}
+        rank_by=lb1.radio("순위 기준",list(rank_labels),format_func=rank_labels.get,horizontal=True)
+        top_n=lb2.number_input("상위",min_value=5,max_value=100,value=10,step=5)
+        all_res=get_metrics_for_artists(tuple(artists["id"].astype(int)),days,catalog_gen)
+        leaders=top_artists(all_res,rank_by,int(top_n))
+        if leaders:
+            names=dict(zip(artists["id"].astype(int),artists["name"]))
+            st.dataframe(pd.DataFrame([
+                {"순위":i,"아티스트":names.get(a,a),"파이어":round(float(r["fire"]),2),"가속도(%)":round(float(r["accel"]),1),"안정성":round(float(r["stab"]))}
+                for i,(a,r) in enumerate(leaders,1)
+            ]),hide_index=True,use_container_width=True)
+            st.caption(f"{sum(r is not None for r in all_res.values())}/{len(all_res)}명 집계 · {'전체 기간' if days is None else '최근 '+period_label(days)} · {resolution_labels[leaders[0][1]['resolution']]}")
+        else:
+            st.info("순위를 매길 수 있는 아티스트가 없습니다.")
     else:
         st.warning("아티스트가 없습니다. 먼저 동기화를 실행해주세요.")
 
@@ -139,44 +266,99 @@ with main_tab2:
                 use_container_width=True
             )
 
+    st.divider()
+    st.subheader("심사위원 지연·처리량")
+    sched_stats = SCHEDULER.stats()
+    if sched_stats:
+        st.caption("제공자 스케줄러 (이 프로세스): 동시 호출 한도는 성공 시 늘고 429를 받으면 절반으로 줄어듭니다.")
+        st.dataframe(
+            pd.DataFrame(sched_stats)[["provider", "limit", "max_concurrency", "in_flight", "waiting", "rate_per_minute", "paused_for", "successes", "throttled", "errors"]],
+            hide_index=True,
+            use_container_width=True,
+        )
+    tel_c1, tel_c2 = st.columns(2)
+    tel_days = tel_c1.selectbox("집계 기간(일)", [1, 7, 30], index=1, key="tel_days")
+    tel_metric = tel_c2.selectbox(
+        "지표",
+        ["latency", "ttft", "queue_wait"],
+        format_func=lambda m: {"latency": "전체 지연", "ttft": "첫 토큰까지", "queue_wait": "대기 시간"}[m],
+        key="tel_metric",
+    )
+    try:
+        tel_summary = provider_summary(tel_days)
+        if tel_summary.empty:
+            st.info("기록된 심사 호출이 없습니다. 오디션을 실행하면 제공자별 지연이 여기에 쌓입니다.")
+        else:
+            st.dataframe(tel_summary.round(2), hide_index=True, use_container_width=True)
+            tel_series = provider_series(tel_days, "hour" if tel_days <= 7 else "day")
+            tel_long = tel_series.melt(
+                id_vars=["bucket", "provider"],
+                value_vars=[f"{tel_metric}_p50", f"{tel_metric}_p95"],
+                var_name="percentile",
+                value_name="seconds",
+            )
+            tel_long["percentile"] = tel_long["percentile"].str.rsplit("_", n=1).str[-1]
+            st.altair_chart(
+                alt.Chart(tel_long.dropna(subset=["seconds"]))
+                .mark_line(point=True)
+                .encode(
+                    x=alt.X("bucket:T", title="시간"),
+                    y=alt.Y("seconds:Q", title="초"),
+                    color="provider:N",
+                    strokeDash="percentile:N",
+                    tooltip=["bucket:T", "provider:N", "percentile:N", alt.Tooltip("seconds:Q", format=".2f")],
+                ),
+                use_container_width=True
+            )
+    except Exception as e:
+        st.error(f"텔레메트리 조회 오류: {e}")
+
 
 
 with main_tab3:
     st.title("고급 데이터 인사이트 & 엔지니어링")
-    artists=get_artists()
+    artists=get_artists(catalog_gen)
     if not artists.empty:
         sel_adv=st.selectbox("고급 분석용 아티스트 선택",artists["name"].tolist(),key="adv_sel")
         a_id_adv=int(artists.loc[artists["name"]==sel_adv,"id"].iloc[0])
-        metrics_adv=df_query("SELECT date,youtube_views,spotify_streams,soundcloud_plays FROM daily_metrics WHERE artist_id=%s",(a_id_adv,))
-        metrics_adv["date"]=pd.to_datetime(metrics_adv["date"])
+        metrics_adv=get_artist_daily_metrics(a_id_adv,get_generation(sel_adv))
         col_a,col_b=st.columns(2)
         with col_a:
             st.subheader("예측 분석")
             yt_target=100000000
             milestone=predict_milestone(metrics_adv,"youtube_views",yt_target)
             st.metric("유튜브 1억 예상 날짜",str(milestone))
-            forecast_fig=plot_with_forecast(metrics_adv,"spotify_streams")
+            fc_platform=st.selectbox("예측 플랫폼",PLATFORM_COLS,index=1,key="fc_platform")
+            forecast_fig=plot_with_forecast(metrics_adv,fc_platform,a_id_adv)
             if forecast_fig:
-                st.pyplot(forecast_fig)
+                with span("st.pyplot","render"):
+                    st.pyplot(forecast_fig)
             else:
                 st.info("예측을 위한 100,000 기준 이상의 데이터가 충분하지 않습니다.")
         with col_b:
             st.subheader("플랫폼 상관관계")
-            df_corr=metrics_adv.copy()
-            for col in ["youtube_views","spotify_streams","soundcloud_plays"]:
-                df_corr=df_corr[df_corr[col]>100000]
-            if len(df_corr)>10:
-                corr=df_corr[["youtube_views","spotify_streams","soundcloud_plays"]].corr()
-                st.dataframe(corr.style.background_gradient(cmap="coolwarm"))
-            else:
-                st.info("상관관계 분석을 위한 100,000 기준 이상의 데이터가 충분하지 않습니다.")
+            corr_kind=st.radio("기준",["level","delta"],format_func=lambda k:"누적 수치" if k=="level" else "일별 증가분",horizontal=True,key="corr_kind")
+            corr_tab_a,corr_tab_c=st.tabs(["선택한 아티스트","전체 카탈로그"])
+            with corr_tab_a:
+                corr=get_correlation(a_id_adv,corr_kind)
+                if corr is not None:
+                    st.dataframe(corr.style.background_gradient(cmap="coolwarm"))
+                else:
+                    st.info("상관관계 분석을 위한 100,000 기준 이상의 데이터가 충분하지 않습니다.")
+            with corr_tab_c:
+                corr_all=get_correlation(None,corr_kind)
+                if corr_all is not None:
+                    st.dataframe(corr_all.style.background_gradient(cmap="coolwarm"))
+                else:
+                    st.info("카탈로그 전체 상관관계를 계산할 데이터가 아직 없습니다.")
     st.divider()
     st.subheader("확장 지표 통계")
     c1_stat,c2_stat,c3_stat=st.columns(3)
+    indicators=get_current_indicators(a_id_adv) if not artists.empty else {}
     with c1_stat:
         st.write("변동성 지수")
         for platform in ["youtube_views","spotify_streams","soundcloud_plays"]:
-            vol=calculate_volatility_index(metrics_adv,platform)
+            vol=indicators.get(platform,{}).get("volatility")
             if vol is not None:
                 st.metric(platform.replace("_"," ").title(),f"{vol}%")
             else:
@@ -184,7 +366,7 @@ with main_tab3:
     with c2_stat:
         st.write("7일 모멘텀 점수")
         for platform in ["youtube_views","spotify_streams","soundcloud_plays"]:
-            mom=calculate_momentum_score(metrics_adv,platform)
+            mom=indicators.get(platform,{}).get("momentum")
             if mom is None:
                 st.metric(platform.replace("_"," ").title(),"N/A")
             else:
@@ -197,6 +379,22 @@ with main_tab3:
                 st.metric(platform,f"{ratio}%")
         else:
             st.info("100,000 기준 이상의 데이터가 충분하지 않습니다.")
+    if not artists.empty:
+        ind_platform=st.selectbox("지표 추이 플랫폼",["youtube_views","spotify_streams","soundcloud_plays"],key="ind_platform")
+        ind_series=get_indicator_series(a_id_adv,ind_platform)
+        if not ind_series.dropna(how="all",subset=["volatility","momentum"]).empty:
+            st.line_chart(ind_series.set_index("date")[["volatility","momentum"]])
+        st.subheader("이상 징후")
+        kind_labels={"spike":"급등","drop":"급락","zero":"0으로 하락"}
+        alert_tab_a,alert_tab_c=st.tabs(["선택한 아티스트","전체 카탈로그"])
+        for alert_tab,alert_artist in ((alert_tab_a,a_id_adv),(alert_tab_c,None)):
+            with alert_tab:
+                alerts=get_alerts(alert_artist,days=90)
+                if alerts.empty:
+                    st.info("최근 90일 동안 감지된 이상 징후가 없습니다.")
+                else:
+                    alerts["kind"]=alerts["kind"].map(kind_labels).fillna(alerts["kind"])
+                    st.dataframe(alerts.drop(columns=["artist_id"]),hide_index=True,use_container_width=True)
     st.divider()
     st.subheader("데이터 엔지니어링: Airflow DAG 시뮬레이션")
     st.code(
@@ -212,3 +410,32 @@ with DAG('chartmetric_daily_sync',schedule_interval='@daily',start_date=datetime
 """,
         language="python"
     )
+
+
+with debug_box:
+    st.write(f"이번 재실행 소요 시간: {trace.elapsed()*1000:.0f} ms · 스팬 {len(trace.spans)}개")
+    trace_rows=summarize(trace)
+    if trace_rows:
+        st.dataframe(pd.DataFrame(trace_rows)[["kind","name","calls","total_ms","max_ms","rows","errors","fingerprint","sql"]],use_container_width=True)
+    qc=query_cache_stats()
+    if qc["enabled"]:
+        st.write(f"쿼리 결과 캐시: 적중률 {qc['hit_rate']}% ({qc['hits']}/{qc['hits']+qc['misses']}) · 항목 {qc['entries']}개 · {qc['bytes']/1e6:.1f}/{qc['max_bytes']/1e6:.0f} MB · 축출 {qc['evictions']} · 무효화 {qc['invalidations']}")
+    st.write(f"DB 연결(이 프로세스 누적): {connections_opened():,}개")
+    ms=STORE.stats()
+    if ms.get("rows") is not None:
+        st.write(f"지표 메모리 저장소: 세대 {ms['generation']} · 아티스트 {ms['artists']:,}명 · {ms['rows']:,}행 · {ms['bytes']/1e6:.1f} MB · {ms['source']} · 적재 {ms['loads']}회({ms['load_seconds']}s) · {ms['age_seconds']:.0f}초 전")
+    mem=typed_memory_stats()
+    if mem["frames"]:
+        st.write(f"지표 프레임 메모리(이 프로세스 누적): {mem['bytes_before']/1e6:.1f} MB → {mem['bytes_after']/1e6:.1f} MB ({mem['saved_pct']}% 절감) · 프레임 {mem['frames']}개 · {mem['rows']:,}행")
+    dl1,dl2=st.columns(2)
+    dl1.download_button("JSON lines 내보내기",to_jsonl(trace),file_name=f"trace_{trace.id}.jsonl",mime="application/json")
+    dl2.download_button("Prometheus 텍스트 내보내기",to_prometheus(trace),file_name=f"trace_{trace.id}.prom",mime="text/plain")
+    export_rerun(trace)
+    if prof is not None:
+        prof.stop()
+        st.write(f"프로파일: {prof.duration*1000:.0f} ms · 샘플 {prof.samples}개 ({prof.interval*1000:.0f} ms 간격)")
+        if prof.samples:
+            pc1,pc2=st.columns([1,2])
+            pc1.dataframe(pd.DataFrame(prof.by_module()),use_container_width=True,hide_index=True)
+            pc2.dataframe(pd.DataFrame(prof.top(20)),use_container_width=True,hide_index=True)
+            st.download_button("collapsed stack 내려받기 (flamegraph.pl·speedscope)",prof.collapsed(),file_name=f"profile_{trace.id}.folded",mime="text/plain")
@@ -0,0 +1,177 @@
+"""
+가사 카탈로그 전체를 오프라인으로 심사하는 배치 실행기입니다.
+
+모든 곡을 심사위원 전원에게 보내되 동시에 심사하는 곡 수(--concurrency)와 분당 시작 곡 수(--rate)를 제한하고,
+결과(점수, 코멘트, 제공자, 모델, 소요 시간)를 audition_results 테이블에 묶음 단위로 기록합니다.
+중단 후 다시 실행하면 이미 모든 심사위원의 결과가 있는 곡은 건너뜁니다.
+
+사용 예 (backend 디렉터리에서):
+    python batch_audition.py --concurrency 4 --rate 30
+    python batch_audition.py --lyrics-file lyrics.txt --no-tags --retry-errors
+"""
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from psycopg2.extras import execute_values
+from db import init_db, get_db_connection, df_query
+from services import JUDGES, evaluate_song, get_lastfm_data
+from scheduler import TokenBucket, SCHEDULER
+
+
+def load_songs(lyrics_file=None):
+    from lyrics import parse_lyrics, load_lyrics_catalog
+    if lyrics_file:
+        with open(lyrics_file, encoding="utf-8") as f:
+            return parse_lyrics(f.read())
+    return load_lyrics_catalog()
+
+
+def judged_songs(retry_errors=False):
+    """모든 심사위원의 결과가 이미 저장된 (artist, title) 집합을 반환합니다."""
+    cond = "WHERE state='완료'" if retry_errors else ""
+    df = df_query(
+        f"SELECT artist, title FROM audition_results {cond} GROUP BY artist, title HAVING COUNT(DISTINCT judge)>=%s;",
+        (len(JUDGES),),
+    )
+    return {(r["artist"], r["title"]) for _, r in df.iterrows()}
+
+
+def write_results(rows):
+    """심사 결과 행을 한 번의 execute_values로 upsert합니다."""
+    if not rows:
+        return 0
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            """
+            INSERT INTO audition_results
+              (artist, title, judge, provider, model, grade_hint, musicality, marketability, narrative, total, comment, latency, state)
+            VALUES %s
+            ON CONFLICT (artist, title, judge) DO UPDATE SET
+              provider=EXCLUDED.provider, model=EXCLUDED.model, grade_hint=EXCLUDED.grade_hint,
+              musicality=EXCLUDED.musicality, marketability=EXCLUDED.marketability, narrative=EXCLUDED.narrative,
+              total=EXCLUDED.total, comment=EXCLUDED.comment, latency=EXCLUDED.latency, state=EXCLUDED.state,
+              created_at=NOW();
+            """,
+            rows,
+            page_size=500,
+        )
+        conn.commit()
+        cursor.close()
+        return len(rows)
+    finally:
+        conn.close()
+
+
+def _rows_for(song, grade, results):
+    rows = []
+    for judge, r in results.items():
+        s = r["scores"]
+        rows.append((
+            song["artist"], song["title"], judge, r["provider"], r["model"], grade,
+            s["Musicality"], s["Marketability"], s["Narrative"], s["Total"], r["comment"], r["elapsed"], r["state"],
+        ))
+    return rows
+
+
+def run_batch(songs, concurrency=4, rate=30, grade="GOOD", use_tags=True, batch_size=20, retry_errors=False, limit=None):
+    done = judged_songs(retry_errors)
+    todo = []
+    seen = set()
+    for s in songs:
+        key = (s["artist"], s["title"])
+        if key in done or key in seen:
+            continue
+        seen.add(key)
+        todo.append(s)
+    if limit:
+        todo = todo[:limit]
+    print(f"카탈로그 {len(songs)}곡 · 완료 {len(done)}곡 건너뜀 · 심사 대상 {len(todo)}곡")
+    if not todo:
+        return 0
+
+    limiter = TokenBucket(rate, burst=concurrency)
+    buffer = []
+    buffer_lock = threading.Lock()
+    written = 0
+    failed = 0
+    t0 = time.time()
+
+    def judge(song):
+        limiter.acquire()
+        tags = get_lastfm_data(song["artist"], song["title"])[1] if use_tags else []
+        return song, evaluate_song(song, tags, grade)
+
+    def flush():
+        nonlocal written
+        with buffer_lock:
+            rows = list(buffer)
+            buffer.clear()
+        written += write_results(rows)
+
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [pool.submit(judge, s) for s in todo]
+        for i, fut in enumerate(as_completed(futures), 1):
+            try:
+                song, results = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"심사 실패: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            with buffer_lock:
+                buffer.extend(_rows_for(song, grade, results))
+                pending = len(buffer)
+            if pending >= batch_size * len(JUDGES):
+                flush()
+            if i % 10 == 0 or i == len(futures):
+                rate_now = i / max(time.time() - t0, 1e-9) * 60
+                print(f"[{i}/{len(futures)}] 기록 {written}행 · 실패 {failed}곡 · {rate_now:.1f}곡/분")
+                for p in SCHEDULER.stats():
+                    print(f"  {p['provider']}: 동시 한도 {p['limit']}/{p['max_concurrency']} · 진행 {p['in_flight']} · 대기 {p['waiting']} · 429 {p['throttled']}회")
+    except KeyboardInterrupt:
+        print("중단 요청: 완료된 결과를 기록하고 종료합니다. 다시 실행하면 이어서 진행합니다.")
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        flush()
+        pool.shutdown(wait=False, cancel_futures=True)
+    print(f"완료: {written}행 기록 · 실패 {failed}곡 · {time.time() - t0:.1f}s")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="가사 카탈로그 배치 심사")
+    parser.add_argument("--lyrics-file", help="S3 대신 읽을 로컬 가사 파일 ('Artist - Title:' 형식)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 심사하는 곡 수")
+    parser.add_argument("--rate", type=float, default=30, help="분당 시작하는 최대 곡 수 (0이면 제한 없음)")
+    parser.add_argument("--grade", default="GOOD", choices=["HIT", "GOOD", "SOLID", "BAD"])
+    parser.add_argument("--batch-size", type=int, default=20, help="몇 곡마다 DB에 기록할지")
+    parser.add_argument("--limit", type=int, help="이번 실행에서 심사할 최대 곡 수")
+    parser.add_argument("--no-tags", action="store_true", help="Last.fm 태그 조회 생략")
+    parser.add_argument("--retry-errors", action="store_true", help="오류(대체 점수)로 끝난 곡도 다시 심사")
+    args = parser.parse_args()
+
+    init_db()
+    songs = load_songs(args.lyrics_file)
+    try:
+        run_batch(
+            songs,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            grade=args.grade,
+            use_tags=not args.no_tags,
+            batch_size=args.batch_size,
+            retry_errors=args.retry_errors,
+            limit=args.limit,
+        )
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
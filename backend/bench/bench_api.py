@@ -0,0 +1,114 @@
+"""
+JSON API 동시 요청 벤치마크입니다.
+
+로컬 PostgreSQL에 연결된 api.py 서버(또는 --url로 지정한 서버)에 여러 스레드로 요청을 보내
+처리량과 지연 시간 백분위를 측정합니다. --revalidate를 주면 첫 응답의 ETag로 If-None-Match 요청을 보내
+304 경로의 비용도 측정합니다.
+
+사용 예 (backend 디렉터리에서):
+    python bench/bench_api.py --concurrency 16 --duration 20
+    python bench/bench_api.py --url http://localhost:8505 --revalidate
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import argparse
+import statistics
+import urllib.request
+import urllib.error
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+
+def _get(url, etag=None):
+    req = urllib.request.Request(url, headers={"Accept-Encoding": "gzip"})
+    if etag:
+        req.add_header("If-None-Match", etag)
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            resp.read()
+            status, tag = resp.status, resp.headers.get("ETag")
+    except urllib.error.HTTPError as e:
+        status, tag = e.code, e.headers.get("ETag")
+    return status, tag, time.perf_counter() - t0
+
+
+def _pct(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API 동시 요청 벤치마크")
+    parser.add_argument("--url", help="이미 실행 중인 서버 주소. 생략하면 임시 서버를 띄움")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--revalidate", action="store_true", help="ETag로 조건부 요청")
+    args = parser.parse_args()
+
+    server = None
+    base = args.url
+    if base is None:
+        from api import make_server
+        server = make_server("127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+    base = base.rstrip("/")
+
+    with urllib.request.urlopen(f"{base}/api/artists", timeout=30) as resp:
+        artists = json.loads(resp.read())
+    ids = [a["artist_id"] for a in artists] or [0]
+    paths = ["/api/artists"]
+    for a_id in ids[:200]:
+        paths += [
+            f"/api/artists/{a_id}/metrics?limit=365",
+            f"/api/artists/{a_id}/summary?days=30",
+            f"/api/artists/{a_id}/forecast?column=spotify_streams",
+        ]
+
+    etags = {}
+    lat = {}
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            kind = path.split("?")[0].rstrip("/").split("/")[-1]
+            status, tag, dt = _get(base + path, etags.get(path) if args.revalidate else None)
+            with lock:
+                lat.setdefault(kind, []).append(dt)
+                statuses[status] = statuses.get(status, 0) + 1
+                if tag:
+                    etags[path] = tag
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total = sum(statuses.values())
+    print(f"대상: {base} · 동시성 {args.concurrency} · {elapsed:.1f}s · 요청 {total} · {total / elapsed:.1f} req/s")
+    print(f"상태 코드: {dict(sorted(statuses.items()))}")
+    print(f"{'endpoint':12} {'n':>7} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9} {'mean(ms)':>9}")
+    for kind, values in sorted(lat.items()):
+        ms = [v * 1000 for v in values]
+        print(f"{kind:12} {len(ms):>7} {_pct(ms, 50):>9.1f} {_pct(ms, 95):>9.1f} {_pct(ms, 99):>9.1f} {statistics.mean(ms):>9.1f}")
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
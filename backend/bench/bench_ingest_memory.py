@@ -0,0 +1,107 @@
+"""
+대용량 CSV 수집 메모리 벤치마크입니다.
+
+시간 단위 합성 CSV 하나(generate_cmdata.write_large_csv)를 만들고, 파일 전체를 읽는 기존 방식(read_csv_smart 후 변환)과
+청크 파이프라인(data_processing.metric_chunks + 일별 합계 누적)을 각각 별도 프로세스에서 실행해
+tracemalloc 최대 할당량과 최대 RSS를 비교합니다. DB에는 쓰지 않습니다.
+
+사용 예 (backend 디렉터리에서):
+    python bench/bench_ingest_memory.py --rows 2000000
+    python bench/bench_ingest_memory.py --rows 5000000 --chunks 10000 50000 200000
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def run_full(path):
+    import pandas as pd
+    from data_processing import read_csv_smart
+    df = read_csv_smart(path)
+    df.columns = ["Date", "Value"] + list(df.columns[2:])
+    df["date"] = pd.to_datetime(df["Date"].astype(str).apply(lambda x: "".join(re.findall(r"\d+", x))[:8]), errors="coerce")
+    df["value"] = pd.to_numeric(df["Value"], errors="coerce")
+    final_df = df[["date", "value"]].dropna()
+    days = final_df.groupby("date")["value"].sum()
+    return len(final_df), len(days)
+
+
+def run_chunked(path, chunksize):
+    from data_processing import metric_chunks
+    rows, days = 0, None
+    for chunk in metric_chunks(path, chunksize):
+        sums = chunk.groupby("date")["value"].sum()
+        days = sums if days is None else days.add(sums, fill_value=0)
+        rows += len(chunk)
+    return rows, 0 if days is None else len(days)
+
+
+def child(variant, path, chunksize):
+    # 모듈 import(pandas 등)에 드는 메모리는 측정에서 빼기 위해 먼저 불러 둠
+    import data_processing  # noqa: F401
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows, days = run_full(path) if variant == "full" else run_chunked(path, chunksize)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "rows": rows,
+        "days": days,
+        "seconds": elapsed,
+        "peak_mb": peak / 1e6,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대용량 CSV 수집 메모리 벤치마크")
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--chunks", type=int, nargs="*", default=[10000, 50000, 200000])
+    parser.add_argument("--file", help="기존 CSV 사용 (생략하면 합성 파일 생성)")
+    parser.add_argument("--child", nargs=3, metavar=("VARIANT", "PATH", "CHUNK"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        variant, path, chunksize = args.child
+        child(variant, path, int(chunksize))
+        return
+
+    from generate_cmdata import write_large_csv
+    work = None
+    path = args.file
+    if path is None:
+        work = tempfile.mkdtemp(prefix="ingest_mem_")
+        path = os.path.join(work, "BigArtist_BigSong_Youtube_views.csv")
+        print(f"합성 파일 생성 중: {args.rows:,}행")
+        write_large_csv(path, args.rows)
+    try:
+        print(f"파일: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        print(f"{'variant':16} {'rows':>10} {'days':>7} {'sec':>7} {'peak(MB)':>9} {'rss(MB)':>9}")
+        for variant, chunk in [("full", 0)] + [("chunked", c) for c in args.chunks]:
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", variant, path, str(chunk)],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            label = variant if variant == "full" else f"chunk={chunk}"
+            print(f"{label:16} {r['rows']:>10,} {r['days']:>7,} {r['seconds']:>7.2f} {r['peak_mb']:>9.1f} {r['max_rss_mb']:>9.1f}")
+    finally:
+        if work:
+            os.remove(path)
+            os.rmdir(work)
+
+
+if __name__ == "__main__":
+    main()
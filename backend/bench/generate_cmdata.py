@@ -0,0 +1,118 @@
+"""
+합성 cmdata CSV 생성기입니다.
+
+backend/cmdata의 실제 내보내기 파일과 같은 형식(Artist_Song_Platform_metric.csv, UTF-8 BOM,
+'2025년 07월 27일' 형식의 날짜, 누적 수치 + 변동 열)으로 대량의 파일을 만듭니다.
+
+사용 예:
+    python bench/generate_cmdata.py --artists 1000 --days 1826 --out /tmp/cmdata_synth
+"""
+import os
+import argparse
+from datetime import date, timedelta
+import numpy as np
+
+# (파일명 플랫폼 토큰, 지표 토큰, 값 열 이름, 소수점 여부)
+PLATFORMS = [
+    ("Youtube", "views", "총 조회수", False),
+    ("Spotify", "streams", "Spotify 스트림", False),
+    ("SoundCloud", "plays", "총 재생 횟수", True),
+]
+
+SYLLABLES = ["ka", "ri", "no", "le", "ma", "su", "jin", "ta", "vo", "el", "ra", "mi", "on", "de", "yu", "han"]
+
+
+def _camel(rng, parts):
+    return "".join(str(rng.choice(SYLLABLES)).capitalize() for _ in range(parts))
+
+
+def artist_names(n, seed=0):
+    """언더스코어가 없는 CamelCase 아티스트/곡 이름 쌍을 n개 만듭니다. 이름 충돌은 번호로 구분합니다."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        artist = f"{_camel(rng, 2)}{_camel(rng, 1)}{i:04d}"
+        song = _camel(rng, int(rng.integers(1, 4)))
+        out.append((artist, song))
+    return out
+
+
+def generate_series(days, rng, base=None):
+    """
+    누적 지표 하나를 생성합니다. 발매 직후 성장률이 감쇠하고, 주간 계절성과 간헐적인 바이럴 급등,
+    드물게 0으로 떨어지는 수집 오류를 포함합니다. (누적값, 일별 변동) 배열을 반환합니다.
+    """
+    base = float(base if base is not None else rng.lognormal(11, 1.5))
+    t = np.arange(days)
+    decay = np.exp(-t / rng.uniform(120, 900))
+    weekly = 1.0 + 0.12 * np.sin(2 * np.pi * (t + rng.integers(0, 7)) / 7)
+    noise = rng.lognormal(0, 0.25, size=days)
+    spikes = np.where(rng.random(days) < 0.004, rng.uniform(3, 15, size=days), 1.0)
+    daily = base * (0.15 + decay) * weekly * noise * spikes
+    total = rng.lognormal(13, 2) + np.cumsum(daily)
+    change = np.diff(total, prepend=total[0])
+    glitch = rng.random(days) < 0.001
+    total = np.where(glitch, 0, total)
+    change = np.where(glitch, 0, change)
+    return total, change
+
+
+def write_csv(path, start, total, change, value_col, decimals):
+    lines = [f"날짜,{value_col},변동"]
+    for i, (v, c) in enumerate(zip(total, change)):
+        d = start + timedelta(days=i)
+        val = f"{v:.3f}" if decimals else f"{int(v)}"
+        lines.append(f"{d.year}년 {d.month:02d}월 {d.day:02d}일,{val},{int(c)}")
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def write_large_csv(path, rows, per_day=24, seed=0, value_col="총 조회수"):
+    """
+    시간 단위 데이터를 흉내 낸 큰 CSV 하나를 만듭니다(하루 per_day행, '2025년 07월 27일 13:00' 형식).
+    메모리를 아끼기 위해 한 줄씩 씁니다.
+    """
+    rng = np.random.default_rng(seed)
+    start = date.today() - timedelta(days=rows // per_day + 1)
+    total = float(rng.lognormal(13, 2))
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        f.write(f"날짜,{value_col},변동\n")
+        for i in range(rows):
+            d = start + timedelta(days=i // per_day)
+            change = float(rng.lognormal(6, 1))
+            total += change
+            f.write(f"{d.year}년 {d.month:02d}월 {d.day:02d}일 {i % per_day:02d}:00,{int(total)},{int(change)}\n")
+    return path
+
+
+def generate(out_dir, artists=100, days=365, seed=42, end=None):
+    """out_dir에 artists x 3개 플랫폼 CSV를 생성하고 생성된 경로 목록을 반환합니다."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    end = end or (date.today() - timedelta(days=1))
+    paths = []
+    for artist, song in artist_names(artists, seed):
+        for platform, metric, value_col, decimals in PLATFORMS:
+            # 실제 내보내기처럼 플랫폼마다 수집 시작일이 조금씩 다름
+            n = max(2, days - int(rng.integers(0, max(1, days // 10))))
+            start = end - timedelta(days=n - 1)
+            total, change = generate_series(n, rng)
+            path = os.path.join(out_dir, f"{artist}_{song}_{platform}_{metric}.csv")
+            write_csv(path, start, total, change, value_col, decimals)
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="합성 cmdata CSV 생성기")
+    parser.add_argument("--out", default="cmdata_synth")
+    parser.add_argument("--artists", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    paths = generate(args.out, args.artists, args.days, args.seed)
+    print(f"{len(paths)}개 파일 생성: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+대시보드 동시 세션 부하 테스트입니다.
+
+streamlit.testing.v1.AppTest로 app.py 세션 N개를 한 프로세스 안에서 동시에 띄우고, 각 세션이 아티스트·분석 기간·탭별 위젯을
+무작위로 바꿔 가며 재실행하게 합니다. 실제 서버처럼 세션들이 모듈·st.cache_*·쿼리 캐시·지표 저장소를 공유합니다.
+재실행 지연 백분위(동작별·전체), 새로 연 DB 연결 수, 세션당 메모리(RSS 증가분)를 보고합니다.
+
+심사위원은 JUDGE_PROVIDER=MOCK으로 외부 API 없이 응답하고, 가사는 LYRICS_FILE의 합성 파일을 읽습니다.
+--skip-seed가 없으면 PG_DB(PG_USER·PG_PASSWORD·PG_PORT)가 가리키는 DB에 합성 cmdata를 동기화하므로 운영 DB가 아닌 테스트용 DB를 지정하세요.
+data_processing은 PG_HOST를 localhost로 고정하므로 테스트용 DB도 같은 머신의 PostgreSQL에 있어야 합니다.
+
+사용 예 (backend 디렉터리에서):
+    python bench/load_test.py --sessions 8 --actions 20
+    python bench/load_test.py --sessions 32 --actions 50 --skip-seed --json load_32.json
+    python bench/load_test.py --sessions 4 --audition 0.1          # 10% 확률로 오디션 실행(MOCK 심사위원)
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(BACKEND_DIR, "app.py")
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+# services·data_processing을 import하기 전에 설정해야 적용됨
+os.environ.setdefault("JUDGE_PROVIDER", "MOCK")
+os.environ.setdefault("MOCK_JUDGE_TOKEN_MS", "5")
+
+from generate_cmdata import generate, artist_names  # noqa: E402
+
+# (동작 이름, 위젯 종류, 라벨, 라디오 값 목록). 라디오는 표시 문자열이 아닌 실제 값으로 골라야 함
+ACTIONS = [
+    ("artist", "selectbox", "아티스트 프로필 선택", None),
+    ("period", "selectbox", "분석 기간", None),
+    ("rank", "radio", "순위 기준", ["fire", "accel", "stab"]),
+    ("forecast", "selectbox", "예측 플랫폼", None),
+    ("correlation", "radio", "기준", ["level", "delta"]),
+    ("indicator", "selectbox", "지표 추이 플랫폼", None),
+    ("telemetry", "selectbox", "집계 기간(일)", None),
+]
+AUDITION_BUTTON = "글로벌 오디션 시작"
+
+
+def _rss():
+    """현재 프로세스의 상주 메모리(바이트). /proc이 없으면 최대 RSS로 대신합니다."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _pct(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def write_lyrics(path, songs=5, seed=0):
+    """parse_lyrics 형식('아티스트 - 곡명:' 다음 줄부터 가사)의 합성 가사 파일을 만듭니다."""
+    with open(path, "w", encoding="utf-8") as f:
+        for artist, song in artist_names(songs, seed):
+            f.write(f"{artist} - {song}:\n")
+            f.write("밤하늘 아래 우리 둘이 걷던 길\n아직도 그 노래가 들려와\n다시 만날 그날까지 기다릴게\n\n")
+    return path
+
+
+def seed_database(artists, days, seed):
+    """합성 cmdata를 임시 폴더에 만들어 앱과 같은 동기화 경로(sync_files)로 적재합니다."""
+    import db
+    import data_processing
+    # 빈 테스트용 DB에서도 동기화가 쓰는 테이블이 있도록 앱 시작과 같은 초기화를 먼저 실행
+    db.ensure_database_exists()
+    db.init_db()
+    out_dir = tempfile.mkdtemp(prefix="loadtest_cmdata_")
+    generate(out_dir, artists, days, seed)
+    data_processing.FOLDER_PATH = out_dir
+    t0 = time.perf_counter()
+    ok, failed = data_processing.sync_files()
+    print(f"시드: 아티스트 {artists}명 x {days}일 · 파일 {ok}개 성공, {failed}개 실패 ({time.perf_counter() - t0:.1f}s)")
+
+
+def _widget(at, kind, label):
+    return next((w for w in getattr(at, kind) if w.label == label), None)
+
+
+def _pick(at, rng, audition):
+    """이번 재실행에서 바꿀 위젯을 고르고, 값을 바꾼 위젯(.run() 가능)과 동작 이름을 반환합니다."""
+    if audition and rng.random() < audition:
+        button = _widget(at, "button", AUDITION_BUTTON)
+        if button is not None:
+            return "audition", button.click()
+    for name, kind, label, values in rng.sample(ACTIONS, len(ACTIONS)):
+        w = _widget(at, kind, label)
+        if w is None:
+            continue
+        if kind == "radio":
+            return name, w.set_value(rng.choice(values))
+        if w.options:
+            return name, w.select_index(rng.randrange(len(w.options)))
+    return None, None
+
+
+class Session:
+    def __init__(self, index, args):
+        from streamlit.testing.v1 import AppTest
+        self.index = index
+        self.args = args
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+        self.samples = []
+        self.errors = []
+
+    def _timed(self, name, run):
+        t0 = time.perf_counter()
+        try:
+            at = run()
+        except Exception as e:
+            self.errors.append((name, f"{type(e).__name__}: {e}"))
+            return
+        self.samples.append((name, time.perf_counter() - t0))
+        for exc in at.exception:
+            self.errors.append((name, exc.value if hasattr(exc, "value") else str(exc)))
+
+    def start(self):
+        self._timed("initial", self.at.run)
+
+    def act(self):
+        for _ in range(self.args.actions):
+            name, widget = _pick(self.at, self.rng, self.args.audition)
+            if widget is None:
+                self._timed("rerun", self.at.run)
+            else:
+                self._timed(name, widget.run)
+            if self.args.think:
+                time.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+
+def _latency_rows(samples):
+    groups = {}
+    for name, sec in samples:
+        groups.setdefault(name, []).append(sec * 1000)
+    groups["(전체)"] = [sec * 1000 for _, sec in samples]
+    return [
+        {
+            "action": name,
+            "runs": len(ms),
+            "p50_ms": round(_pct(ms, 50), 1),
+            "p95_ms": round(_pct(ms, 95), 1),
+            "p99_ms": round(_pct(ms, 99), 1),
+            "max_ms": round(max(ms), 1),
+        }
+        for name, ms in sorted(groups.items(), key=lambda kv: -len(kv[1]))
+        if ms
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 동시 세션 부하 테스트 (streamlit AppTest)")
+    parser.add_argument("--sessions", type=int, default=8, help="동시 세션 수")
+    parser.add_argument("--actions", type=int, default=20, help="세션마다 위젯을 바꿔 재실행하는 횟수")
+    parser.add_argument("--think", type=float, default=0.0, help="동작 사이 평균 대기(초)")
+    parser.add_argument("--audition", type=float, default=0.0, help="동작마다 오디션 버튼을 누를 확률 (0~1)")
+    parser.add_argument("--artists", type=int, default=50, help="시드할 합성 아티스트 수")
+    parser.add_argument("--days", type=int, default=365, help="시드할 일수")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="이미 적재된 DB를 그대로 사용")
+    parser.add_argument("--timeout", type=float, default=120.0, help="재실행 한 번의 제한 시간(초)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    if "LYRICS_FILE" not in os.environ:
+        os.environ["LYRICS_FILE"] = write_lyrics(os.path.join(tempfile.mkdtemp(prefix="loadtest_"), "lyrics.txt"))
+    if not args.skip_seed:
+        seed_database(args.artists, args.days, args.seed)
+
+    from db import connections_opened
+
+    # 모듈 import·캐시 워밍업이 첫 세션의 지연과 메모리에 섞이지 않도록 한 번 먼저 실행
+    warm = Session(-1, args)
+    warm.start()
+    if warm.errors:
+        print(f"워밍업 실행 오류: {warm.errors[0][1]}")
+    del warm
+    gc.collect()
+
+    rss_base = _rss()
+    conn_base = connections_opened()
+    sessions = [Session(i, args) for i in range(args.sessions)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(Session.start, sessions))
+    gc.collect()
+    rss_started = _rss()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(Session.act, sessions))
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    rss_end = _rss()
+    conns = connections_opened() - conn_base
+
+    samples = [s for sess in sessions for s in sess.samples]
+    errors = [e for sess in sessions for e in sess.errors]
+    rows = _latency_rows(samples)
+    result = {
+        "sessions": args.sessions,
+        "actions_per_session": args.actions,
+        "reruns": len(samples),
+        "elapsed_s": round(elapsed, 1),
+        "reruns_per_s": round(len(samples) / elapsed, 2) if elapsed else None,
+        "latency": rows,
+        "db_connections": conns,
+        "db_connections_per_rerun": round(conns / len(samples), 2) if samples else None,
+        "rss_base_mb": round(rss_base / 1e6, 1),
+        "rss_per_session_mb": round((rss_started - rss_base) / 1e6 / max(1, args.sessions), 2),
+        "rss_end_mb": round(rss_end / 1e6, 1),
+        "errors": len(errors),
+    }
+
+    print(f"\n세션 {args.sessions}개 · 재실행 {len(samples)}회 · {elapsed:.1f}s ({result['reruns_per_s']}회/s)")
+    print(f"{'동작':<14}{'횟수':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'최대':>10}  (ms)")
+    for r in rows:
+        print(f"{r['action']:<14}{r['runs']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+    print(f"DB 연결: {conns}개 (재실행당 {result['db_connections_per_rerun']})")
+    print(f"메모리: 기준 {result['rss_base_mb']} MB · 세션당 {result['rss_per_session_mb']} MB · 종료 시 {result['rss_end_mb']} MB")
+    if errors:
+        print(f"오류 {len(errors)}건 (처음 5건):")
+        for name, msg in errors[:5]:
+            print(f"  [{name}] {msg}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+수집·분석 경로 성능 벤치마크입니다.
+
+합성 cmdata(generate_cmdata.py)를 만들어 read_csv_smart, process_and_upload_excel, load_cmdata.py,
+get_artist_metrics_cached, calculate_* 함수의 실행 시간을 측정하고 bench/baselines.json과 비교합니다.
+DB가 필요한 항목은 PostgreSQL에 연결할 수 없으면 SKIP으로 표시됩니다. DB에 쓰는 항목(process_and_upload_excel,
+load_cmdata)은 --scratch-db로 벤치마크 전용 DB 이름을 줄 때만 실행되며, 이 DB는 새로 만들고 끝나면 지웁니다
+(조회 항목도 그 DB를 읽음). 의존성 누락·SKIP 외의 오류는 FAIL로 표시되고 종료 코드 1을 반환합니다.
+
+사용 예 (backend 디렉터리에서):
+    python bench/run_benchmarks.py --scale small
+    python bench/run_benchmarks.py --scale full --save-baseline --scratch-db music_bench
+    python bench/run_benchmarks.py --scale small --threshold 0.25 --scratch-db music_bench
+"""
+import os
+import sys
+import json
+import time
+import glob
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+REPO_DIR = os.path.dirname(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generate_cmdata import generate, generate_series  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+# 규모별 설정: 분석용 아티스트 수 x 일수, DB 수집용 아티스트 수
+SCALES = {
+    "small": {"artists": 20, "days": 365, "ingest_artists": 5},
+    "medium": {"artists": 200, "days": 1095, "ingest_artists": 50},
+    "full": {"artists": 1000, "days": 1826, "ingest_artists": 1000},
+}
+
+
+class Skip(Exception):
+    pass
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+def _require_db():
+    try:
+        from db import get_db_connection
+        get_db_connection(max_retries=1).close()
+    except Exception as e:
+        raise Skip(f"DB 연결 불가: {e}")
+
+
+def _require_scratch(ctx):
+    if not ctx.get("scratch_db"):
+        raise Skip("DB에 쓰는 항목: --scratch-db 필요")
+    _require_db()
+
+
+def _admin_connection():
+    # 벤치마크용 DB를 만들고 지우기 위한 관리 연결 (data_processing과 같이 호스트는 localhost)
+    import psycopg2
+    conn = psycopg2.connect(
+        host="localhost",
+        port=int(os.getenv("PG_PORT", "5432")),
+        user=os.getenv("PG_USER", "postgres"),
+        password=os.getenv("PG_PASSWORD", "postgres"),
+        dbname="postgres",
+        connect_timeout=10,
+    )
+    conn.autocommit = True
+    return conn
+
+
+def create_scratch_db(name):
+    """
+    벤치마크 전용 DB를 새로 만들고 PG_DB를 그쪽으로 돌립니다. 이미 있는 DB는 운영 데이터일 수 있으므로 거부합니다.
+    db·data_processing을 import하기 전에 호출해야 합니다.
+    """
+    conn = _admin_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM pg_database WHERE datname=%s;", (name,))
+        if cursor.fetchone():
+            raise SystemExit(f"--scratch-db '{name}'가 이미 존재합니다. 지워도 되는 새 이름을 지정하세요.")
+        cursor.execute(f'CREATE DATABASE "{name}";')
+    finally:
+        conn.close()
+    os.environ["PG_DB"] = name
+    os.environ["POSTGRES_DB"] = name
+    from db import init_db
+    init_db()
+
+
+def drop_scratch_db(name):
+    conn = _admin_connection()
+    try:
+        conn.cursor().execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE);')
+    finally:
+        conn.close()
+
+
+def _metrics_frames(artists, days):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(7)
+    dates = pd.date_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=days)
+    frames = []
+    for _ in range(artists):
+        frames.append(pd.DataFrame({
+            "date": dates,
+            "youtube_views": generate_series(days, rng)[0].astype("int64"),
+            "spotify_streams": generate_series(days, rng)[0].astype("int64"),
+            "soundcloud_plays": generate_series(days, rng)[0].astype("int64"),
+        }))
+    return frames
+
+
+def bench_read_csv_smart(ctx):
+    try:
+        from data_processing import read_csv_smart
+    except ImportError as e:
+        raise Skip(f"의존성 누락: {e}")
+    files = ctx["files"][:300]
+    return lambda: [read_csv_smart(p) for p in files]
+
+
+def bench_calculate(name):
+    def factory(ctx):
+        import analytics
+        fn = getattr(analytics, name)
+        frames = ctx["frames"]
+        if name == "calculate_engagement_ratio":
+            return lambda: [fn(df) for df in frames]
+        return lambda: [fn(df, c) for df in frames for c in ("youtube_views", "spotify_streams", "soundcloud_plays")]
+    return factory
+
+
+def bench_process_and_upload_excel(ctx):
+    _require_scratch(ctx)
+    import data_processing
+    data_processing.FOLDER_PATH = ctx["ingest_dir"]
+    return data_processing.process_and_upload_excel
+
+
+def bench_load_cmdata(ctx):
+    _require_scratch(ctx)
+    env = dict(os.environ, CM_PATH=ctx["ingest_dir"])
+    script = os.path.join(REPO_DIR, "load_cmdata.py")
+    return lambda: subprocess.run([sys.executable, script], env=env, check=True, capture_output=True)
+
+
+def bench_get_artist_metrics_cached(ctx):
+    _require_db()
+    from db import df_query
+    from analytics import get_artist_metrics_cached
+    ids = df_query("SELECT id FROM artists ORDER BY id LIMIT 200;")["id"].astype(int).tolist()
+    if not ids:
+        raise Skip("artists 테이블이 비어 있음")
+
+    def run():
+        get_artist_metrics_cached.clear()
+        for a_id in ids:
+            for days in (7, 30, 90, 180):
+                get_artist_metrics_cached(a_id, days)
+    return run
+
+
+
+def bench_get_metrics_for_artists(ctx):
+    _require_db()
+    from db import df_query
+    from analytics import get_metrics_for_artists
+    ids = tuple(df_query("SELECT id FROM artists ORDER BY id LIMIT 200;")["id"].astype(int).tolist())
+    if not ids:
+        raise Skip("artists 테이블이 비어 있음")
+
+    def run():
+        get_metrics_for_artists.clear()
+        for days in (7, 30, 90, 180):
+            get_metrics_for_artists(ids, days)
+    return run
+
+
+def bench_compact_frame(ctx):
+    import pandas as pd
+    from db import compact_frame, frame_memory
+    frames = ctx["frames"]
+    if not frames:
+        raise Skip("pandas 없음")
+    raw = pd.concat(
+        [f.assign(artist=f"Artist{i:05d}", date=f["date"].dt.date) for i, f in enumerate(frames)],
+        ignore_index=True,
+    )
+    raw = raw.astype({c: "float64" for c in ("youtube_views", "spotify_streams", "soundcloud_plays")}).astype({"artist": object})
+    cols = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+    typed = compact_frame(raw.copy(), categories=("artist",), numeric=cols, fill=0)
+    before, after = frame_memory(raw), frame_memory(typed)
+    print(f"compact_frame: {len(raw):,}행 {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({(1 - after / before) * 100:.0f}% 절감)")
+    return lambda: compact_frame(raw.copy(), categories=("artist",), numeric=cols, fill=0)
+
+
+CASES = [
+    ("read_csv_smart", bench_read_csv_smart),
+    ("calculate_engagement_ratio", bench_calculate("calculate_engagement_ratio")),
+    ("calculate_volatility_index", bench_calculate("calculate_volatility_index")),
+    ("calculate_momentum_score", bench_calculate("calculate_momentum_score")),
+    ("process_and_upload_excel", bench_process_and_upload_excel),
+    ("load_cmdata", bench_load_cmdata),
+    ("get_artist_metrics_cached", bench_get_artist_metrics_cached),
+    ("get_metrics_for_artists", bench_get_metrics_for_artists),
+    ("compact_frame", bench_compact_frame),
+]
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baselines(data):
+    with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+def report(results, baseline, threshold):
+    """측정값을 기준선과 비교한 표를 출력하고 회귀가 있었는지 반환합니다."""
+    regressed = False
+    print(f"{'case':32} {'median(s)':>10} {'baseline':>10} {'ratio':>7}  status")
+    for name, res in results.items():
+        if "skip" in res:
+            print(f"{name:32} {'-':>10} {'-':>10} {'-':>7}  SKIP ({res['skip']})")
+            continue
+        if "error" in res:
+            print(f"{name:32} {'-':>10} {'-':>10} {'-':>7}  FAIL ({res['error']})")
+            continue
+        base = baseline.get(name)
+        if base is None:
+            status, ratio = "NEW", "-"
+        else:
+            r = res["median"] / base["median"] if base["median"] > 0 else float("inf")
+            ratio = f"{r:.2f}"
+            if r > 1 + threshold:
+                status = "REGRESSION"
+                regressed = True
+            elif r < 1 - threshold:
+                status = "IMPROVED"
+            else:
+                status = "OK"
+        base_txt = f"{base['median']:.4f}" if base else "-"
+        print(f"{name:32} {res['median']:>10.4f} {base_txt:>10} {ratio:>7}  {status}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수집·분석 성능 벤치마크")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.2, help="기준선 대비 허용 변화율 (0.2 = 20%%)")
+    parser.add_argument("--only", nargs="*", help="실행할 항목 이름")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="생성한 합성 CSV와 --scratch-db를 지우지 않음")
+    parser.add_argument("--scratch-db", help="DB에 쓰는 항목을 실행할 새 벤치마크 전용 DB 이름 (끝나면 삭제)")
+    args = parser.parse_args()
+
+    cfg = SCALES[args.scale]
+    if args.scratch_db:
+        create_scratch_db(args.scratch_db)
+    work = tempfile.mkdtemp(prefix="cmdata_bench_")
+    try:
+        print(f"합성 데이터 생성 중: {cfg['artists']} 아티스트 x 3 플랫폼 x {cfg['days']}일 ({work})")
+        files = generate(os.path.join(work, "all"), cfg["artists"], cfg["days"])
+        ingest_dir = os.path.join(work, "ingest")
+        os.makedirs(ingest_dir)
+        for p in sorted(glob.glob(os.path.join(work, "all", "*.csv")))[: cfg["ingest_artists"] * 3]:
+            shutil.copy(p, ingest_dir)
+        ctx = {"files": files, "ingest_dir": ingest_dir, "scratch_db": args.scratch_db}
+        try:
+            ctx["frames"] = _metrics_frames(min(cfg["artists"], 200), cfg["days"])
+        except ImportError:
+            ctx["frames"] = []
+
+        results = {}
+        for name, factory in CASES:
+            if args.only and name not in args.only:
+                continue
+            try:
+                fn = factory(ctx)
+                runs = timed(fn, args.repeat)
+                results[name] = {"median": statistics.median(runs), "min": min(runs), "runs": len(runs)}
+            except Skip as e:
+                results[name] = {"skip": str(e)}
+            except ImportError as e:
+                results[name] = {"skip": f"의존성 누락: {e}"}
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+
+        baselines = load_baselines()
+        regressed = report(results, baselines.get(args.scale, {}), args.threshold)
+        if args.save_baseline:
+            scale_base = baselines.setdefault(args.scale, {})
+            scale_base.update({k: v for k, v in results.items() if "median" in v})
+            save_baselines(baselines)
+            print(f"기준선 저장: {BASELINE_PATH}")
+        failed = any("error" in v for v in results.values())
+        sys.exit(1 if failed or (regressed and not args.save_baseline) else 0)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+            if args.scratch_db:
+                drop_scratch_db(args.scratch_db)
+
+
+if __name__ == "__main__":
+    main()
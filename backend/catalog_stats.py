@@ -0,0 +1,146 @@
+import json
+import pandas as pd
+from db import get_db_connection, df_query
+
+TABLES = ["artists", "artist_growth_data", "daily_metrics"]
+
+
+def _upsert(cursor, scope, name, row_count, min_date=None, max_date=None, detail=None):
+    cursor.execute(
+        """
+        INSERT INTO catalog_stats (scope, name, row_count, min_date, max_date, detail, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (scope, name) DO UPDATE SET
+          row_count=EXCLUDED.row_count, min_date=EXCLUDED.min_date, max_date=EXCLUDED.max_date,
+          detail=EXCLUDED.detail, updated_at=NOW();
+        """,
+        (scope, name, row_count, min_date, max_date, detail),
+    )
+
+
+def _refresh_totals(cursor):
+    """아티스트별 통계 행을 합산해 테이블 전체 행 수와 날짜 범위를 갱신합니다. 원본 테이블은 스캔하지 않습니다."""
+    for scope, table in (("artist_growth", "artist_growth_data"), ("artist_metrics", "daily_metrics")):
+        cursor.execute(
+            "SELECT COALESCE(SUM(row_count),0), MIN(min_date), MAX(max_date) FROM catalog_stats WHERE scope=%s;",
+            (scope,),
+        )
+        _upsert(cursor, "table", table, *cursor.fetchone())
+    cursor.execute("SELECT COUNT(*) FROM artists;")
+    _upsert(cursor, "table", "artists", cursor.fetchone()[0])
+
+
+def _refresh_artist(cursor, artist_name):
+    cursor.execute(
+        "SELECT COUNT(*), MIN(date), MAX(date) FROM artist_growth_data WHERE artist_name=%s;",
+        (artist_name,),
+    )
+    _upsert(cursor, "artist_growth", artist_name, *cursor.fetchone())
+    cursor.execute(
+        "SELECT COUNT(*), MIN(m.date), MAX(m.date) FROM daily_metrics m JOIN artists a ON a.id=m.artist_id WHERE a.name=%s;",
+        (artist_name,),
+    )
+    _upsert(cursor, "artist_metrics", artist_name, *cursor.fetchone())
+
+
+def refresh_artist_stats(artist_names):
+    """수집된 아티스트의 행 수·날짜 범위를 인덱스 조회로 다시 세고 테이블 합계를 갱신합니다."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for name in artist_names:
+            _refresh_artist(cursor, name)
+        _refresh_totals(cursor)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def drop_artist_stats(artist_names):
+    """삭제된 아티스트의 통계 행을 지우고 테이블 합계를 갱신합니다."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM catalog_stats WHERE scope IN ('artist_growth','artist_metrics') AND name = ANY(%s);",
+            (list(artist_names),),
+        )
+        _refresh_totals(cursor)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def record_sync(folder, files):
+    """동기화 시각과 폴더의 CSV 파일 수(및 앞 10개 파일명)를 기록합니다."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        _upsert(cursor, "sync", "folder", len(files), detail=json.dumps({"path": folder, "files": sorted(files)[:10]}, ensure_ascii=False))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def rebuild_catalog_stats():
+    """모든 아티스트의 통계를 처음부터 다시 계산합니다. 외부 로더(load_cmdata.py) 실행 후 수동으로 사용합니다."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM catalog_stats WHERE scope IN ('artist_growth','artist_metrics');")
+        cursor.execute(
+            """
+            INSERT INTO catalog_stats (scope, name, row_count, min_date, max_date, updated_at)
+            SELECT 'artist_growth', artist_name, COUNT(*), MIN(date), MAX(date), NOW()
+            FROM artist_growth_data WHERE artist_name IS NOT NULL GROUP BY artist_name;
+            """
+        )
+        cursor.execute(
+            """
+            INSERT INTO catalog_stats (scope, name, row_count, min_date, max_date, updated_at)
+            SELECT 'artist_metrics', a.name, COUNT(*), MIN(m.date), MAX(m.date), NOW()
+            FROM daily_metrics m JOIN artists a ON a.id=m.artist_id GROUP BY a.name;
+            """
+        )
+        _refresh_totals(cursor)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def load_catalog_stats():
+    """
+    디버그 패널용 통계를 한 번의 조회로 읽어옵니다.
+    통계 행이 아직 없는 테이블은 pg_class.reltuples 추정치로 대체하고 estimated=True로 표시합니다.
+    """
+    df = df_query(
+        """
+        SELECT 'stats' AS src, scope, name, row_count, min_date, max_date, detail, updated_at
+        FROM catalog_stats WHERE scope IN ('table','sync')
+        UNION ALL
+        SELECT 'estimate', 'table', relname::text, GREATEST(reltuples,0)::bigint, NULL, NULL, NULL, NULL
+        FROM pg_class WHERE relkind='r' AND relname = ANY(%s);
+        """,
+        (TABLES,),
+    )
+    tables = {}
+    sync = None
+    for _, r in df.iterrows():
+        if r["scope"] == "sync":
+            detail = json.loads(r["detail"]) if r["detail"] else {}
+            sync = {"file_count": int(r["row_count"]), "files": detail.get("files", []), "path": detail.get("path"), "last_sync": r["updated_at"]}
+            continue
+        if r["src"] == "estimate" and r["name"] in tables:
+            continue
+        tables[r["name"]] = {
+            "row_count": int(r["row_count"]),
+            "min_date": None if pd.isna(r["min_date"]) else r["min_date"],
+            "max_date": None if pd.isna(r["max_date"]) else r["max_date"],
+            "estimated": r["src"] == "estimate",
+            "updated_at": None if pd.isna(r["updated_at"]) else r["updated_at"],
+        }
+    return {"tables": tables, "sync": sync}
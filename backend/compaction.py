@@ -0,0 +1,247 @@
+"""
+artist_growth_data 압축(중복 제거 + 재작성) 작업입니다.
+
+(아티스트, 곡, 정규화된 플랫폼, 날짜)마다 한 행만 남기고(누적 수치이므로 가장 큰 값),
+정렬된 순서로 새 테이블에 다시 쓴 뒤 짧은 배타 잠금으로 교체합니다. 복사하는 동안에는 SHARE 잠금만 잡으므로
+대시보드 조회는 막히지 않고 쓰기만 잠시 대기합니다. 실행 전후의 dead tuple·크기를 pg_stat_user_tables로 보고합니다.
+
+사용 예 (backend 디렉터리에서):
+    python compaction.py --dry-run
+    python compaction.py
+    python compaction.py --interval 3600 --min-duplicates 1000 --min-dead-ratio 0.2
+"""
+import re
+import time
+import argparse
+from db import get_db_connection, bump_generation, INGEST_LOCK_KEY
+
+TABLE = "artist_growth_data"
+TMP_TABLE = "artist_growth_data_compact"
+OLD_TABLE = "artist_growth_data_old"
+SWAP_LOCK_TIMEOUT = "5s"
+
+# 엑셀 수집 경로의 표기(YouTube/Spotify/SoundCloud)를 기준으로 load_cmdata.py의 표기를 맞춤
+PLATFORM_SQL = """
+CASE lower(metric_type)
+  WHEN 'youtube' THEN 'YouTube' WHEN 'youtube_views' THEN 'YouTube'
+  WHEN 'spotify' THEN 'Spotify' WHEN 'spotify_streams' THEN 'Spotify'
+  WHEN 'soundcloud' THEN 'SoundCloud' WHEN 'soundcloud_plays' THEN 'SoundCloud'
+  ELSE metric_type
+END
+"""
+
+
+def _columns(cursor, table=TABLE):
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position;",
+        (table,),
+    )
+    return [r[0] for r in cursor.fetchall()]
+
+
+def _song_expr(cols):
+    """곡 이름 열: 엑셀 경로는 song_name, load_cmdata.py는 track_name에 씁니다."""
+    names = [c for c in ("song_name", "track_name") if c in cols]
+    if not names:
+        return "NULL::text"
+    return names[0] if len(names) == 1 else f"COALESCE({', '.join(names)})"
+
+
+def table_health(cursor, table=TABLE):
+    """pg_stat_user_tables의 live/dead tuple 수와 테이블·인덱스 전체 크기를 반환합니다."""
+    cursor.execute(
+        """
+        SELECT n_live_tup, n_dead_tup, pg_total_relation_size(relid), pg_relation_size(relid),
+               last_vacuum, last_autovacuum, last_analyze, last_autoanalyze
+        FROM pg_stat_user_tables WHERE relname = %s AND schemaname = current_schema();
+        """,
+        (table,),
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    live, dead = int(row[0]), int(row[1])
+    return {
+        "live_tuples": live,
+        "dead_tuples": dead,
+        "dead_ratio": round(dead / (live + dead), 3) if live + dead else 0.0,
+        "total_bytes": int(row[2]),
+        "heap_bytes": int(row[3]),
+        "last_vacuum": row[4] or row[5],
+        "last_analyze": row[6] or row[7],
+    }
+
+
+def count_duplicates(cursor):
+    """정규화된 키 기준으로 지울 수 있는 행 수를 반환합니다."""
+    song = _song_expr(_columns(cursor))
+    cursor.execute(
+        f"SELECT COUNT(*) - COUNT(DISTINCT (artist_name, {song}, {PLATFORM_SQL}, date)) FROM {TABLE};"
+    )
+    return int(cursor.fetchone()[0])
+
+
+def _index_defs(cursor):
+    """원본 테이블의 인덱스 정의와 (있으면) 그 인덱스를 쓰는 PK/UNIQUE 제약을 반환합니다."""
+    cursor.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(x.indexrelid), c.conname, c.contype
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+        WHERE x.indrelid = %s::regclass;
+        """,
+        (TABLE,),
+    )
+    return cursor.fetchall()
+
+
+def _rewrite(cursor):
+    """정렬·중복 제거된 사본을 만들고 원본과 교체합니다. 호출자가 트랜잭션을 커밋합니다."""
+    cols = _columns(cursor)
+    song = _song_expr(cols)
+    select_cols = []
+    for c in cols:
+        if c == "metric_type":
+            select_cols.append(f"{PLATFORM_SQL} AS metric_type")
+        elif c in ("song_name", "track_name"):
+            select_cols.append(f"{song} AS {c}")
+        else:
+            select_cols.append(c)
+
+    # 복사하는 동안 쓰기만 막고 읽기는 허용
+    cursor.execute(f"LOCK TABLE {TABLE} IN SHARE MODE;")
+    cursor.execute(f"DROP TABLE IF EXISTS {TMP_TABLE};")
+    cursor.execute(f"CREATE TABLE {TMP_TABLE} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);")
+    cursor.execute(
+        f"""
+        INSERT INTO {TMP_TABLE} ({', '.join(cols)})
+        SELECT {', '.join(select_cols)} FROM (
+          SELECT DISTINCT ON (artist_name, {song}, {PLATFORM_SQL}, date) *
+          FROM {TABLE}
+          ORDER BY artist_name, {song}, {PLATFORM_SQL}, date, value DESC NULLS LAST, id DESC
+        ) d
+        ORDER BY artist_name, {song}, {PLATFORM_SQL}, date;
+        """
+    )
+    kept = cursor.rowcount
+
+    # 인덱스는 데이터를 넣은 뒤 임시 이름으로 한 번에 만듦 (인덱스 이름은 스키마 안에서 유일해야 함)
+    renames = []
+    for name, indexdef, conname, contype in _index_defs(cursor):
+        tmp_name = f"{name}_c"
+        ddl = re.sub(
+            rf"INDEX {re.escape(name)} ON (\S+\.)?{TABLE}\b",
+            f"INDEX {tmp_name} ON {TMP_TABLE}",
+            indexdef,
+            count=1,
+        )
+        cursor.execute(ddl)
+        if contype in ("p", "u"):
+            kind = "PRIMARY KEY" if contype == "p" else "UNIQUE"
+            cursor.execute(f"ALTER TABLE {TMP_TABLE} ADD CONSTRAINT {conname}_c {kind} USING INDEX {tmp_name};")
+            renames.append(("constraint", f"{conname}_c", conname))
+        else:
+            renames.append(("index", tmp_name, name))
+
+    # 교체: 짧은 배타 잠금. 오래 기다리면 포기하고 전체 롤백
+    cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}';")
+    cursor.execute(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE;")
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id');", (TABLE,))
+    seq = cursor.fetchone()[0]
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE};")
+    cursor.execute(f"ALTER TABLE {TMP_TABLE} RENAME TO {TABLE};")
+    if seq:
+        # SERIAL 시퀀스는 원본 열에 소속되어 있어 원본을 지우면 함께 지워지므로 소유권을 옮김
+        cursor.execute(f"ALTER SEQUENCE {seq} OWNED BY {TABLE}.id;")
+    cursor.execute(f"DROP TABLE {OLD_TABLE};")
+    for kind, tmp_name, name in renames:
+        if kind == "constraint":
+            cursor.execute(f"ALTER TABLE {TABLE} RENAME CONSTRAINT {tmp_name} TO {name};")
+        else:
+            cursor.execute(f"ALTER INDEX {tmp_name} RENAME TO {name};")
+    return kept
+
+
+def compact(dry_run=False, min_duplicates=0, min_dead_ratio=0.0):
+    """
+    압축을 한 번 실행하고 보고서 dict를 반환합니다.
+    중복 행 수가 min_duplicates 미만이고 dead tuple 비율도 min_dead_ratio 미만이면 재작성하지 않습니다.
+    수집 작업과 겹치지 않도록 수집 워커와 같은 advisory lock을 잡으며, 잡지 못하면 건너뜁니다.
+    """
+    conn = get_db_connection()
+    try:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        report = {"before": table_health(cursor), "duplicates": count_duplicates(cursor), "status": "skipped"}
+        due = report["duplicates"] >= max(1, min_duplicates) or (report["before"] or {}).get("dead_ratio", 0) >= max(min_dead_ratio, 1e-9)
+        if dry_run or not due:
+            report["status"] = "dry-run" if dry_run else "clean"
+            return report
+        cursor.execute("SELECT pg_try_advisory_lock(%s);", (INGEST_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            report["status"] = "busy"
+            return report
+        try:
+            t0 = time.perf_counter()
+            conn.autocommit = False
+            try:
+                report["kept"] = _rewrite(cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.autocommit = True
+            cursor.execute(f"ANALYZE {TABLE};")
+            report["seconds"] = round(time.perf_counter() - t0, 2)
+            report["status"] = "compacted"
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s);", (INGEST_LOCK_KEY,))
+        report["after"] = table_health(cursor)
+        cursor.execute(f"SELECT DISTINCT artist_name FROM {TABLE} WHERE artist_name IS NOT NULL;")
+        artists = [r[0] for r in cursor.fetchall()]
+        cursor.close()
+    finally:
+        conn.close()
+
+    # 행 수 통계와 캐시를 새 테이블 기준으로 맞춤
+    from catalog_stats import rebuild_catalog_stats
+    rebuild_catalog_stats()
+    bump_generation(*artists)
+    return report
+
+
+def _print_report(report):
+    def health(h):
+        if not h:
+            return "-"
+        return f"live {h['live_tuples']:,} · dead {h['dead_tuples']:,} ({h['dead_ratio'] * 100:.1f}%) · {h['total_bytes'] / 1e6:.1f} MB"
+
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {report['status']} · 중복 {report['duplicates']:,}행")
+    print(f"  전: {health(report['before'])}")
+    if "after" in report:
+        print(f"  후: {health(report['after'])} · 남은 행 {report['kept']:,} · {report['seconds']}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="artist_growth_data 중복 제거·재작성")
+    parser.add_argument("--dry-run", action="store_true", help="중복 수와 bloat만 보고")
+    parser.add_argument("--interval", type=int, default=0, help="초 단위 반복 주기 (0이면 한 번만 실행)")
+    parser.add_argument("--min-duplicates", type=int, default=1, help="이 수 이상 중복이 있을 때만 재작성")
+    parser.add_argument("--min-dead-ratio", type=float, default=0.2, help="dead tuple 비율이 이 이상이면 중복이 없어도 재작성")
+    args = parser.parse_args()
+    while True:
+        try:
+            _print_report(compact(args.dry_run, args.min_duplicates, args.min_dead_ratio))
+        except Exception as e:
+            print(f"압축 실패: {type(e).__name__}: {e}")
+            if not args.interval:
+                raise
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
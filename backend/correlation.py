@@ -0,0 +1,301 @@
+"""
+플랫폼 간 상관관계를 위한 공동 적률(co-moment) 누적기입니다.
+
+아티스트마다 (표본 수, 평균, 공동 적률)을 platform_moments에 저장하고, 카탈로그 전체("*")는 아티스트 누적기의 병합입니다.
+동기화 때는 값이 실제로 바뀐 첫 날짜(rollup_changes의 touched)가 마지막 반영 날짜 이후면 새 날짜만 누적하고,
+과거가 바뀌었으면 그 아티스트만 다시 계산해 카탈로그에서 옛 기여분을 빼고 새 값을 더합니다.
+동기화는 바뀐 아티스트만 다루고, 카탈로그 누적기가 없으면(load_cmdata.py가 무효화) ensure_catalog_moments()가 재구성합니다.
+backfill_moments()는 누적기가 없는 아티스트(배포 전 데이터)를 채우고 카탈로그 누적기를 아티스트 누적기로부터 다시 만듭니다.
+카탈로그 크기에 비례하므로 앱 시작 시 한 번과 CLI에서만 실행합니다. 읽기(get_correlation)는 DB에 쓰지 않습니다.
+
+사용 예 (backend 디렉터리에서):
+    python correlation.py             # 누락된 아티스트 채우고 카탈로그 누적기 재구성
+    python correlation.py --rebuild   # 모든 아티스트 다시 계산
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from db import get_db_connection
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+MIN_VALUE = 100000
+MIN_SAMPLES = 10
+KINDS = ("level", "delta")
+CATALOG = "*"
+# 카탈로그 누적기는 읽고-고치고-쓰는 방식이므로 쓰는 트랜잭션끼리 직렬화 (행이 아직 없을 때도 잠기도록 advisory lock 사용)
+MOMENTS_LOCK_KEY = 72010327
+
+
+class CoMoments:
+    """표본 수, 평균 벡터, 공동 적률(co-moment) 행렬을 유지하며 배치 단위 병합/제거가 가능한 누적기입니다."""
+
+    def __init__(self, n=0, mean=None, m2=None, k=len(PLATFORM_COLS)):
+        self.n = int(n)
+        self.mean = np.zeros(k) if mean is None else np.asarray(mean, dtype=float).reshape(k)
+        self.m2 = np.zeros((k, k)) if m2 is None else np.asarray(m2, dtype=float).reshape(k, k)
+
+    @classmethod
+    def from_array(cls, x):
+        x = np.asarray(x, dtype=float)
+        if x.ndim != 2 or len(x) == 0:
+            return cls()
+        mean = x.mean(axis=0)
+        centered = x - mean
+        return cls(len(x), mean, centered.T @ centered)
+
+    def merge(self, other):
+        """Chan의 병렬 알고리즘으로 다른 누적기를 합칩니다."""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            return CoMoments(other.n, other.mean.copy(), other.m2.copy())
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        mean = self.mean + delta * (other.n / n)
+        m2 = self.m2 + other.m2 + np.outer(delta, delta) * (self.n * other.n / n)
+        return CoMoments(n, mean, m2)
+
+    def subtract(self, part):
+        """merge의 역연산입니다. 이 누적기에 포함되어 있던 part의 기여분을 제거합니다."""
+        if part.n == 0:
+            return self
+        n = self.n - part.n
+        if n <= 0:
+            return CoMoments()
+        mean = (self.n * self.mean - part.n * part.mean) / n
+        delta = mean - part.mean
+        m2 = self.m2 - part.m2 - np.outer(delta, delta) * (part.n * n / self.n)
+        return CoMoments(n, mean, m2)
+
+    def corr(self):
+        if self.n <= MIN_SAMPLES:
+            return None
+        cov = self.m2 / (self.n - 1)
+        sd = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = cov / np.outer(sd, sd)
+        c = np.clip(c, -1.0, 1.0)
+        return pd.DataFrame(c, index=PLATFORM_COLS, columns=PLATFORM_COLS)
+
+
+def _level_and_delta(rows, prev=None):
+    """(date, yt, sp, sc) 행 목록을 수준 배열과 연속된 날짜 간의 일별 증가분 배열로 변환합니다."""
+    levels = np.array([r[1:] for r in rows], dtype=float).reshape(-1, len(PLATFORM_COLS))
+    deltas = []
+    last = prev
+    for r in rows:
+        if last is not None and (r[0] - last[0]).days == 1:
+            deltas.append([a - b for a, b in zip(r[1:], last[1:])])
+        last = r
+    return levels, np.array(deltas, dtype=float).reshape(-1, len(PLATFORM_COLS)), last
+
+
+def _lock(cursor):
+    cursor.execute("SELECT pg_advisory_xact_lock(%s);", (MOMENTS_LOCK_KEY,))
+
+
+def _load_state(cursor, scope):
+    cursor.execute(
+        "SELECT kind, n, mean, m2, last_date, last_values FROM platform_moments WHERE scope=%s;",
+        (scope,),
+    )
+    state = {k: CoMoments() for k in KINDS}
+    last = None
+    for kind, n, mean, m2, last_date, last_values in cursor.fetchall():
+        state[kind] = CoMoments(n, mean, m2)
+        if kind == "level" and last_date is not None:
+            last = (last_date, *last_values)
+    return state, last
+
+
+def _catalog_exists(cursor):
+    cursor.execute("SELECT 1 FROM platform_moments WHERE scope=%s LIMIT 1;", (CATALOG,))
+    return cursor.fetchone() is not None
+
+
+def _save_state(cursor, scope, state, last=None):
+    for kind, m in state.items():
+        cursor.execute(
+            """
+            INSERT INTO platform_moments (scope, kind, n, mean, m2, last_date, last_values, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (scope, kind) DO UPDATE SET
+              n=EXCLUDED.n, mean=EXCLUDED.mean, m2=EXCLUDED.m2,
+              last_date=EXCLUDED.last_date, last_values=EXCLUDED.last_values, updated_at=NOW();
+            """,
+            (
+                scope, kind, m.n, m.mean.tolist(), m.m2.ravel().tolist(),
+                last[0] if (last and kind == "level") else None,
+                [float(v) for v in last[1:]] if (last and kind == "level") else None,
+            ),
+        )
+
+
+def _fetch_rows(cursor, artist_id, after=None):
+    sql = (
+        "SELECT date, youtube_views, spotify_streams, soundcloud_plays FROM daily_metrics "
+        "WHERE artist_id=%s AND youtube_views>%s AND spotify_streams>%s AND soundcloud_plays>%s"
+    )
+    params = [artist_id, MIN_VALUE, MIN_VALUE, MIN_VALUE]
+    if after is not None:
+        sql += " AND date>%s"
+        params.append(after)
+    cursor.execute(sql + " ORDER BY date ASC;", params)
+    return cursor.fetchall()
+
+
+def refresh_artist_moments(artist_id, since=None):
+    """
+    아티스트의 공동 적률을 갱신하고 같은 트랜잭션에서 카탈로그 전체 누적기에도 반영합니다.
+    since(값이 바뀐 첫 날짜)가 이미 반영된 마지막 날짜 이후면 새 날짜만 누적하고, 과거 구간이 바뀌었으면 해당 아티스트만 다시 계산합니다.
+    카탈로그 누적기가 없으면(재구성 대기 중) 일부 아티스트만 담긴 카탈로그를 만들지 않도록 건드리지 않습니다.
+    """
+    scope = str(int(artist_id))
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        _lock(cursor)
+        state, last = _load_state(cursor, scope)
+        has_catalog = _catalog_exists(cursor)
+        catalog, _ = _load_state(cursor, CATALOG)
+        incremental = last is not None and (since is None or since > last[0])
+        if incremental:
+            rows = _fetch_rows(cursor, artist_id, after=last[0])
+            levels, deltas, new_last = _level_and_delta(rows, prev=last)
+            batch = {"level": CoMoments.from_array(levels), "delta": CoMoments.from_array(deltas)}
+            for k in KINDS:
+                state[k] = state[k].merge(batch[k])
+                catalog[k] = catalog[k].merge(batch[k])
+        else:
+            rows = _fetch_rows(cursor, artist_id)
+            levels, deltas, new_last = _level_and_delta(rows)
+            fresh = {"level": CoMoments.from_array(levels), "delta": CoMoments.from_array(deltas)}
+            for k in KINDS:
+                catalog[k] = catalog[k].subtract(state[k]).merge(fresh[k])
+            state = fresh
+        _save_state(cursor, scope, state, new_last)
+        if has_catalog:
+            _save_state(cursor, CATALOG, catalog)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def drop_artist_moments(artist_id):
+    """삭제된 아티스트의 기여분을 카탈로그 누적기에서 제거하고 아티스트 누적기를 지웁니다."""
+    scope = str(int(artist_id))
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        _lock(cursor)
+        state, _ = _load_state(cursor, scope)
+        if _catalog_exists(cursor):
+            catalog, _ = _load_state(cursor, CATALOG)
+            for k in KINDS:
+                catalog[k] = catalog[k].subtract(state[k])
+            _save_state(cursor, CATALOG, catalog)
+        cursor.execute("DELETE FROM platform_moments WHERE scope=%s;", (scope,))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _artist_state(cursor, artist_id):
+    levels, deltas, last = _level_and_delta(_fetch_rows(cursor, artist_id))
+    return {"level": CoMoments.from_array(levels), "delta": CoMoments.from_array(deltas)}, last
+
+
+def backfill_moments(rebuild=False):
+    """
+    누적기가 없는 아티스트(rebuild=True면 전체)를 계산해 저장하고, 사라진 아티스트의 누적기를 지운 뒤
+    카탈로그 누적기를 모든 아티스트 누적기의 병합으로 다시 만듭니다 (빼기를 거듭한 부동소수 오차도 여기서 초기화).
+    채울 아티스트가 없고 카탈로그 누적기도 있으면 재구성을 건너뜁니다. 채운 아티스트 수를 반환합니다.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        _lock(cursor)
+        cursor.execute(
+            "DELETE FROM platform_moments p WHERE p.scope <> %s AND NOT EXISTS (SELECT 1 FROM artists a WHERE a.id::text = p.scope);",
+            (CATALOG,),
+        )
+        cursor.execute(
+            f"""
+            SELECT a.id FROM artists a
+            WHERE EXISTS (SELECT 1 FROM daily_metrics d WHERE d.artist_id = a.id)
+              {"" if rebuild else "AND NOT EXISTS (SELECT 1 FROM platform_moments p WHERE p.scope = a.id::text)"}
+            ORDER BY a.id;
+            """
+        )
+        missing = [r[0] for r in cursor.fetchall()]
+        if not missing and not rebuild and _catalog_exists(cursor):
+            conn.commit()
+            cursor.close()
+            return 0
+        for a_id in missing:
+            state, last = _artist_state(cursor, a_id)
+            _save_state(cursor, str(a_id), state, last)
+        cursor.execute("SELECT kind, n, mean, m2 FROM platform_moments WHERE scope <> %s;", (CATALOG,))
+        catalog = {k: CoMoments() for k in KINDS}
+        for kind, n, mean, m2 in cursor.fetchall():
+            if kind in catalog:
+                catalog[kind] = catalog[kind].merge(CoMoments(n, mean, m2))
+        _save_state(cursor, CATALOG, catalog)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return len(missing)
+
+
+def ensure_catalog_moments():
+    """카탈로그 누적기가 없을 때만 backfill_moments()로 재구성합니다. 동기화마다 호출해도 행 하나만 확인합니다."""
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        exists = _catalog_exists(cursor)
+        cursor.close()
+    finally:
+        conn.close()
+    if exists:
+        return False
+    backfill_moments()
+    return True
+
+
+def get_correlation(artist_id=None, kind="level"):
+    """
+    저장된 누적기에서 상관계수 행렬을 읽어옵니다. artist_id가 None이면 카탈로그 전체 행렬입니다.
+    아직 누적기가 없는 아티스트는 저장하지 않고 그 자리에서 계산합니다.
+    """
+    scope = CATALOG if artist_id is None else str(int(artist_id))
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT n, mean, m2 FROM platform_moments WHERE scope=%s AND kind=%s;",
+            (scope, kind),
+        )
+        row = cursor.fetchone()
+        state = None
+        if row is None and artist_id is not None:
+            state, _ = _artist_state(cursor, int(artist_id))
+        cursor.close()
+    finally:
+        conn.close()
+    if row is None:
+        return None if state is None else state[kind].corr()
+    return CoMoments(*row).corr()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="플랫폼 상관관계 누적기 채우기·재구성")
+    parser.add_argument("--rebuild", action="store_true", help="모든 아티스트를 다시 계산")
+    args = parser.parse_args()
+    print(f"아티스트 {backfill_moments(args.rebuild)}명 계산")
+
+
+if __name__ == "__main__":
+    main()
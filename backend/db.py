@@ -1,11 +1,20 @@
 import os
 import time
+import threading
 import psycopg2
 import pandas as pd
 from dotenv import load_dotenv
+from tracing import span
+import query_cache
+from query_cache import CACHE, read_tables, written_table
+from rollup import PERIOD_TABLES, ensure_changes_table, ensure_period_tables
 
 load_dotenv()
 
+CATALOG_SCOPE = "*"
+# 동기화·압축처럼 artist_growth_data를 대량으로 바꾸는 작업이 서로 겹치지 않도록 잡는 advisory lock 키
+INGEST_LOCK_KEY = 72010326
+
 def _env(name: str, default: str = "") -> str:
     """환경 변수를 읽어오며 값이 없을 경우 기본값을 반환합니다."""
     v = os.getenv(name)
@@ -62,6 +71,22 @@ def ensure_database_exists():
         raise
 
 
+_CONNECTION_LOCK = threading.Lock()
+_CONNECTIONS_OPENED = 0
+
+
+def count_connection():
+    """새로 연 DB 연결 수를 1 늘립니다. get_db_connection을 거치지 않는 SQLAlchemy 엔진도 연결 시 호출합니다."""
+    global _CONNECTIONS_OPENED
+    with _CONNECTION_LOCK:
+        _CONNECTIONS_OPENED += 1
+
+
+def connections_opened() -> int:
+    """이 프로세스가 지금까지 연 DB 연결 수를 반환합니다 (부하 테스트·디버그용)."""
+    return _CONNECTIONS_OPENED
+
+
 def get_db_connection(max_retries: int = 3):
     """데이터베이스 연결 객체를 반환합니다. 실패 시 재시도 로직을 포함합니다."""
     host, port, user, password, database = _get_pg_config()
@@ -76,6 +101,7 @@ def get_db_connection(max_retries: int = 3):
                 password=password,
                 connect_timeout=10,
             )
+            count_connection()
             return conn
         except psycopg2.OperationalError as e:
             if "does not exist" in str(e).lower():
@@ -141,9 +167,220 @@ def init_db():
             );
             """
         )
+        ensure_changes_table(cursor)
+        # 배포 전 DB처럼 주·월 테이블이 비어 있으면 여기서 daily_metrics 전체로 한 번 채움
+        backfilled = ensure_period_tables(cursor)
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_daily_metrics_artist_date ON daily_metrics(artist_id, date DESC);"
         )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS data_generations (
+                scope TEXT PRIMARY KEY,
+                generation BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT NOW()
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS platform_moments (
+                scope TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                n BIGINT NOT NULL DEFAULT 0,
+                mean DOUBLE PRECISION[],
+                m2 DOUBLE PRECISION[],
+                last_date DATE,
+                last_values DOUBLE PRECISION[],
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (scope, kind)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rolling_state (
+                artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                last_date DATE,
+                last_value DOUBLE PRECISION,
+                n_rows INTEGER NOT NULL DEFAULT 0,
+                returns DOUBLE PRECISION[],
+                ret_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                ret_sumsq DOUBLE PRECISION NOT NULL DEFAULT 0,
+                pos_deltas DOUBLE PRECISION[],
+                volatility DOUBLE PRECISION,
+                momentum DOUBLE PRECISION,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (artist_id, platform)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rolling_indicators (
+                artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                date DATE NOT NULL,
+                volatility DOUBLE PRECISION,
+                momentum DOUBLE PRECISION,
+                PRIMARY KEY (artist_id, platform, date)
+            );
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_artist_growth_artist_date ON artist_growth_data(artist_name, date);"
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_stats (
+                scope TEXT NOT NULL,
+                name TEXT NOT NULL,
+                row_count BIGINT NOT NULL DEFAULT 0,
+                min_date DATE,
+                max_date DATE,
+                detail TEXT,
+                updated_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (scope, name)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_jobs (
+                id SERIAL PRIMARY KEY,
+                status TEXT NOT NULL,
+                source TEXT,
+                total_files INTEGER NOT NULL DEFAULT 0,
+                done_files INTEGER NOT NULL DEFAULT 0,
+                failed_files INTEGER NOT NULL DEFAULT 0,
+                current_file TEXT,
+                message TEXT,
+                created_at TIMESTAMP DEFAULT NOW(),
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_job_files (
+                job_id INTEGER NOT NULL REFERENCES ingest_jobs(id) ON DELETE CASCADE,
+                file_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                rows INTEGER,
+                error TEXT,
+                finished_at TIMESTAMP,
+                PRIMARY KEY (job_id, file_name)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_file_state (
+                file_name TEXT PRIMARY KEY,
+                mtime DOUBLE PRECISION NOT NULL,
+                size BIGINT NOT NULL,
+                ingested_at TIMESTAMP DEFAULT NOW()
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS audition_results (
+                id SERIAL PRIMARY KEY,
+                artist TEXT NOT NULL,
+                title TEXT NOT NULL,
+                judge TEXT NOT NULL,
+                provider TEXT,
+                model TEXT,
+                grade_hint TEXT,
+                musicality INTEGER,
+                marketability INTEGER,
+                narrative INTEGER,
+                total INTEGER,
+                comment TEXT,
+                latency DOUBLE PRECISION,
+                state TEXT,
+                created_at TIMESTAMP DEFAULT NOW(),
+                UNIQUE (artist, title, judge)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS metric_alerts (
+                artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                date DATE NOT NULL,
+                kind TEXT NOT NULL,
+                value BIGINT,
+                growth DOUBLE PRECISION,
+                baseline DOUBLE PRECISION,
+                z_score DOUBLE PRECISION,
+                detected_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (artist_id, platform, date)
+            );
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_metric_alerts_date ON metric_alerts(date DESC);"
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS forecast_models (
+                artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                model TEXT NOT NULL,
+                alpha DOUBLE PRECISION,
+                beta DOUBLE PRECISION,
+                phi DOUBLE PRECISION,
+                slope DOUBLE PRECISION,
+                rmse DOUBLE PRECISION,
+                n_obs INTEGER,
+                last_date DATE,
+                last_value DOUBLE PRECISION,
+                fitted_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (artist_id, platform, model)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS forecasts (
+                artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+                platform TEXT NOT NULL,
+                model TEXT NOT NULL,
+                date DATE NOT NULL,
+                base DOUBLE PRECISION,
+                low DOUBLE PRECISION,
+                high DOUBLE PRECISION,
+                PRIMARY KEY (artist_id, platform, model, date)
+            );
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS judge_telemetry (
+                id BIGSERIAL PRIMARY KEY,
+                judge TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT,
+                queue_wait DOUBLE PRECISION,
+                ttft DOUBLE PRECISION,
+                latency DOUBLE PRECISION,
+                tokens INTEGER,
+                tokens_per_sec DOUBLE PRECISION,
+                state TEXT NOT NULL,
+                fallback BOOLEAN NOT NULL DEFAULT FALSE,
+                error TEXT,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_judge_telemetry_provider_time ON judge_telemetry(provider, created_at DESC);"
+        )
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS interviews (
@@ -163,29 +400,180 @@ def init_db():
         conn.commit()
         cursor.close()
         conn.close()
+        if backfilled:
+            invalidate_tables(*(PERIOD_TABLES[res][0] for res in backfilled))
+            print(f"주·월 집계 테이블 채움: {backfilled}")
         print("데이터베이스 초기화 완료")
     except Exception as e:
         print(f"데이터베이스 초기화 실패: {e}")
         raise
 
 
-def df_query(sql: str, params=()):
-    """Pandas DataFrame 형태로 조회 결과를 반환하는 헬퍼 함수입니다."""
-    conn = get_db_connection()
-    try:
-        df = pd.read_sql_query(sql.replace("?", "%s"), conn, params=params)
-        return df
-    finally:
-        conn.close()
+def df_query(sql: str, params=(), cache: bool = False):
+    """
+    Pandas DataFrame 형태로 조회 결과를 반환하는 헬퍼 함수입니다.
+    cache=True이면 프로세스 안의 LRU 결과 캐시(query_cache)를 사용합니다. QUERY_CACHE=0이면 항상 DB를 조회합니다.
+    """
+    use_cache = cache and query_cache.ENABLED
+    if use_cache:
+        key = CACHE.key(sql, params)
+        hit = CACHE.get(key)
+        if hit is not None:
+            with span("df_query.cache", "sql", sql) as s:
+                if s is not None:
+                    s.rows = len(hit)
+            return hit
+        tables = read_tables(sql)
+        gens = CACHE.snapshot(tables)
+    with span("df_query", "sql", sql) as s:
+        conn = get_db_connection()
+        try:
+            df = pd.read_sql_query(sql.replace("?", "%s"), conn, params=params)
+            if s is not None:
+                s.rows = len(df)
+        finally:
+            conn.close()
+    if use_cache:
+        CACHE.put(key, df, tables, gens)
+    return df
 
 
 def exec_sql(sql: str, params=()):
     """데이터를 삽입, 수정, 삭제하는 명령어를 실행하는 헬퍼 함수입니다."""
+    with span("exec_sql", "sql", sql) as s:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql.replace("?", "%s"), params)
+            if s is not None:
+                s.rows = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+    table = written_table(sql)
+    invalidate_tables(*([table] if table else []))
+
+
+def invalidate_tables(*tables):
+    """
+    테이블의 쓰기 세대를 올려 해당 테이블을 읽은 캐시 항목을 무효화합니다.
+    커서로 직접 쓰는 수집 경로는 커밋 후 이 함수를 호출합니다. 테이블을 지정하지 않으면 캐시 전체가 무효가 됩니다.
+    """
+    CACHE.invalidate(*tables)
+
+
+def query_cache_stats():
+    """결과 캐시의 항목 수, 사용 바이트, 적중률, 축출·무효화 횟수를 반환합니다."""
+    return dict(CACHE.stats(), enabled=query_cache.ENABLED)
+
+
+_MEMORY_LOCK = threading.Lock()
+_MEMORY_STATS = {"frames": 0, "rows": 0, "bytes_before": 0, "bytes_after": 0}
+
+
+def frame_memory(df) -> int:
+    """문자열 내용까지 포함한 DataFrame의 메모리 사용량(바이트)을 반환합니다."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def compact_frame(df, dates=("date",), categories=(), numeric=(), fill=None):
+    """
+    조회 결과를 작은 dtype으로 변환합니다.
+    dates는 datetime64로, categories는 category로 바꾸고, numeric(및 이미 숫자형인 열)은 정수로 표현 가능하면
+    가장 작은 정수형으로 줄입니다. 조회수는 float32로 줄이면 정밀도가 깨지므로 실수형은 float64로 둡니다.
+    fill이 주어지면 numeric 열의 결측값을 그 값으로 채웁니다.
+    """
+    for c in dates:
+        if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c])
+    for c in categories:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    skip = set(dates) | set(categories)
+    targets = [c for c in df.columns if c in numeric or (c not in skip and pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_bool_dtype(df[c]))]
+    for c in targets:
+        s = df[c] if pd.api.types.is_numeric_dtype(df[c]) else pd.to_numeric(df[c], errors="coerce")
+        if fill is not None and c in numeric:
+            s = s.fillna(fill)
+        if pd.api.types.is_float_dtype(s) and s.notna().all() and (s % 1 == 0).all():
+            s = s.astype("int64")
+        if pd.api.types.is_integer_dtype(s):
+            s = pd.to_numeric(s, downcast="integer")
+        df[c] = s
+    return df
+
+
+def df_query_typed(sql: str, params=(), dates=("date",), categories=(), numeric=(), fill=None, cache: bool = False):
+    """df_query 결과를 compact_frame으로 변환해 반환하고 변환 전후 메모리 사용량을 누적 기록합니다."""
+    df = df_query(sql, params, cache)
+    before = frame_memory(df)
+    df = compact_frame(df, dates, categories, numeric, fill)
+    after = frame_memory(df)
+    with _MEMORY_LOCK:
+        _MEMORY_STATS["frames"] += 1
+        _MEMORY_STATS["rows"] += len(df)
+        _MEMORY_STATS["bytes_before"] += before
+        _MEMORY_STATS["bytes_after"] += after
+    return df
+
+
+def typed_memory_stats():
+    """df_query_typed로 읽은 프레임 수, 행 수, 변환 전후 바이트 합계와 절감률을 반환합니다."""
+    with _MEMORY_LOCK:
+        stats = dict(_MEMORY_STATS)
+    before = stats["bytes_before"]
+    stats["saved_pct"] = round((1 - stats["bytes_after"] / before) * 100, 1) if before else 0.0
+    return stats
+
+
+def bump_generation(*scopes):
+    """수집·삭제로 변경된 아티스트와 전체 카탈로그의 데이터 세대 번호를 1 증가시킵니다."""
+    names = sorted({str(s) for s in scopes if s} | {CATALOG_SCOPE})
     conn = get_db_connection()
     try:
         cursor = conn.cursor()
-        cursor.execute(sql.replace("?", "%s"), params)
+        cursor.executemany(
+            "INSERT INTO data_generations (scope, generation) VALUES (%s, 1) "
+            "ON CONFLICT (scope) DO UPDATE SET generation = data_generations.generation + 1, updated_at = NOW();",
+            [(n,) for n in names],
+        )
         conn.commit()
         cursor.close()
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
+    # 세대가 오르는 변경(수집·삭제·병합)은 파생 테이블까지 건드리므로 결과 캐시 전체를 무효화
+    invalidate_tables()
+
+
+_SEEN_LOCK = threading.Lock()
+_SEEN_CATALOG_GENERATION = None
+
+
+def observe_generation(generation):
+    """
+    DB에서 새로 읽은 카탈로그 세대 번호를 알립니다. 이 프로세스가 마지막으로 본 값과 다르면 결과 캐시 전체를 무효화합니다.
+    다른 프로세스(Streamlit 동기화, load_cmdata.py)의 쓰기는 이 프로세스의 invalidate_tables를 거치지 않으므로,
+    세대 번호로 응답을 만드는 쪽(API의 ETag 등)이 캐시된 옛 결과를 새 세대로 내보내지 않게 합니다.
+    """
+    global _SEEN_CATALOG_GENERATION
+    with _SEEN_LOCK:
+        changed = _SEEN_CATALOG_GENERATION is not None and generation != _SEEN_CATALOG_GENERATION
+        _SEEN_CATALOG_GENERATION = generation
+    if changed:
+        CACHE.invalidate()
+
+
+def get_generations(*scopes):
+    """지정한 범위(아티스트 이름 또는 CATALOG_SCOPE)의 현재 세대 번호를 dict로 반환합니다. 기록이 없으면 0입니다."""
+    names = list(scopes) or [CATALOG_SCOPE]
+    df = df_query("SELECT scope, generation FROM data_generations WHERE scope = ANY(%s);", (names,))
+    found = {str(r["scope"]): int(r["generation"]) for _, r in df.iterrows()}
+    if CATALOG_SCOPE in names:
+        observe_generation(found.get(CATALOG_SCOPE, 0))
+    return {n: found.get(n, 0) for n in names}
+
+
+def get_generation(scope: str = CATALOG_SCOPE) -> int:
+    """단일 범위의 현재 세대 번호를 반환합니다."""
+    return get_generations(scope)[scope]
@@ -0,0 +1,262 @@
+"""
+(아티스트, 플랫폼) 전체에 대한 배치 예측 엔진입니다.
+
+모든 시계열을 하나의 행렬로 묶어 감쇠 추세 지수평활(Holt damped)의 (alpha, beta, phi) 격자를 NumPy로 한 번에 적합하고,
+1-step 잔차를 부트스트랩해 비관(p10)·기준(p50)·낙관(p90) 시나리오를 만듭니다. 기존 선형 회귀도 기준선으로 함께 저장합니다.
+시계열은 달력 기준 하루 간격으로 펼치고, 빠진 날·기준값(100,000) 이하인 날은 NaN으로 둡니다. 모형은 NaN인 날에도
+시간을 한 칸 진행(보정 없이 예측만)하므로 추세는 하루당 값이고, 예측 날짜와 선형 기준선이 실제 날짜 간격과 맞습니다.
+동기화 후 변경된 아티스트만 다시 적합하며, UI와 API는 저장된 forecasts 테이블을 읽기만 합니다.
+
+사용 예 (backend 디렉터리에서):
+    python forecasting.py            # 카탈로그 전체 다시 적합
+"""
+import argparse
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+from db import get_db_connection, df_query, df_query_typed, invalidate_tables
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+MIN_VALUE = 100000
+MIN_OBS = 14
+HISTORY_DAYS = 365
+HORIZON = 30
+BOOTSTRAP_PATHS = 200
+RESIDUAL_WINDOW = 90
+ARTIST_BATCH = 200
+ALPHAS = np.array([0.1, 0.3, 0.5, 0.7, 0.9])
+BETAS = np.array([0.05, 0.1, 0.2, 0.4])
+PHIS = np.array([0.8, 0.9, 0.95, 0.98, 1.0])
+
+
+def _grid():
+    a, b, p = np.meshgrid(ALPHAS, BETAS, PHIS, indexing="ij")
+    return a.ravel(), b.ravel(), p.ravel()
+
+
+def series_matrix(values_list):
+    """
+    길이가 다른 시계열 목록을 왼쪽 정렬·NaN 패딩된 (S, T) 행렬과 길이 배열로 만듭니다.
+    각 시계열은 첫 관측일부터 마지막 관측일까지 하루 한 칸이며, 길이 안의 NaN은 관측이 없는 날입니다.
+    """
+    lengths = np.array([len(v) for v in values_list], dtype=np.int64)
+    y = np.full((len(values_list), int(lengths.max()) if len(lengths) else 0), np.nan)
+    for i, v in enumerate(values_list):
+        y[i, : len(v)] = v
+    return y, lengths
+
+
+def _init_state(y, lengths):
+    # 초기 추세: 처음 7일 안에서 마지막으로 관측된 날까지의 하루당 변화량 (없으면 0)
+    S, T = y.shape
+    t = np.arange(T)[None, :]
+    window = (t >= 1) & (t <= np.minimum(7, lengths - 1)[:, None]) & ~np.isnan(y)
+    k = np.where(window, t, 0).max(axis=1) if T else np.zeros(S, dtype=np.int64)
+    rows = np.arange(S)
+    trend0 = np.where(k > 0, (y[rows, k] - y[:, 0]) / np.maximum(k, 1), 0.0)
+    return y[:, 0].copy(), trend0
+
+
+def fit_damped(y, lengths):
+    """
+    감쇠 추세 지수평활을 모든 시계열 x 모든 격자 조합에 대해 동시에 실행하고, 시계열마다 1-step SSE가 가장 작은 조합을 고릅니다.
+    반환: 선택된 (alpha, beta, phi), 마지막 (level, trend), 1-step 잔차 행렬 (S, T), RMSE.
+    """
+    S, T = y.shape
+    alpha, beta, phi = _grid()
+    level0, trend0 = _init_state(y, lengths)
+    level = np.repeat(level0[:, None], len(alpha), axis=1)
+    trend = np.repeat(trend0[:, None], len(alpha), axis=1)
+    sse = np.zeros_like(level)
+    for t in range(1, T):
+        # 길이 안의 날은 관측이 없어도 시간이 흐르므로 예측으로 진행하고, 관측된 날만 오차로 보정
+        active = (t < lengths)[:, None]
+        observed = active & ~np.isnan(y[:, t, None])
+        pred = level + phi * trend
+        err = np.where(observed, y[:, t, None] - pred, 0.0)
+        sse += err * err
+        level = np.where(active, pred + alpha * err, level)
+        trend = np.where(active, phi * trend + alpha * beta * err, trend)
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(S)
+    a, b, p = alpha[best], beta[best], phi[best]
+
+    # 선택된 조합으로 한 번 더 돌려 잔차를 보관 (부트스트랩용)
+    lv, tr = level0.copy(), trend0.copy()
+    resid = np.full((S, T), np.nan)
+    for t in range(1, T):
+        active = t < lengths
+        pred = lv + p * tr
+        err = y[:, t] - pred
+        resid[:, t] = np.where(active, err, np.nan)
+        e = np.where(active, np.nan_to_num(err), 0.0)
+        lv = np.where(active, pred + a * e, lv)
+        tr = np.where(active, p * tr + a * b * e, tr)
+    n_err = (~np.isnan(resid)).sum(axis=1)
+    rmse = np.sqrt(sse[rows, best] / np.maximum(n_err, 1))
+    return {"alpha": a, "beta": b, "phi": p, "level": lv, "trend": tr, "resid": resid, "rmse": rmse}
+
+
+def damped_paths(fit, lengths, last, horizon=HORIZON, paths=BOOTSTRAP_PATHS, seed=0):
+    """
+    최근 RESIDUAL_WINDOW개의 1-step 잔차를 복원 추출해 모형을 horizon일 앞으로 굴린 경로 (S, paths, horizon)를 반환합니다.
+    누적 지표이므로 경로는 마지막 관측값 아래로 내려가지 않고 감소하지 않도록 보정합니다.
+    """
+    rng = np.random.default_rng(seed)
+    S = len(lengths)
+    # 시계열마다 최근 RESIDUAL_WINDOW개의 관측된 잔차를 왼쪽으로 모음 (관측이 없는 날의 NaN은 뽑지 않음)
+    pool = np.zeros((S, RESIDUAL_WINDOW))
+    span_ = np.zeros(S, dtype=np.int64)
+    for i in range(S):
+        r = fit["resid"][i, 1:lengths[i]]
+        r = r[~np.isnan(r)][-RESIDUAL_WINDOW:]
+        pool[i, :len(r)] = r
+        span_[i] = len(r)
+    a, b, p = fit["alpha"][:, None], fit["beta"][:, None], fit["phi"][:, None]
+    lv = np.repeat(fit["level"][:, None], paths, axis=1)
+    tr = np.repeat(fit["trend"][:, None], paths, axis=1)
+    out = np.empty((S, paths, horizon))
+    rows = np.arange(S)[:, None]
+    for h in range(horizon):
+        idx = (rng.random((S, paths)) * span_[:, None]).astype(np.int64)
+        e = pool[rows, idx]
+        pred = lv + p * tr
+        out[:, :, h] = pred + e
+        lv = pred + a * e
+        tr = p * tr + a * b * e
+    out = np.maximum.accumulate(np.maximum(out, last[:, None, None]), axis=2)
+    return out
+
+
+def fit_linear(y, lengths, horizon=HORIZON):
+    """
+    시계열마다 y = a + b*t(t는 첫 관측일로부터의 일수) 최소제곱 직선을 벡터 연산으로 적합하고
+    (하루당 기울기, 마지막 관측일 다음 날부터 horizon일 예측 (S, horizon))을 반환합니다. analytics.forecast_linear와 같은 축입니다.
+    """
+    S, T = y.shape
+    t = np.arange(T, dtype=np.float64)[None, :]
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1)
+    tm = np.where(mask, t, 0.0).sum(axis=1) / n
+    ym = np.where(mask, y, 0.0).sum(axis=1) / n
+    cov = np.where(mask, (t - tm[:, None]) * (np.nan_to_num(y) - ym[:, None]), 0.0).sum(axis=1)
+    var = np.where(mask, (t - tm[:, None]) ** 2, 0.0).sum(axis=1)
+    slope = cov / np.maximum(var, 1e-12)
+    intercept = ym - slope * tm
+    future = (lengths - 1)[:, None] + np.arange(1, horizon + 1)[None, :]
+    return slope, intercept[:, None] + slope[:, None] * future
+
+
+def _load_series(artist_ids):
+    df = df_query_typed(
+        """
+        SELECT artist_id, date, youtube_views, spotify_streams, soundcloud_plays FROM daily_metrics
+        WHERE artist_id = ANY(%s) AND date >= CURRENT_DATE - %s AND date < CURRENT_DATE
+        ORDER BY artist_id, date;
+        """,
+        (list(artist_ids), HISTORY_DAYS),
+        numeric=PLATFORM_COLS,
+    )
+    keys, values, last_dates = [], [], []
+    for a_id, g in df.groupby("artist_id", sort=False):
+        for platform in PLATFORM_COLS:
+            s = g.loc[g[platform] > MIN_VALUE, ["date", platform]]
+            if len(s) < MIN_OBS:
+                continue
+            # 하루 한 칸의 달력으로 펼쳐 빠진 날·기준값 이하인 날은 NaN으로 둠
+            v = s.set_index("date")[platform].astype(np.float64)
+            v = v.reindex(pd.date_range(v.index[0], v.index[-1], freq="D"))
+            keys.append((int(a_id), platform))
+            values.append(v.to_numpy())
+            last_dates.append(s["date"].iloc[-1].date())
+    return keys, values, last_dates
+
+
+def forecast_batch(keys, values, last_dates, horizon=HORIZON, paths=BOOTSTRAP_PATHS):
+    """적합 결과를 (models 행, forecasts 행) 목록으로 반환합니다."""
+    y, lengths = series_matrix(values)
+    last = y[np.arange(len(y)), lengths - 1]
+    fit = fit_damped(y, lengths)
+    sims = damped_paths(fit, lengths, last, horizon, paths)
+    low, base, high = np.percentile(sims, [10, 50, 90], axis=1)
+    slope, linear = fit_linear(y, lengths, horizon)
+    n_obs = (~np.isnan(y)).sum(axis=1)
+    models, points = [], []
+    for i, (a_id, platform) in enumerate(keys):
+        n, d0 = int(n_obs[i]), last_dates[i]
+        models.append((a_id, platform, "damped", float(fit["alpha"][i]), float(fit["beta"][i]), float(fit["phi"][i]), float(fit["trend"][i]), float(fit["rmse"][i]), n, d0, float(last[i])))
+        models.append((a_id, platform, "linear", None, None, None, float(slope[i]), None, n, d0, float(last[i])))
+        for h in range(horizon):
+            day = d0 + timedelta(days=h + 1)
+            points.append((a_id, platform, "damped", day, float(base[i, h]), float(low[i, h]), float(high[i, h])))
+            points.append((a_id, platform, "linear", day, float(linear[i, h]), None, None))
+    return models, points
+
+
+def refresh_forecasts(artist_ids=None):
+    """지정한 아티스트(없으면 전체)의 예측을 다시 적합해 저장하고, 적합한 시계열 수를 반환합니다."""
+    if artist_ids is None:
+        artist_ids = df_query("SELECT id FROM artists ORDER BY id;")["id"].astype(int).tolist()
+    ids = sorted({int(a) for a in artist_ids})
+    fitted = 0
+    for i in range(0, len(ids), ARTIST_BATCH):
+        batch = ids[i:i + ARTIST_BATCH]
+        keys, values, last_dates = _load_series(batch)
+        models, points = forecast_batch(keys, values, last_dates) if keys else ([], [])
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM forecasts WHERE artist_id = ANY(%s);", (batch,))
+            cursor.execute("DELETE FROM forecast_models WHERE artist_id = ANY(%s);", (batch,))
+            if models:
+                execute_values(
+                    cursor,
+                    "INSERT INTO forecast_models (artist_id, platform, model, alpha, beta, phi, slope, rmse, n_obs, last_date, last_value) VALUES %s;",
+                    models,
+                )
+                execute_values(
+                    cursor,
+                    "INSERT INTO forecasts (artist_id, platform, model, date, base, low, high) VALUES %s;",
+                    points,
+                    page_size=2000,
+                )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        invalidate_tables("forecasts", "forecast_models")
+        fitted += len(keys)
+    return fitted
+
+
+def get_forecast(artist_id, platform):
+    """저장된 예측을 model별 DataFrame dict로 반환합니다. 없으면 빈 dict입니다."""
+    df = df_query(
+        "SELECT model, date, base, low, high FROM forecasts WHERE artist_id=%s AND platform=%s ORDER BY model, date;",
+        (int(artist_id), platform),
+        cache=True,
+    )
+    if df.empty:
+        return {}
+    df["date"] = pd.to_datetime(df["date"])
+    return {m: g.drop(columns="model").reset_index(drop=True) for m, g in df.groupby("model")}
+
+
+def get_forecast_model(artist_id, platform):
+    df = df_query(
+        "SELECT model, alpha, beta, phi, slope, rmse, n_obs, last_date, last_value, fitted_at FROM forecast_models WHERE artist_id=%s AND platform=%s;",
+        (int(artist_id), platform),
+        cache=True,
+    )
+    return {r["model"]: r.drop(labels="model").to_dict() for _, r in df.iterrows()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="카탈로그 전체 예측 다시 적합")
+    parser.parse_args()
+    print(f"{refresh_forecasts()}개 시계열 적합")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import time
+import queue
+import threading
+import data_processing
+from db import get_db_connection, df_query, INGEST_LOCK_KEY
+
+WATCH_INTERVAL = int(os.getenv("INGEST_WATCH_INTERVAL", "30"))
+
+
+def _exec(sql, params=()):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        row = cursor.fetchone() if cursor.description else None
+        conn.commit()
+        cursor.close()
+        return row
+    finally:
+        conn.close()
+
+
+def _folder_snapshot():
+    """FOLDER_PATH의 CSV 파일별 (수정 시각, 크기)를 반환합니다."""
+    folder = data_processing.FOLDER_PATH
+    if not os.path.exists(folder):
+        return {}
+    snap = {}
+    for f in data_processing.list_csv_files():
+        st_ = os.stat(os.path.join(folder, f))
+        snap[f] = (st_.st_mtime, st_.st_size)
+    return snap
+
+
+class IngestWorker:
+    """
+    프로세스당 하나의 백그라운드 수집 스레드입니다.
+    작업은 single-flight로 처리됩니다. 실행 중에 들어온 요청은 대기 중인 작업 하나로 합쳐지고,
+    파일별 진행 상황은 ingest_jobs / ingest_job_files 테이블에 기록되어 UI가 폴링할 수 있습니다.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending_job = None
+        self._pending_files = set()
+        self._pending_all = False
+        self._running_job = None
+        self._thread = threading.Thread(target=self._run, name="ingest-worker", daemon=True)
+        self._thread.start()
+        self._watch_stop = None
+
+    def submit(self, files=None, source="manual"):
+        """
+        동기화 작업을 예약하고 job id를 반환합니다. files가 None이면 폴더 전체입니다.
+        아직 시작하지 않은 작업이 있으면 새 작업을 만들지 않고 그 작업에 파일을 합칩니다.
+        """
+        with self._lock:
+            if files is None:
+                self._pending_all = True
+            else:
+                self._pending_files.update(files)
+            if self._pending_job is not None:
+                return self._pending_job
+            row = _exec(
+                "INSERT INTO ingest_jobs (status, source) VALUES ('queued', %s) RETURNING id;",
+                (source,),
+            )
+            self._pending_job = int(row[0])
+            self._queue.put(self._pending_job)
+            return self._pending_job
+
+    def _take_pending(self):
+        with self._lock:
+            files = None if self._pending_all else sorted(self._pending_files)
+            self._pending_job = None
+            self._pending_files = set()
+            self._pending_all = False
+            return files
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            files = self._take_pending()
+            self._running_job = job_id
+            try:
+                self._run_job(job_id, files)
+            except Exception as e:
+                _exec(
+                    "UPDATE ingest_jobs SET status='failed', message=%s, finished_at=NOW() WHERE id=%s;",
+                    (f"{type(e).__name__}: {e}", job_id),
+                )
+            finally:
+                self._running_job = None
+
+    def _run_job(self, job_id, files):
+        lock_conn = get_db_connection()
+        try:
+            lock_conn.autocommit = True
+            cursor = lock_conn.cursor()
+            cursor.execute("SELECT pg_try_advisory_lock(%s);", (INGEST_LOCK_KEY,))
+            while not cursor.fetchone()[0]:
+                _exec("UPDATE ingest_jobs SET message=%s WHERE id=%s;", ("다른 프로세스의 동기화가 끝나기를 기다리는 중", job_id))
+                time.sleep(2)
+                cursor.execute("SELECT pg_try_advisory_lock(%s);", (INGEST_LOCK_KEY,))
+            try:
+                folder = data_processing.FOLDER_PATH
+                if not os.path.exists(folder):
+                    raise FileNotFoundError(f"Folder not found: {folder}")
+                snapshot = _folder_snapshot()
+                targets = sorted(snapshot) if files is None else [f for f in files if f in snapshot]
+                _exec(
+                    "UPDATE ingest_jobs SET status='running', total_files=%s, message=NULL, started_at=NOW() WHERE id=%s;",
+                    (len(targets), job_id),
+                )
+                if targets:
+                    conn = get_db_connection()
+                    try:
+                        c = conn.cursor()
+                        c.executemany(
+                            "INSERT INTO ingest_job_files (job_id, file_name, status) VALUES (%s, %s, 'queued') ON CONFLICT DO NOTHING;",
+                            [(job_id, f) for f in targets],
+                        )
+                        conn.commit()
+                        c.close()
+                    finally:
+                        conn.close()
+
+                def on_progress(file_name, status, rows, error):
+                    _exec(
+                        "UPDATE ingest_job_files SET status=%s, rows=%s, error=%s, finished_at=CASE WHEN %s IN ('done','failed') THEN NOW() END WHERE job_id=%s AND file_name=%s;",
+                        (status, rows, error, status, job_id, file_name),
+                    )
+                    if status == "running":
+                        _exec("UPDATE ingest_jobs SET current_file=%s WHERE id=%s;", (file_name, job_id))
+                        return
+                    _exec(
+                        "UPDATE ingest_jobs SET done_files=done_files+%s, failed_files=failed_files+%s WHERE id=%s;",
+                        (1 if status == "done" else 0, 1 if status == "failed" else 0, job_id),
+                    )
+                    # 실패한 파일도 (수정 시각, 크기)를 기록해 바뀌기 전까지 감시자가 다시 예약하지 않게 함 (수동 동기화는 항상 포함)
+                    if file_name in snapshot:
+                        mtime, size = snapshot[file_name]
+                        _exec(
+                            """
+                            INSERT INTO ingest_file_state (file_name, mtime, size, ingested_at) VALUES (%s, %s, %s, NOW())
+                            ON CONFLICT (file_name) DO UPDATE SET mtime=EXCLUDED.mtime, size=EXCLUDED.size, ingested_at=NOW();
+                            """,
+                            (file_name, mtime, size),
+                        )
+
+                ok, failed = data_processing.sync_files(targets, on_progress, locked=True)
+                _exec(
+                    "UPDATE ingest_jobs SET status='done', current_file=NULL, message=%s, finished_at=NOW() WHERE id=%s;",
+                    (f"{ok} success, {failed} failed", job_id),
+                )
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s);", (INGEST_LOCK_KEY,))
+                cursor.close()
+        finally:
+            lock_conn.close()
+
+    def changed_files(self):
+        """마지막으로 수집(성공 또는 실패)된 이후 새로 생기거나 (수정 시각, 크기)가 바뀐 CSV 목록을 반환합니다."""
+        snap = _folder_snapshot()
+        if not snap:
+            return []
+        known = df_query("SELECT file_name, mtime, size FROM ingest_file_state;")
+        seen = {r["file_name"]: (float(r["mtime"]), int(r["size"])) for _, r in known.iterrows()}
+        return sorted(f for f, (mtime, size) in snap.items() if seen.get(f) != (mtime, size))
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        """FOLDER_PATH를 주기적으로 확인하여 변경된 CSV를 자동으로 예약합니다."""
+        with self._lock:
+            if self._watch_stop is not None:
+                return
+            self._watch_stop = threading.Event()
+            stop = self._watch_stop
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    changed = self.changed_files()
+                    if changed:
+                        self.submit(changed, source="watcher")
+                except Exception as e:
+                    print(f"폴더 감시 오류: {e}")
+
+        threading.Thread(target=loop, name="ingest-watcher", daemon=True).start()
+
+    def stop_watching(self):
+        with self._lock:
+            if self._watch_stop is not None:
+                self._watch_stop.set()
+                self._watch_stop = None
+
+    @property
+    def watching(self):
+        return self._watch_stop is not None
+
+
+_WORKER = None
+_WORKER_LOCK = threading.Lock()
+
+
+def get_worker():
+    """프로세스 전역 IngestWorker를 반환합니다. INGEST_WATCH=1이면 폴더 감시도 함께 시작합니다."""
+    global _WORKER
+    with _WORKER_LOCK:
+        if _WORKER is None:
+            _WORKER = IngestWorker()
+            if os.getenv("INGEST_WATCH", "0") == "1":
+                _WORKER.start_watching()
+        return _WORKER
+
+
+def get_job(job_id):
+    df = df_query(
+        "SELECT id, status, source, total_files, done_files, failed_files, current_file, message, created_at, started_at, finished_at FROM ingest_jobs WHERE id=%s;",
+        (int(job_id),),
+    )
+    return None if df.empty else df.iloc[0].to_dict()
+
+
+def get_job_files(job_id):
+    return df_query(
+        "SELECT file_name, status, rows, error, finished_at FROM ingest_job_files WHERE job_id=%s ORDER BY file_name;",
+        (int(job_id),),
+    )
+
+
+def latest_job():
+    df = df_query("SELECT id FROM ingest_jobs ORDER BY id DESC LIMIT 1;")
+    return None if df.empty else get_job(int(df.iloc[0]["id"]))
@@ -0,0 +1,105 @@
+"""
+심사위원 호출 텔레메트리입니다.
+
+stream_judge_task가 호출마다 대기 시간(queue_wait), 첫 토큰까지 걸린 시간(ttft), 전체 지연(latency),
+생성 토큰 수와 초당 토큰 수, 상태(완료/오류/취소)와 대체 점수 사용 여부를 judge_telemetry 테이블에 남깁니다.
+대시보드는 제공자별 p50/p95를 기간 단위로 묶어 어느 제공자가 심사 패널의 병목인지 보여 줍니다.
+
+사용 예 (backend 디렉터리에서):
+    python judge_telemetry.py --days 7
+"""
+import argparse
+from db import get_db_connection, df_query, invalidate_tables
+
+BUCKETS = ("hour", "day")
+ERROR_MAX_CHARS = 500
+
+
+def record_judge_call(judge, provider, model, queue_wait, ttft, latency, tokens, state, fallback=False, error=None):
+    """심사 호출 한 건을 기록합니다. 텔레메트리 실패가 심사 결과를 막지 않도록 예외는 출력만 합니다."""
+    generation = None
+    if ttft is not None and tokens and latency is not None and latency > ttft:
+        generation = tokens / (latency - ttft)
+    try:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO judge_telemetry
+                  (judge, provider, model, queue_wait, ttft, latency, tokens, tokens_per_sec, state, fallback, error)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);
+                """,
+                (
+                    judge, provider, model, queue_wait, ttft, latency, tokens,
+                    None if generation is None else round(generation, 2), state, bool(fallback),
+                    None if error is None else str(error)[:ERROR_MAX_CHARS],
+                ),
+            )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        invalidate_tables("judge_telemetry")
+    except Exception as e:
+        print(f"심사 텔레메트리 기록 실패: {type(e).__name__}: {e}")
+
+
+_PERCENTILES = """
+    COUNT(*) AS calls,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY latency) AS latency_p50,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY latency) AS latency_p95,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY ttft) AS ttft_p50,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY ttft) AS ttft_p95,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY queue_wait) AS queue_wait_p50,
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY queue_wait) AS queue_wait_p95,
+    percentile_cont(0.5) WITHIN GROUP (ORDER BY tokens_per_sec) AS tokens_per_sec_p50,
+    ROUND(AVG(fallback::int) * 100, 1)::float AS fallback_pct
+"""
+
+
+def provider_summary(days=7):
+    """최근 days일 호출을 (제공자, 모델)별 p50/p95로 요약합니다. 취소된 호출은 제외합니다."""
+    return df_query(
+        f"""
+        SELECT provider, model, {_PERCENTILES}
+        FROM judge_telemetry
+        WHERE created_at >= NOW() - %s * INTERVAL '1 day' AND state <> '취소'
+        GROUP BY provider, model
+        ORDER BY latency_p95 DESC NULLS LAST;
+        """,
+        (int(days),),
+        cache=True,
+    )
+
+
+def provider_series(days=7, bucket="hour"):
+    """제공자별 p50/p95를 bucket(hour/day) 단위 시계열로 반환합니다."""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket은 {', '.join(BUCKETS)} 중 하나여야 합니다")
+    return df_query(
+        f"""
+        SELECT date_trunc('{bucket}', created_at) AS bucket, provider, {_PERCENTILES}
+        FROM judge_telemetry
+        WHERE created_at >= NOW() - %s * INTERVAL '1 day' AND state <> '취소'
+        GROUP BY 1, provider
+        ORDER BY 1, provider;
+        """,
+        (int(days),),
+        cache=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="심사위원 제공자별 지연·처리량 요약")
+    parser.add_argument("--days", type=int, default=7, help="최근 며칠을 요약할지")
+    args = parser.parse_args()
+    summary = provider_summary(args.days)
+    if summary.empty:
+        print("기록된 심사 호출이 없습니다.")
+        return
+    print(summary.round(2).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+가사 카탈로그('아티스트 - 곡명:' 다음 줄부터 가사) 파싱과 읽기입니다.
+
+import해도 환경 변수를 바꾸거나 DB 엔진을 만들지 않으므로 api.py·batch_audition.py처럼
+data_processing을 불러오면 안 되는 프로세스에서도 씁니다. LYRICS_FILE이 있으면 S3 대신 그 로컬 파일을 읽습니다.
+"""
+import os
+import time
+import threading
+from config import AWS_ACCESS_KEY, AWS_SECRET_KEY, AWS_REGION, S3_BUCKET_NAME, S3_FILE_KEY
+
+CACHE_SECONDS = 300
+_cache = {"at": None, "songs": None}
+_cache_lock = threading.Lock()
+
+
+def parse_lyrics(content):
+    songs = []
+    current_song = None
+    current_lyrics = []
+
+    for line in content.split("\n"):
+        line = line.strip()
+        if " - " in line and line.endswith(":"):
+            if current_song and current_lyrics:
+                songs.append({**current_song, "review": "\n".join(current_lyrics)[:500]})
+            parts = line[:-1].split(" - ", 1)
+            current_song = {"artist": parts[0].strip(), "title": parts[1].strip()}
+            current_lyrics = []
+        elif current_song and line:
+            current_lyrics.append(line)
+
+    if current_song and current_lyrics:
+        songs.append({**current_song, "review": "\n".join(current_lyrics)[:500]})
+
+    return songs
+
+
+def _read_catalog():
+    local_path = os.getenv("LYRICS_FILE")
+    if local_path:
+        with open(local_path, encoding="utf-8") as f:
+            return parse_lyrics(f.read())
+    import boto3
+    s3 = boto3.client(
+        "s3",
+        aws_access_key_id=AWS_ACCESS_KEY,
+        aws_secret_access_key=AWS_SECRET_KEY,
+        region_name=AWS_REGION,
+    )
+    response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_KEY)
+    return parse_lyrics(response["Body"].read().decode("utf-8"))
+
+
+def load_lyrics_catalog():
+    """가사 파일 전체를 곡 목록으로 반환합니다. CACHE_SECONDS 동안 프로세스 안에서 재사용하며, 실패 시 예외를 그대로 올립니다."""
+    with _cache_lock:
+        if _cache["at"] is not None and time.monotonic() - _cache["at"] < CACHE_SECONDS:
+            return _cache["songs"]
+        songs = _read_catalog()
+        _cache.update(at=time.monotonic(), songs=songs)
+        return songs
@@ -0,0 +1,246 @@
+"""
+프로세스 전체가 공유하는 daily_metrics 열 지향 메모리 저장소입니다.
+
+카탈로그의 일별 지표를 (artist_id, date) 순으로 정렬된 연속 NumPy 배열로 한 번만 읽어 두고,
+아티스트별 시작 위치(offsets, CSR 방식)로 잘라 복사 없이 읽습니다. 세션·재실행마다 같은 행을 다시 조회하거나
+st.cache_data로 DataFrame을 pickle하지 않아도 됩니다. 카탈로그 세대 번호(data_generations)가 바뀌면 다음 조회 때 다시 읽습니다.
+
+METRICS_STORE_SHM=1이면 배열을 multiprocessing.shared_memory 세그먼트(이름에 DB 식별자와 세대 번호 포함)에 두어
+같은 서버의 다른 프로세스(Streamlit 워커, api.py)가 DB를 다시 읽지 않고 붙어서 씁니다. 세대가 바뀌면 각 프로세스는
+자기가 만든 이전 세그먼트의 이름을 지웁니다(이미 붙어 있는 프로세스의 매핑은 그대로 유효).
+
+환경 변수:
+    METRICS_STORE=1                 0이면 저장소를 끄고 analytics가 Postgres를 직접 조회
+    METRICS_STORE_SHM=0             1이면 공유 메모리 사용
+    METRICS_STORE_SHM_PREFIX=ictmetrics
+    METRICS_STORE_CHECK_SECONDS=2   세대 번호 확인 최소 간격(초)
+"""
+import os
+import time
+import struct
+import hashlib
+import atexit
+import threading
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory, resource_tracker
+from db import df_query_typed, get_generation
+from query_cache import _env_flag
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+ENABLED = _env_flag("METRICS_STORE")
+USE_SHM = _env_flag("METRICS_STORE_SHM", "0")
+SHM_PREFIX = os.getenv("METRICS_STORE_SHM_PREFIX", "ictmetrics")
+CHECK_SECONDS = float(os.getenv("METRICS_STORE_CHECK_SECONDS", "2"))
+# 공유 메모리 헤더: [MAGIC, generation, n_artists, n_rows]. MAGIC은 데이터를 다 쓴 뒤 마지막에 기록
+MAGIC = 0x4D45545249435331
+HEADER = 4
+HEADER_FMT = "<4q"
+ATTACH_WAIT_SECONDS = 10.0
+
+
+class Snapshot:
+    """한 세대의 읽기 전용 배열 묶음입니다. 교체되어도 이미 꺼낸 조각은 그대로 유효합니다."""
+
+    def __init__(self, generation, artist_ids, offsets, dates, values, shm=None, source="db"):
+        self.generation = generation
+        self.artist_ids = artist_ids
+        self.offsets = offsets
+        self.dates = dates
+        self.values = values
+        self.shm = shm
+        self.source = source
+        self.loaded_at = time.time()
+        for a in (artist_ids, offsets, dates, values):
+            a.flags.writeable = False
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.artist_ids, self.offsets, self.dates, self.values))
+
+    def bounds(self, artist_id, start=None, end=None):
+        """artist_id의 [start, end] 날짜 구간이 차지하는 (lo, hi) 위치를 반환합니다. 없으면 (0, 0)입니다."""
+        i = int(np.searchsorted(self.artist_ids, artist_id))
+        if i >= len(self.artist_ids) or self.artist_ids[i] != artist_id:
+            return 0, 0
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        if start is not None or end is not None:
+            d = self.dates[lo:hi]
+            if start is not None:
+                lo += int(np.searchsorted(d, np.datetime64(start, "ns"), side="left"))
+            if end is not None:
+                hi = int(self.offsets[i]) + int(np.searchsorted(d, np.datetime64(end, "ns"), side="right"))
+        return lo, max(lo, hi)
+
+    def frame(self, artist_id, start=None, end=None):
+        """한 아티스트의 (date, 플랫폼 열) DataFrame. 배열을 복사하지 않는 읽기 전용 뷰입니다."""
+        lo, hi = self.bounds(artist_id, start, end)
+        data = {"date": self.dates[lo:hi]}
+        for j, c in enumerate(PLATFORM_COLS):
+            data[c] = self.values[j, lo:hi]
+        return pd.DataFrame(data, copy=False)
+
+    def frames(self, artist_ids, start=None, end=None):
+        """여러 아티스트의 (artist_id, date, 플랫폼 열) DataFrame. 구간을 이어 붙이므로 한 번 복사합니다."""
+        spans = [(int(a), *self.bounds(int(a), start, end)) for a in sorted({int(a) for a in artist_ids})]
+        spans = [(a, lo, hi) for a, lo, hi in spans if hi > lo]
+        if not spans:
+            return pd.DataFrame({"artist_id": np.array([], dtype=np.int64), "date": np.array([], dtype="datetime64[ns]"), **{c: np.array([], dtype=np.int64) for c in PLATFORM_COLS}})
+        idx = np.concatenate([np.arange(lo, hi) for _, lo, hi in spans])
+        data = {"artist_id": np.repeat([a for a, _, _ in spans], [hi - lo for _, lo, hi in spans]).astype(np.int64), "date": self.dates[idx]}
+        for j, c in enumerate(PLATFORM_COLS):
+            data[c] = self.values[j, idx]
+        return pd.DataFrame(data, copy=False)
+
+
+def _load_arrays():
+    df = df_query_typed(
+        "SELECT artist_id, date, youtube_views, spotify_streams, soundcloud_plays FROM daily_metrics ORDER BY artist_id, date;",
+        numeric=PLATFORM_COLS,
+        fill=0,
+    )
+    ids = df["artist_id"].to_numpy(dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]]) if len(ids) else np.array([], dtype=np.int64)
+    artist_ids = ids[starts]
+    offsets = np.r_[starts, len(ids)].astype(np.int64)
+    dates = df["date"].to_numpy(dtype="datetime64[ns]")
+    values = np.vstack([df[c].to_numpy(dtype=np.int64) for c in PLATFORM_COLS]) if len(df) else np.zeros((len(PLATFORM_COLS), 0), dtype=np.int64)
+    return artist_ids, offsets, dates, np.ascontiguousarray(values)
+
+
+def _db_identity():
+    """세그먼트 이름에 넣을 DB 식별자입니다. 같은 호스트의 서로 다른 DB(운영·테스트용)가 서로의 세그먼트에 붙지 않게 합니다."""
+    key = f"{os.getenv('PG_HOST', '')}:{os.getenv('PG_PORT', '5432')}/{os.getenv('PG_DB', '')}"
+    # macOS는 공유 메모리 이름이 31자로 제한되므로 짧은 해시만 사용
+    return hashlib.blake2s(key.encode(), digest_size=4).hexdigest()
+
+
+def _shm_views(buf, n_artists, n_rows):
+    """공유 메모리 버퍼를 헤더 뒤의 배열 뷰로 나눕니다."""
+    pos = HEADER * 8
+    artist_ids = np.ndarray((n_artists,), np.int64, buf, pos)
+    pos += n_artists * 8
+    offsets = np.ndarray((n_artists + 1,), np.int64, buf, pos)
+    pos += (n_artists + 1) * 8
+    dates = np.ndarray((n_rows,), "datetime64[ns]", buf, pos)
+    pos += n_rows * 8
+    values = np.ndarray((len(PLATFORM_COLS), n_rows), np.int64, buf, pos)
+    return artist_ids, offsets, dates, values
+
+
+def _shm_size(n_artists, n_rows):
+    return (HEADER + n_artists + n_artists + 1 + n_rows * (1 + len(PLATFORM_COLS))) * 8
+
+
+class MetricsStore:
+    def __init__(self, enabled=ENABLED, use_shm=USE_SHM):
+        self.enabled = enabled
+        self.use_shm = use_shm
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._stale = False
+        self._owned = None
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def mark_stale(self):
+        """다음 snapshot() 호출에서 세대 번호를 바로 확인하게 합니다 (수집 직후 호출)."""
+        self._stale = True
+
+    def snapshot(self):
+        """현재 세대의 Snapshot을 반환합니다. 저장소가 꺼져 있으면 None입니다."""
+        if not self.enabled:
+            return None
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is not None and not self._stale and now - self._checked_at < CHECK_SECONDS:
+            return snap
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and not self._stale and time.monotonic() - self._checked_at < CHECK_SECONDS:
+                return snap
+            generation = get_generation()
+            self._checked_at = time.monotonic()
+            self._stale = False
+            if snap is None or snap.generation != generation:
+                t0 = time.perf_counter()
+                snap = self._load(generation)
+                self.load_seconds += time.perf_counter() - t0
+                self.loads += 1
+                # 이전 Snapshot은 참조만 놓음. 읽는 중인 조각이 없어지면 매핑도 함께 해제됨
+                self._snapshot = snap
+            return snap
+
+    def _load(self, generation):
+        if not self.use_shm:
+            return Snapshot(generation, *_load_arrays())
+        # 세대가 바뀌었으므로 새 세그먼트를 만들든 남의 것에 붙든 이 프로세스가 만든 이전 세그먼트는 이름을 지움
+        self._unlink_owned()
+        name = f"{SHM_PREFIX}_{_db_identity()}_{generation}"
+        snap = self._attach(name, generation)
+        if snap is not None:
+            return snap
+        arrays = _load_arrays()
+        n_artists, n_rows = len(arrays[0]), len(arrays[2])
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=max(8, _shm_size(n_artists, n_rows)))
+        except FileExistsError:
+            # 다른 프로세스가 먼저 만들었으면 그쪽 세그먼트를 쓰고, 붙지 못하면 이 프로세스 전용으로 사용
+            return self._attach(name, generation) or Snapshot(generation, *arrays)
+        views = _shm_views(shm.buf, n_artists, n_rows)
+        for dst, src in zip(views, arrays):
+            dst[...] = src
+        struct.pack_into(HEADER_FMT, shm.buf, 0, MAGIC, generation, n_artists, n_rows)
+        self._owned = shm
+        return Snapshot(generation, *views, shm=shm, source="shm:created")
+
+    def _attach(self, name, generation):
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            return None
+        # 붙기만 한 세그먼트를 이 프로세스 종료 시 resource_tracker가 지우지 않도록 등록 해제
+        resource_tracker.unregister(shm._name, "shared_memory")
+        deadline = time.monotonic() + ATTACH_WAIT_SECONDS
+        while True:
+            magic, gen, n_artists, n_rows = struct.unpack_from(HEADER_FMT, shm.buf, 0)
+            if magic == MAGIC:
+                break
+            if time.monotonic() > deadline:
+                shm.close()
+                return None
+            time.sleep(0.05)
+        if gen != generation:
+            shm.close()
+            return None
+        return Snapshot(generation, *_shm_views(shm.buf, n_artists, n_rows), shm=shm, source="shm:attached")
+
+    def _unlink_owned(self):
+        if self._owned is not None:
+            try:
+                self._owned.unlink()
+            except FileNotFoundError:
+                pass
+            self._owned = None
+
+    def close(self):
+        self._unlink_owned()
+
+    def stats(self):
+        snap = self._snapshot
+        out = {"enabled": self.enabled, "shared_memory": self.use_shm, "loads": self.loads, "load_seconds": round(self.load_seconds, 2)}
+        if snap is not None:
+            out.update({
+                "generation": snap.generation,
+                "artists": len(snap.artist_ids),
+                "rows": len(snap.dates),
+                "bytes": snap.nbytes,
+                "source": snap.source,
+                "age_seconds": round(time.time() - snap.loaded_at, 1),
+            })
+        return out
+
+
+STORE = MetricsStore()
+atexit.register(STORE.close)
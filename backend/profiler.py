@@ -0,0 +1,133 @@
+"""
+재실행 한 번을 위한 샘플링 프로파일러입니다.
+
+별도 데몬 스레드가 INTERVAL초마다 sys._current_frames()로 대상 스레드(Streamlit 스크립트 스레드)의 호출 스택을 읽어
+(스택 → 샘플 수)로 모읍니다. 코드를 계측하지 않으므로 켜 두어도 재실행이 거의 느려지지 않습니다.
+결과는 flamegraph.pl·speedscope가 읽는 collapsed-stack 텍스트, 함수별 self/total 상위 N 표,
+그리고 가장 안쪽 backend 모듈(db, analytics, data_processing, services 등) 기준 시간 분포로 내보냅니다.
+"""
+import os
+import sys
+import time
+import threading
+
+INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_DEPTH = 128
+# st.rerun() 등으로 stop()이 불리지 않아도 샘플러 스레드가 남지 않도록 하는 상한
+MAX_SECONDS = 120.0
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+OTHER = "(기타)"
+
+
+def _module_of(code):
+    """backend 디렉터리의 파일이면 모듈 이름(파일 이름), 아니면 None입니다."""
+    path = os.path.abspath(code.co_filename)
+    if os.path.dirname(path) != BACKEND_DIR:
+        return None
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _label(code):
+    module = _module_of(code)
+    if module is None:
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+    return f"{module}.{code.co_name}"
+
+
+class Profiler:
+    """with Profiler() as prof: 블록 안에서 현재 스레드를 샘플링합니다. start()/stop()으로도 씁니다."""
+
+    def __init__(self, thread_id=None, interval=INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.duration = 0.0
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._t0 = 0.0
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            code = frame.f_code
+            key = self._labels.get(code)
+            if key is None:
+                key = self._labels[code] = (_label(code), _module_of(code))
+            stack.append(key)
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self):
+        me = threading.get_ident()
+        deadline = time.monotonic() + MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.thread_id == me:
+                continue
+            stack = self._stack(frame)
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="rerun-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self._t0
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    @property
+    def ms_per_sample(self):
+        return self.duration * 1000 / self.samples if self.samples else 0.0
+
+    def collapsed(self):
+        """flamegraph.pl / speedscope 형식: 한 줄에 '바깥;...;안쪽 샘플수'."""
+        lines = [f"{';'.join(label for label, _ in stack)} {n}" for stack, n in self.stacks.items()]
+        return "\n".join(sorted(lines)) + "\n"
+
+    def top(self, n=20):
+        """함수별 self(스택 맨 안쪽)·total(스택 어딘가) 샘플 수를 total 내림차순으로 n개 반환합니다."""
+        self_counts, total_counts = {}, {}
+        for stack, count in self.stacks.items():
+            leaf = stack[-1][0]
+            self_counts[leaf] = self_counts.get(leaf, 0) + count
+            for label in {label for label, _ in stack}:
+                total_counts[label] = total_counts.get(label, 0) + count
+        ms = self.ms_per_sample
+        rows = [
+            {
+                "function": label,
+                "self_ms": round(self_counts.get(label, 0) * ms, 1),
+                "total_ms": round(total * ms, 1),
+                "self_pct": round(self_counts.get(label, 0) * 100 / self.samples, 1),
+                "total_pct": round(total * 100 / self.samples, 1),
+            }
+            for label, total in total_counts.items()
+        ]
+        return sorted(rows, key=lambda r: (r["total_ms"], r["self_ms"]), reverse=True)[:n]
+
+    def by_module(self):
+        """샘플을 스택에서 가장 안쪽에 있는 backend 모듈로 나눈 시간 분포입니다 (라이브러리 안의 시간도 호출한 모듈로)."""
+        counts = {}
+        for stack, count in self.stacks.items():
+            module = next((m for _, m in reversed(stack) if m is not None), OTHER)
+            counts[module] = counts.get(module, 0) + count
+        ms = self.ms_per_sample
+        rows = [{"module": m, "ms": round(c * ms, 1), "pct": round(c * 100 / self.samples, 1)} for m, c in counts.items()]
+        return sorted(rows, key=lambda r: r["ms"], reverse=True)
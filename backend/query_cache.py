@@ -0,0 +1,145 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+_WHITESPACE = re.compile(r"\s+")
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][\w.]*)", re.IGNORECASE)
+_WRITE_TABLE = re.compile(
+    r"^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM|TRUNCATE(?:\s+TABLE)?)\s+(?:ONLY\s+)?([A-Za-z_][\w.]*)",
+    re.IGNORECASE,
+)
+
+
+def _env_flag(name, default="1"):
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off")
+
+
+def normalize_sql(sql):
+    """공백과 끝의 세미콜론만 정리합니다. 리터럴은 결과를 바꾸므로 그대로 둡니다."""
+    return _WHITESPACE.sub(" ", str(sql)).strip().rstrip(";").strip()
+
+
+def read_tables(sql):
+    """SELECT가 읽는 테이블 이름(FROM/JOIN 뒤)을 소문자 집합으로 반환합니다."""
+    return frozenset(t.lower().split(".")[-1] for t in _READ_TABLES.findall(str(sql)))
+
+
+def written_table(sql):
+    """INSERT/UPDATE/DELETE/TRUNCATE 대상 테이블 이름을 반환합니다. 판별할 수 없으면 None입니다."""
+    m = _WRITE_TABLE.match(str(sql))
+    return m.group(1).lower().split(".")[-1] if m else None
+
+
+def _freeze(params):
+    if isinstance(params, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in params.items()))
+    if isinstance(params, (list, tuple, set, frozenset)):
+        items = sorted(params, key=repr) if isinstance(params, (set, frozenset)) else params
+        return tuple(_freeze(p) for p in items)
+    return params
+
+
+class QueryCache:
+    """
+    df_query 결과를 (정규화된 SQL, 파라미터) 키로 보관하는 바이트 상한 LRU 캐시입니다.
+    항목마다 읽은 테이블의 쓰기 세대 번호를 함께 저장하고, 조회 시 세대가 바뀌었거나 max_age가 지났으면 버립니다.
+    세대 번호는 이 프로세스 안의 쓰기(exec_sql, 수집 경로)만 반영합니다. 다른 프로세스의 쓰기는 db.observe_generation이
+    카탈로그 세대 변화를 보고 전체를 무효화하며, max_age는 그 밖의 경우를 위한 상한입니다.
+    """
+
+    def __init__(self, max_bytes, max_age=300.0):
+        self.max_bytes = int(max_bytes)
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._table_gens = {}
+        self._global_gen = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(sql, params):
+        return normalize_sql(sql), _freeze(params)
+
+    def _gens(self, tables):
+        return self._global_gen, tuple(sorted((t, self._table_gens.get(t, 0)) for t in tables))
+
+    def snapshot(self, tables):
+        """조회를 시작하기 전에 읽을 테이블의 세대를 잡아 둡니다. 조회 중에 쓰기가 끝나면 그 결과는 저장 즉시 무효가 됩니다."""
+        with self._lock:
+            return self._gens(tables)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            df, nbytes, tables, gens, stored_at = entry
+            if gens != self._gens(tables) or time.monotonic() - stored_at > self.max_age:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return df.copy()
+
+    def put(self, key, df, tables, gens):
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df.copy(), nbytes, tables, gens, time.monotonic())
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                old_key = next(iter(self._entries))
+                self._drop(old_key)
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+
+    def invalidate(self, *tables):
+        """테이블의 쓰기 세대를 올립니다. 테이블을 지정하지 않으면 모든 항목이 무효가 됩니다."""
+        with self._lock:
+            if not tables:
+                self._global_gen += 1
+                return
+            for t in tables:
+                t = t.lower()
+                self._table_gens[t] = self._table_gens.get(t, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+ENABLED = _env_flag("QUERY_CACHE")
+CACHE = QueryCache(
+    max_bytes=float(os.getenv("QUERY_CACHE_MB", "64")) * 1024 * 1024,
+    max_age=float(os.getenv("QUERY_CACHE_MAX_AGE", "300")),
+)
@@ -0,0 +1,239 @@
+"""
+변동성·모멘텀 롤링 지표를 (아티스트, 플랫폼)마다 rolling_state / rolling_indicators에 저장합니다.
+동기화 때는 값이 바뀐 아티스트만 갱신하고, 상태가 없는 아티스트는 앱 시작 시 한 번 backfill_rolling_stats()로 채웁니다.
+
+사용 예 (backend 디렉터리에서):
+    python rolling_stats.py   # 상태가 없는 아티스트 채우기
+"""
+import math
+from collections import deque
+import pandas as pd
+from db import get_db_connection, df_query
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+MIN_VALUE = 100000
+VOL_WINDOW = 30
+MOM_WINDOW = 7
+
+
+class RollingState:
+    """
+    (아티스트, 플랫폼) 하나의 변동성·모멘텀 지표를 새 날짜가 들어올 때마다 O(1)로 갱신합니다.
+    analytics.calculate_volatility_index / calculate_momentum_score와 같은 규칙(100,000 기준, 최소 표본 수, clip, 반올림)을 따릅니다.
+    """
+
+    def __init__(self, last_date=None, last_value=None, n_rows=0, returns=None, pos_deltas=None):
+        self.last_date = last_date
+        self.last_value = last_value
+        self.n_rows = int(n_rows)
+        self.returns = deque(returns or [], maxlen=VOL_WINDOW)
+        self.pos_deltas = deque(pos_deltas or [], maxlen=MOM_WINDOW * 2)
+        self._resync()
+
+    def _resync(self):
+        # 누적 합은 저장된 창에서 다시 계산 (저장된 합을 이어 쓰거나 오래 밀어 넣으면 빼기 오차가 쌓임)
+        self.ret_sum = math.fsum(self.returns)
+        self.ret_sumsq = math.fsum(r * r for r in self.returns)
+        recent = list(self.pos_deltas)[-MOM_WINDOW:]
+        self.recent_sum = math.fsum(recent)
+        self.prev_sum = math.fsum(self.pos_deltas) - self.recent_sum
+        self._pushes = 0
+
+    def push(self, day, value):
+        value = float(value)
+        if value <= MIN_VALUE:
+            return
+        if self.last_value is not None:
+            self._push_return(value / self.last_value - 1.0)
+            delta = value - self.last_value
+            if delta > 0:
+                self._push_delta(delta)
+        self.last_date = day
+        self.last_value = value
+        self.n_rows += 1
+        self._pushes += 1
+        if self._pushes >= VOL_WINDOW:
+            self._resync()
+
+    def _push_return(self, r):
+        if len(self.returns) == VOL_WINDOW:
+            old = self.returns[0]
+            self.ret_sum -= old
+            self.ret_sumsq -= old * old
+        self.returns.append(r)
+        self.ret_sum += r
+        self.ret_sumsq += r * r
+
+    def _push_delta(self, d):
+        ring = self.pos_deltas
+        if len(ring) >= MOM_WINDOW:
+            moved = ring[-MOM_WINDOW]
+            self.recent_sum -= moved
+            self.prev_sum += moved
+        if len(ring) == MOM_WINDOW * 2:
+            self.prev_sum -= ring[0]
+        ring.append(d)
+        self.recent_sum += d
+
+    def volatility(self):
+        k = len(self.returns)
+        if self.n_rows < 15 or k < 14:
+            return None
+        var = (self.ret_sumsq - self.ret_sum * self.ret_sum / k) / (k - 1)
+        vol = math.sqrt(max(var, 0.0)) * 100.0
+        return round(min(max(vol, 0.0), 300.0), 2)
+
+    def momentum(self):
+        if self.n_rows < MOM_WINDOW * 2 + 2 or len(self.pos_deltas) < MOM_WINDOW * 2:
+            return None
+        prev_avg = self.prev_sum / MOM_WINDOW
+        if prev_avg <= 0:
+            return None
+        ratio = (self.recent_sum / MOM_WINDOW) / prev_avg
+        return round(min(max(ratio, 0.1), 3.0), 2)
+
+
+def _load_state(cursor, artist_id, platform):
+    cursor.execute(
+        "SELECT last_date, last_value, n_rows, returns, pos_deltas FROM rolling_state WHERE artist_id=%s AND platform=%s;",
+        (artist_id, platform),
+    )
+    row = cursor.fetchone()
+    return RollingState(*row) if row else None
+
+
+def _save_state(cursor, artist_id, platform, st_):
+    cursor.execute(
+        """
+        INSERT INTO rolling_state (artist_id, platform, last_date, last_value, n_rows, returns, ret_sum, ret_sumsq, pos_deltas, volatility, momentum, updated_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+        ON CONFLICT (artist_id, platform) DO UPDATE SET
+          last_date=EXCLUDED.last_date, last_value=EXCLUDED.last_value, n_rows=EXCLUDED.n_rows,
+          returns=EXCLUDED.returns, ret_sum=EXCLUDED.ret_sum, ret_sumsq=EXCLUDED.ret_sumsq,
+          pos_deltas=EXCLUDED.pos_deltas, volatility=EXCLUDED.volatility, momentum=EXCLUDED.momentum, updated_at=NOW();
+        """,
+        (
+            artist_id, platform, st_.last_date, st_.last_value, st_.n_rows,
+            list(st_.returns), st_.ret_sum, st_.ret_sumsq, list(st_.pos_deltas),
+            st_.volatility(), st_.momentum(),
+        ),
+    )
+
+
+def _replay(cursor, artist_id, platform, state, after=None, since=None):
+    """
+    after 이후의 daily_metrics 값을 state에 밀어 넣습니다. since 이전 날짜는 상태만 쌓고,
+    since 이후(since가 None이면 전부) 날짜의 (artist_id, platform, date, volatility, momentum) 행을 반환합니다.
+    """
+    sql = f"SELECT date, {platform} FROM daily_metrics WHERE artist_id=%s AND {platform}>%s"
+    params = [artist_id, MIN_VALUE]
+    if after is not None:
+        sql += " AND date>%s"
+        params.append(after)
+    cursor.execute(sql + " ORDER BY date ASC;", params)
+    series = []
+    for day, value in cursor.fetchall():
+        state.push(day, value)
+        if since is None or day >= since:
+            series.append((artist_id, platform, day, state.volatility(), state.momentum()))
+    return series
+
+
+def refresh_rolling_stats(artist_id, since=None):
+    """
+    새로 수집된 날짜만 상태에 밀어 넣고 일별 지표 시계열을 추가합니다.
+    since(값이 바뀐 첫 날짜)가 마지막 반영 날짜 이전이면 상태는 처음부터 다시 쌓되, 지표 시계열은 since 이후만 다시 씁니다.
+    """
+    artist_id = int(artist_id)
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for platform in PLATFORM_COLS:
+            state = _load_state(cursor, artist_id, platform)
+            if state is not None and state.last_date is not None and (since is None or since > state.last_date):
+                series = _replay(cursor, artist_id, platform, state, after=state.last_date)
+            else:
+                state = RollingState()
+                if since is None:
+                    cursor.execute("DELETE FROM rolling_indicators WHERE artist_id=%s AND platform=%s;", (artist_id, platform))
+                else:
+                    cursor.execute(
+                        "DELETE FROM rolling_indicators WHERE artist_id=%s AND platform=%s AND date>=%s;",
+                        (artist_id, platform, since),
+                    )
+                series = _replay(cursor, artist_id, platform, state, since=since)
+            if series:
+                cursor.executemany(
+                    """
+                    INSERT INTO rolling_indicators (artist_id, platform, date, volatility, momentum)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON CONFLICT (artist_id, platform, date) DO UPDATE SET volatility=EXCLUDED.volatility, momentum=EXCLUDED.momentum;
+                    """,
+                    series,
+                )
+            _save_state(cursor, artist_id, platform, state)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def backfill_rolling_stats():
+    """상태가 없는 아티스트(배포 전 데이터, load_cmdata.py로 적재된 아티스트)를 처음부터 계산합니다. 계산한 아티스트 수를 반환합니다."""
+    df = df_query(
+        """
+        SELECT a.id FROM artists a
+        WHERE EXISTS (SELECT 1 FROM daily_metrics d WHERE d.artist_id = a.id)
+          AND NOT EXISTS (SELECT 1 FROM rolling_state r WHERE r.artist_id = a.id)
+        ORDER BY a.id;
+        """
+    )
+    for a_id in df["id"]:
+        refresh_rolling_stats(int(a_id))
+    return len(df)
+
+
+def get_current_indicators(artist_id):
+    """
+    플랫폼별 최신 변동성/모멘텀 값을 {platform:{"volatility":..,"momentum":..}} 형태로 반환합니다.
+    상태가 아직 없는 아티스트는 저장하지 않고 그 자리에서 계산합니다.
+    """
+    artist_id = int(artist_id)
+    df = df_query("SELECT platform, volatility, momentum FROM rolling_state WHERE artist_id=%s;", (artist_id,))
+    out = {p: {"volatility": None, "momentum": None} for p in PLATFORM_COLS}
+    if df.empty:
+        conn = get_db_connection()
+        try:
+            cursor = conn.cursor()
+            for platform in PLATFORM_COLS:
+                state = RollingState()
+                _replay(cursor, artist_id, platform, state)
+                out[platform] = {"volatility": state.volatility(), "momentum": state.momentum()}
+            cursor.close()
+        finally:
+            conn.close()
+        return out
+    for _, r in df.iterrows():
+        out[r["platform"]] = {
+            "volatility": None if pd.isna(r["volatility"]) else float(r["volatility"]),
+            "momentum": None if pd.isna(r["momentum"]) else float(r["momentum"]),
+        }
+    return out
+
+
+def get_indicator_series(artist_id, platform):
+    """저장된 일별 변동성/모멘텀 시계열을 DataFrame으로 반환합니다."""
+    df = df_query(
+        "SELECT date, volatility, momentum FROM rolling_indicators WHERE artist_id=%s AND platform=%s ORDER BY date ASC;",
+        (int(artist_id), platform),
+    )
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def main():
+    print(f"아티스트 {backfill_rolling_stats()}명 롤링 지표 계산")
+
+
+if __name__ == "__main__":
+    main()
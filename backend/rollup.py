@@ -0,0 +1,336 @@
+"""
+artist_growth_data -> daily_metrics 증분 집계 단계입니다.
+
+수집 경로(엑셀 동기화의 ingest_file, 루트의 load_cmdata.py)는 artist_growth_data에 쓰거나 지운 (아티스트, 날짜)를
+daily_metrics_changes 스테이징 테이블에 남기기만 하고, rollup_changes()가 그 키만 원본에서 다시 계산합니다.
+따라서 동기화 비용은 전체 이력이 아니라 새로 들어온 데이터 양에 비례합니다.
+
+집계 규칙: 같은 (아티스트, 곡, 플랫폼, 날짜)의 여러 행은 누적 수치이므로 최댓값을 취하고, 곡끼리는 합산합니다.
+플랫폼은 두 로더의 표기(YouTube/youtube_views 등)를 모두 받습니다. 원본 행이 모두 사라진 키는 daily_metrics에서도 지웁니다.
+
+같은 단계에서 바뀐 날짜가 속한 주·월만 daily_metrics_weekly/daily_metrics_monthly로 다시 집계합니다
+(플랫폼별 합계·마지막 값·최솟값·최댓값). 장기 조회는 일별 행 대신 이 테이블을 읽습니다.
+
+이 모듈은 db/config를 import하지 않으므로 커서를 넘겨 load_cmdata.py에서도 그대로 쓸 수 있습니다.
+
+사용 예 (backend 디렉터리에서):
+    python rollup.py            # 스테이징된 키만 집계
+    python rollup.py --full     # artist_growth_data 전체를 스테이징한 뒤 집계 (초기 구축·복구용)
+"""
+import argparse
+from psycopg2.extras import execute_values
+
+CHANGES_TABLE = "daily_metrics_changes"
+
+# 스테이징 테이블은 재계산할 키만 잠시 담으므로 WAL을 남기지 않음 (충돌 후 비어 있으면 다음 전체 재계산으로 복구)
+CHANGES_DDL = f"""
+CREATE UNLOGGED TABLE IF NOT EXISTS {CHANGES_TABLE} (
+    artist_name TEXT NOT NULL,
+    date DATE NOT NULL,
+    PRIMARY KEY (artist_name, date)
+);
+"""
+
+PLATFORM_COLS = ["youtube_views", "spotify_streams", "soundcloud_plays"]
+# 해상도 -> (테이블, date_trunc 단위, 기간 길이)
+PERIOD_TABLES = {
+    "week": ("daily_metrics_weekly", "week", "1 week"),
+    "month": ("daily_metrics_monthly", "month", "1 month"),
+}
+
+
+def platform_expr(alias="g"):
+    """metric_type을 daily_metrics 열 이름으로 바꾸는 SQL 식입니다. 두 로더의 표기(YouTube/youtube_views 등)를 모두 받습니다."""
+    return f"""
+CASE lower({alias}.metric_type)
+  WHEN 'youtube' THEN 'youtube_views' WHEN 'youtube_views' THEN 'youtube_views'
+  WHEN 'spotify' THEN 'spotify_streams' WHEN 'spotify_streams' THEN 'spotify_streams'
+  WHEN 'soundcloud' THEN 'soundcloud_plays' WHEN 'soundcloud_plays' THEN 'soundcloud_plays'
+END
+"""
+
+
+PLATFORM_COLUMN_SQL = platform_expr("g")
+
+
+def ensure_changes_table(cursor):
+    cursor.execute(CHANGES_DDL)
+
+
+def period_table_ddl(table):
+    stats = ",\n".join(
+        f"    {c}_{agg} BIGINT" for c in PLATFORM_COLS for agg in ("sum", "last", "min", "max")
+    )
+    return f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    artist_id INTEGER NOT NULL REFERENCES artists(id) ON DELETE CASCADE,
+    period_start DATE NOT NULL,
+    days INTEGER NOT NULL,
+    last_date DATE NOT NULL,
+{stats},
+    PRIMARY KEY (artist_id, period_start)
+);
+"""
+
+
+def ensure_period_tables(cursor):
+    """
+    주·월 집계 테이블을 만들고, 비어 있는데 daily_metrics에는 행이 있으면(처음 생성했거나 배포 전 데이터) 전체를 한 번 채웁니다.
+    반환: {해상도: 채운 구간 수}
+    """
+    for table, _, _ in PERIOD_TABLES.values():
+        cursor.execute(period_table_ddl(table))
+    cursor.execute("SELECT to_regclass('daily_metrics') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        return {}
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM daily_metrics);")
+    if not cursor.fetchone()[0]:
+        return {}
+    empty = []
+    for resolution, (table, _, _) in PERIOD_TABLES.items():
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table});")
+        if cursor.fetchone()[0]:
+            continue
+        # 동시에 시작한 다른 프로세스와 두 번 채우지 않도록 잠근 뒤 다시 확인
+        cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE;")
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {table});")
+        if not cursor.fetchone()[0]:
+            empty.append(resolution)
+    if not empty:
+        return {}
+    return refresh_periods(cursor, "SELECT artist_id, date FROM daily_metrics", resolutions=empty)
+
+
+def _period_aggregates():
+    parts = []
+    for c in PLATFORM_COLS:
+        parts += [
+            f"SUM(m.{c})::bigint",
+            f"(ARRAY_AGG(m.{c} ORDER BY m.date DESC) FILTER (WHERE m.{c} IS NOT NULL))[1]",
+            f"MIN(m.{c})",
+            f"MAX(m.{c})",
+        ]
+    return parts
+
+
+def refresh_periods(cursor, keys_sql, params=None, resolutions=None):
+    """
+    keys_sql이 돌려주는 (artist_id, date)가 속한 주·월 구간을 daily_metrics에서 다시 집계합니다.
+    일별 행이 하나도 남지 않은 구간은 지웁니다. resolutions로 해상도를 골라 갱신할 수 있습니다. 반환: {해상도: upsert된 구간 수}
+    """
+    cols = [f"{c}_{agg}" for c in PLATFORM_COLS for agg in ("sum", "last", "min", "max")]
+    out = {}
+    for resolution, (table, unit, length) in PERIOD_TABLES.items():
+        if resolutions is not None and resolution not in resolutions:
+            continue
+        cursor.execute(
+            f"""
+            WITH periods AS (
+              SELECT DISTINCT artist_id, date_trunc('{unit}', date)::date AS period_start FROM ({keys_sql}) k
+            ),
+            agg AS (
+              SELECT p.artist_id, p.period_start, COUNT(*) AS days, MAX(m.date) AS last_date, {', '.join(_period_aggregates())}
+              FROM periods p
+              JOIN daily_metrics m
+                ON m.artist_id = p.artist_id AND m.date >= p.period_start AND m.date < p.period_start + INTERVAL '{length}'
+              GROUP BY p.artist_id, p.period_start
+            ),
+            gone AS (
+              DELETE FROM {table} t USING periods p
+              WHERE t.artist_id = p.artist_id AND t.period_start = p.period_start
+                AND NOT EXISTS (SELECT 1 FROM agg a WHERE a.artist_id = p.artist_id AND a.period_start = p.period_start)
+            )
+            INSERT INTO {table} (artist_id, period_start, days, last_date, {', '.join(cols)})
+            SELECT * FROM agg
+            ON CONFLICT (artist_id, period_start) DO UPDATE SET
+              days = EXCLUDED.days, last_date = EXCLUDED.last_date,
+              {', '.join(f"{c} = EXCLUDED.{c}" for c in cols)};
+            """,
+            params,
+        )
+        out[resolution] = cursor.rowcount
+    return out
+
+
+def record_changes(cursor, artist_name, dates):
+    """artist_name의 dates(날짜 또는 datetime 목록)를 재계산 대상으로 남깁니다."""
+    keys = {(artist_name, d.date() if hasattr(d, "date") else d) for d in dates}
+    if keys:
+        execute_values(
+            cursor,
+            f"INSERT INTO {CHANGES_TABLE} (artist_name, date) VALUES %s ON CONFLICT DO NOTHING;",
+            sorted(keys),
+            page_size=1000,
+        )
+    return len(keys)
+
+
+def record_deleted(cursor, where_sql, params):
+    """
+    artist_growth_data에서 where_sql에 맞는 행을 지우면서 그 (아티스트, 날짜)를 한 문장으로 재계산 대상에 남깁니다.
+    지운 행 수를 반환합니다.
+    """
+    cursor.execute(
+        f"""
+        WITH gone AS (DELETE FROM artist_growth_data WHERE {where_sql} RETURNING artist_name, date),
+        staged AS (
+          INSERT INTO {CHANGES_TABLE} (artist_name, date)
+          SELECT DISTINCT artist_name, date::date FROM gone WHERE artist_name IS NOT NULL AND date IS NOT NULL
+          ON CONFLICT DO NOTHING
+        )
+        SELECT COUNT(*) FROM gone;
+        """,
+        params,
+    )
+    return int(cursor.fetchone()[0])
+
+
+def stage_all(cursor, artist_names=None):
+    """artist_growth_data의 모든 (아티스트, 날짜)를(artist_names가 있으면 그 아티스트만) 재계산 대상으로 남깁니다."""
+    where = "WHERE artist_name = ANY(%s)" if artist_names is not None else ""
+    cursor.execute(
+        f"""
+        INSERT INTO {CHANGES_TABLE} (artist_name, date)
+        SELECT DISTINCT artist_name, date::date FROM artist_growth_data
+        {where} {"AND" if where else "WHERE"} artist_name IS NOT NULL AND date IS NOT NULL
+        ON CONFLICT DO NOTHING;
+        """,
+        (list(artist_names),) if artist_names is not None else None,
+    )
+    return cursor.rowcount
+
+
+def stage_artist(cursor, artist_name, artist_id):
+    """
+    artist_name의 원본 날짜와 daily_metrics에 남아 있는 날짜를 모두 재계산 대상으로 남깁니다 (병합·이름 변경용).
+    원본이 없는 날짜의 daily_metrics 행은 다음 rollup_changes에서 지워집니다.
+    """
+    staged = stage_all(cursor, [artist_name])
+    cursor.execute(
+        f"""
+        INSERT INTO {CHANGES_TABLE} (artist_name, date)
+        SELECT %s, date FROM daily_metrics WHERE artist_id = %s
+        ON CONFLICT DO NOTHING;
+        """,
+        (artist_name, artist_id),
+    )
+    return staged + cursor.rowcount
+
+
+def song_expr(cursor, alias="g"):
+    """곡 이름 열: 엑셀 경로는 song_name, load_cmdata.py가 만든 테이블은 track_name입니다."""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = current_schema() AND table_name = 'artist_growth_data';"
+    )
+    names = [c for c in ("song_name", "track_name") if c in {r[0] for r in cursor.fetchall()}]
+    if not names:
+        return "NULL::text"
+    cols = [f"{alias}.{n}" for n in names]
+    return cols[0] if len(cols) == 1 else f"COALESCE({', '.join(cols)})"
+
+
+def rollup_changes(cursor):
+    """
+    스테이징된 키를 가져와(가져온 키는 스테이징에서 삭제) daily_metrics를 다시 계산합니다. 호출자가 커밋합니다.
+    반환: {"keys": n, "upserted": n, "deleted": n, "touched": {artist_name: (artist_id, 값이 실제로 바뀐 가장 이른 날짜)}}
+    upserted는 새로 생기거나 값이 달라진 행 수입니다. 같은 파일을 다시 수집해 값이 그대로인 날짜는 touched에 들어가지 않으므로
+    파생 지표(상관관계·롤링 지표·이상 징후)는 실제로 바뀐 첫 날짜부터만 다시 계산합니다.
+    """
+    song = song_expr(cursor)
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _rollup_keys (artist_id INTEGER, artist_name TEXT, date DATE) ON COMMIT DROP;")
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS _rollup_changed (artist_id INTEGER, date DATE) ON COMMIT DROP;")
+    cursor.execute("TRUNCATE _rollup_keys, _rollup_changed;")
+    # 가져오는 순간 스테이징에서 지우므로 동시에 들어온 새 키는 다음 집계로 넘어감. artists에 없는 이름은 버림
+    cursor.execute(
+        f"""
+        WITH claimed AS (DELETE FROM {CHANGES_TABLE} RETURNING artist_name, date)
+        INSERT INTO _rollup_keys (artist_id, artist_name, date)
+        SELECT a.id, c.artist_name, c.date FROM claimed c JOIN artists a ON a.name = c.artist_name;
+        """
+    )
+    keys = cursor.rowcount
+    if not keys:
+        return {"keys": 0, "upserted": 0, "deleted": 0, "periods": {}, "touched": {}}
+    cursor.execute("ANALYZE _rollup_keys;")
+
+    # 범위 조건이라 date가 DATE든 TIMESTAMP든 (artist_name, metric_type, date) 인덱스를 탐
+    cursor.execute(
+        f"""
+        WITH per_song AS (
+          SELECT k.artist_id, k.date, {PLATFORM_COLUMN_SQL} AS platform, {song} AS song, MAX(g.value) AS value
+          FROM _rollup_keys k
+          JOIN artist_growth_data g
+            ON g.artist_name = k.artist_name AND g.date >= k.date AND g.date < k.date + 1
+          GROUP BY 1, 2, 3, 4
+        ),
+        up AS (
+          INSERT INTO daily_metrics (artist_id, date, youtube_views, spotify_streams, soundcloud_plays)
+          SELECT artist_id, date,
+            (SUM(value) FILTER (WHERE platform = 'youtube_views'))::bigint,
+            (SUM(value) FILTER (WHERE platform = 'spotify_streams'))::bigint,
+            (SUM(value) FILTER (WHERE platform = 'soundcloud_plays'))::bigint
+          FROM per_song
+          GROUP BY artist_id, date
+          ON CONFLICT (artist_id, date) DO UPDATE SET
+            youtube_views = EXCLUDED.youtube_views,
+            spotify_streams = EXCLUDED.spotify_streams,
+            soundcloud_plays = EXCLUDED.soundcloud_plays
+          WHERE (daily_metrics.youtube_views, daily_metrics.spotify_streams, daily_metrics.soundcloud_plays)
+            IS DISTINCT FROM (EXCLUDED.youtube_views, EXCLUDED.spotify_streams, EXCLUDED.soundcloud_plays)
+          RETURNING artist_id, date
+        )
+        INSERT INTO _rollup_changed (artist_id, date) SELECT artist_id, date FROM up;
+        """
+    )
+    upserted = cursor.rowcount
+    cursor.execute(
+        """
+        WITH gone AS (
+          DELETE FROM daily_metrics d USING _rollup_keys k
+          WHERE d.artist_id = k.artist_id AND d.date = k.date
+            AND NOT EXISTS (
+              SELECT 1 FROM artist_growth_data g
+              WHERE g.artist_name = k.artist_name AND g.date >= k.date AND g.date < k.date + 1
+            )
+          RETURNING d.artist_id, d.date
+        )
+        INSERT INTO _rollup_changed (artist_id, date) SELECT artist_id, date FROM gone;
+        """
+    )
+    deleted = cursor.rowcount
+    periods = refresh_periods(cursor, "SELECT artist_id, date FROM _rollup_keys")
+    cursor.execute(
+        """
+        SELECT a.name, c.artist_id, MIN(c.date)
+        FROM _rollup_changed c JOIN artists a ON a.id = c.artist_id
+        GROUP BY a.name, c.artist_id;
+        """
+    )
+    touched = {name: (int(a_id), since) for name, a_id, since in cursor.fetchall()}
+    return {"keys": keys, "upserted": upserted, "deleted": deleted, "periods": periods, "touched": touched}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="daily_metrics 증분 집계")
+    parser.add_argument("--full", action="store_true", help="artist_growth_data 전체를 다시 집계")
+    args = parser.parse_args()
+    from db import get_db_connection, invalidate_tables, bump_generation
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        ensure_changes_table(cursor)
+        ensure_period_tables(cursor)
+        if args.full:
+            print(f"스테이징 {stage_all(cursor):,}개 키")
+        result = rollup_changes(cursor)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    invalidate_tables("daily_metrics", *(t for t, _, _ in PERIOD_TABLES.values()))
+    bump_generation(*result["touched"])
+    print(f"키 {result['keys']:,}개 · upsert {result['upserted']:,}행 · 삭제 {result['deleted']:,}행 · 주·월 구간 {result['periods']} · 아티스트 {len(result['touched'])}명")
+
+
+if __name__ == "__main__":
+    main()
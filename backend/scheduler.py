@@ -0,0 +1,227 @@
+"""
+LLM 제공자별 호출 스케줄러입니다.
+
+한 프로세스 안의 모든 세션(Streamlit 재실행, API 서버의 SSE 스트림, 배치 심사)이 같은 SCHEDULER를 공유합니다.
+제공자마다 분당 요청 수를 토큰 버킷으로 제한하고, 동시 호출 수는 AIMD로 조정합니다:
+성공할 때마다 한도를 1/한도만큼 올리고(한도만큼 성공하면 +1), 429(rate limit)를 받으면 절반으로 줄인 뒤
+Retry-After(없으면 1초) 동안 새 호출을 멈춥니다. 현재 한도·진행 중·대기 수는 stats()로 확인합니다.
+
+환경 변수 (제공자 이름은 OPENAI, GEMINI, FRIENDLI, GITHUB_LLAMA, MOCK):
+    JUDGE_RPM_<제공자>              분당 최대 요청 수 (0이면 제한 없음)
+    JUDGE_MAX_CONCURRENCY_<제공자>  동시 호출 수 상한 (AIMD가 이 값을 넘지 않음)
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+# (분당 요청 수, 최대 동시 호출 수): 무료·기본 등급 한도에 맞춘 보수적인 기본값
+DEFAULT_LIMITS = {
+    "OPENAI": (500, 16),
+    "GEMINI": (30, 4),
+    "FRIENDLI": (60, 8),
+    "GITHUB_LLAMA": (15, 5),
+    # JUDGE_PROVIDER=MOCK: 외부 호출이 없으므로 속도 제한 없이 넉넉하게
+    "MOCK": (0, 64),
+}
+FALLBACK_LIMITS = (60, 4)
+INITIAL_CONCURRENCY = 2
+DECREASE_FACTOR = 0.5
+DEFAULT_RETRY_AFTER = 1.0
+MAX_RETRY_AFTER = 60.0
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+class TokenBucket:
+    """분당 최대 rate번의 시작을 허용하는 토큰 버킷입니다. burst만큼은 연달아 시작할 수 있습니다."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+    def acquire(self):
+        if self.interval <= 0:
+            return
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+    def available(self):
+        if self.interval <= 0:
+            return None
+        with self.lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+def is_rate_limited(exc):
+    """OpenAI 호환 RateLimitError, Gemini ResourceExhausted, 그 밖의 HTTP 429 예외를 판별합니다."""
+    if type(exc).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return True
+    for attr in ("status_code", "code", "status"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+def retry_after(exc, default=DEFAULT_RETRY_AFTER):
+    """예외에 실린 Retry-After 헤더(초)를 읽습니다. 없거나 읽을 수 없으면 default입니다."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = float(headers.get("retry-after") or headers.get("Retry-After") or default)
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, 0.0), MAX_RETRY_AFTER)
+
+
+class ProviderLimiter:
+    """제공자 하나의 토큰 버킷과 AIMD 동시 호출 한도입니다."""
+
+    def __init__(self, name, rate_per_minute, max_concurrency, initial=INITIAL_CONCURRENCY):
+        self.name = name
+        self.rate_per_minute = rate_per_minute
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.limit = float(min(max(1, initial), self.max_concurrency))
+        self.bucket = TokenBucket(rate_per_minute, burst=self.max_concurrency)
+        self.cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """동시 호출 자리와 버킷 토큰을 얻을 때까지 기다리고, 기다린 시간(초)을 반환합니다."""
+        t0 = time.monotonic()
+        with self.cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        self.cond.wait(self.paused_until - now)
+                    elif self.in_flight >= int(self.limit):
+                        self.cond.wait()
+                    else:
+                        break
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+        try:
+            self.bucket.acquire()
+        except BaseException:
+            self.release("error")
+            raise
+        waited = time.monotonic() - t0
+        with self.cond:
+            self.wait_seconds += waited
+        return waited
+
+    def release(self, outcome, pause=DEFAULT_RETRY_AFTER):
+        """outcome: ok(가산 증가), throttled(곱셈 감소 + 일시 정지), error/cancelled(한도 유지)."""
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if outcome == "ok":
+                self.successes += 1
+                self.limit = min(self.max_concurrency, self.limit + 1.0 / self.limit)
+            elif outcome == "throttled":
+                self.throttled += 1
+                self.paused_until = max(self.paused_until, now + pause)
+                # 동시에 나간 호출들이 한꺼번에 429를 받아도 한 번만 줄임
+                if now - self.last_decrease >= pause:
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                    self.last_decrease = now
+            elif outcome == "error":
+                self.errors += 1
+            self.cond.notify_all()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "provider": self.name,
+                "limit": int(self.limit),
+                "limit_exact": round(self.limit, 2),
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "rate_per_minute": self.rate_per_minute,
+                "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 1),
+                "successes": self.successes,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "wait_seconds": round(self.wait_seconds, 1),
+            }
+
+
+class ProviderScheduler:
+    """제공자 이름별 ProviderLimiter를 처음 쓸 때 환경 변수 설정으로 만들어 보관합니다."""
+
+    def __init__(self, limits=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def provider(self, name):
+        with self._lock:
+            limiter = self._providers.get(name)
+            if limiter is None:
+                rpm, conc = self.limits.get(name, FALLBACK_LIMITS)
+                limiter = ProviderLimiter(
+                    name,
+                    _env_float(f"JUDGE_RPM_{name}", rpm),
+                    int(_env_float(f"JUDGE_MAX_CONCURRENCY_{name}", conc)),
+                )
+                self._providers[name] = limiter
+            return limiter
+
+    @contextmanager
+    def slot(self, name, cancelled=()):
+        """
+        with SCHEDULER.slot("OPENAI") as waited: 형태로 호출을 감쌉니다.
+        블록이 정상 종료하면 성공, 429 예외면 한도 감소와 일시 정지, 그 밖의 예외는 한도를 바꾸지 않습니다.
+        cancelled에 넣은 예외 유형(소비자 쪽 중단 등)은 오류로 세지 않습니다.
+        """
+        limiter = self.provider(name)
+        waited = limiter.acquire()
+        try:
+            yield waited
+        except BaseException as e:
+            if isinstance(e, Exception) and is_rate_limited(e):
+                limiter.release("throttled", retry_after(e))
+            elif isinstance(e, Exception) and not isinstance(e, cancelled):
+                limiter.release("error")
+            else:
+                limiter.release("cancelled")
+            raise
+        limiter.release("ok")
+
+    def stats(self):
+        with self._lock:
+            limiters = list(self._providers.values())
+        return [l.stats() for l in sorted(limiters, key=lambda l: l.name)]
+
+
+SCHEDULER = ProviderScheduler()
@@ -1,11 +1,15 @@
+import os
 import re
 import time
+import random
 import queue
 import threading
 import requests
 import streamlit as st
 from openai import OpenAI
 import google.generativeai as genai
+from judge_telemetry import record_judge_call
+from scheduler import SCHEDULER,is_rate_limited
 from config import OPENAI_API_KEY,FRIENDLI_API_KEY,GITHUB_API_KEY,GOOGLE_API_KEY,LASTFM_API_KEY,SIMON_CONFIG,JUDGES
 
 
@@ -31,6 +35,11 @@ def init_api_clients():
 
 
 API_CLIENTS=init_api_clients()
+# 요청 한도(429)로 실패한 호출을 스케줄러가 정한 대기 후 다시 시도하는 횟수
+RATE_LIMIT_RETRIES=3
+# JUDGE_PROVIDER=MOCK이면 모든 심사위원이 외부 API 대신 형식에 맞는 가짜 응답을 스트리밍 (부하 테스트·오프라인 개발용)
+JUDGE_PROVIDER=os.getenv("JUDGE_PROVIDER","").strip().upper() or None
+MOCK_TOKEN_DELAY=float(os.getenv("MOCK_JUDGE_TOKEN_MS","20"))/1000
 
 
 def parse_ai_response(text):
@@ -121,86 +130,158 @@ def get_system_prompt(judge_name,judge_info,grade):
     return f"당신은 {judge_name}입니다. {range_config['persona']} 유행어: {', '.join(range_config['lines'])}. {scoring} {persona_guidelines.get(judge_name,'')} 오직 한글로만 답변하세요. {format_instruction}"
 
 
-def stream_judge_task(judge_name, judge_info, song_context, tags, grade, q):
+class PanelCancelled(Exception):
+    """소비자(예: 연결이 끊긴 SSE 클라이언트)가 더 이상 결과를 받지 않을 때 심사 스레드를 멈추기 위한 예외입니다."""
+
+
+def _mock_response(rng):
+    m, k, n = rng.randint(15, 30), rng.randint(15, 30), rng.randint(15, 28)
+    comment = "가상 심사위원의 평가입니다. 멜로디 전개가 안정적이고 후렴이 기억에 남습니다. 다만 가사의 이야기가 조금 더 선명하면 좋겠습니다. 다음 무대가 기대됩니다."
+    return f"Musicality: {m}/40\nMarketability: {k}/40\nNarrative: {n}/40\nTotal: {m + k + n}\nComment: {comment}"
+
+
+def _stream_completion(provider, judge_info, system_prompt, user_prompt, emit, telemetry):
+    # 제공자별 스트리밍 호출: 토큰마다 emit을 부르고 전체 텍스트를 반환함
+    full_text = ""
+    if provider == "MOCK":
+        for word in _mock_response(random.Random(user_prompt + system_prompt)).split(" "):
+            time.sleep(MOCK_TOKEN_DELAY)
+            full_text += word + " "
+            emit(word + " ")
+        
+    elif provider in ["GITHUB_LLAMA", "FRIENDLI"]:
+        client = API_CLIENTS.get("friendli" if provider == "FRIENDLI" else "github")
+        if not client:
+            raise Exception(f"{provider}용 클라이언트가 초기화되지 않았습니다")
+        
+        stream = client.chat.completions.create(
+            model=judge_info["model_id"],
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.7,
+            max_tokens=700,
+            stream=True
+        )
+        
+        for chunk in stream:
+            if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
+                txt = chunk.choices[0].delta.content
+                full_text += txt
+                emit(txt)
+                
+    elif provider == "OPENAI":
+        client = API_CLIENTS.get("openai")
+        if not client:
+            raise Exception("OpenAI 클라이언트가 초기화되지 않았습니다")
+        
+        stream = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.7,
+            max_tokens=700,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                telemetry["usage"] = chunk.usage.completion_tokens
+            if chunk.choices and len(chunk.choices) > 0:
+                delta = chunk.choices[0].delta
+                if hasattr(delta, 'content') and delta.content:
+                    txt = delta.content
+                    full_text += txt
+                    emit(txt)
+                
+    elif provider == "GEMINI":
+        model = API_CLIENTS.get("gemini").GenerativeModel(judge_info["model_id"])
+        response = model.generate_content(
+            f"{system_prompt}\n\n{user_prompt}",
+            generation_config={"temperature": 0.7, "max_output_tokens": 700},
+            stream=True
+        )
+        
+        for chunk in response:
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage is not None and getattr(usage, "candidates_token_count", None):
+                telemetry["usage"] = usage.candidates_token_count
+            if hasattr(chunk, 'text') and chunk.text:
+                full_text += chunk.text
+                emit(chunk.text)
+    return full_text
+
+
+def stream_judge_task(judge_name, judge_info, song_context, tags, grade, q, queued_at=None):
     system_prompt = get_system_prompt(judge_name, judge_info, grade)
     tags_text = f"태그: {', '.join(tags)}" if tags else "태그: 사용 불가"
     user_prompt = f"평가 대상: {song_context}\n{tags_text}"
-    full_text = ""
     start_time = time.time()
-    q.put((judge_name, "", False, "로딩", judge_info["provider"]))
+    provider = JUDGE_PROVIDER or judge_info.get("provider", "UNKNOWN")
+    # 실제로 호출한 모델 (JUDGE_PROVIDER로 제공자를 바꾸면 심사위원 설정의 model_id와 다를 수 있음). 큐 튜플에도 provider와 함께 실음
+    model_id = "gpt-4o-mini" if provider == "OPENAI" else "mock" if provider == "MOCK" else judge_info.get("model_id")
+    # 텔레메트리: 청크 수를 토큰 수로 쓰되 제공자가 사용량을 알려 주면 그 값을 우선함
+    telemetry = {"call_start": None, "first_token": None, "chunks": 0, "usage": None, "state": "취소", "error": None}
+
+    def emit(txt):
+        if telemetry["first_token"] is None:
+            telemetry["first_token"] = time.time()
+        telemetry["chunks"] += 1
+        q.put((judge_name, txt, False, "생성 중", provider, model_id))
     
     try:
-        provider = judge_info["provider"]
-        
-        if provider in ["GITHUB_LLAMA", "FRIENDLI"]:
-            client = API_CLIENTS.get("friendli" if provider == "FRIENDLI" else "github")
-            if not client:
-                raise Exception(f"{provider}용 클라이언트가 초기화되지 않았습니다")
-            
-            stream = client.chat.completions.create(
-                model=judge_info["model_id"],
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=700,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
-                    txt = chunk.choices[0].delta.content
-                    full_text += txt
-                    q.put((judge_name, txt, False, "생성 중", provider))
-                    
-        elif provider == "OPENAI":
-            client = API_CLIENTS.get("openai")
-            if not client:
-                raise Exception("OpenAI 클라이언트가 초기화되지 않았습니다")
-            
-            stream = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=700,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0:
-                    delta = chunk.choices[0].delta
-                    if hasattr(delta, 'content') and delta.content:
-                        txt = delta.content
-                        full_text += txt
-                        q.put((judge_name, txt, False, "생성 중", provider))
-                    
-        elif provider == "GEMINI":
-            model = API_CLIENTS.get("gemini").GenerativeModel(judge_info["model_id"])
-            response = model.generate_content(
-                f"{system_prompt}\n\n{user_prompt}",
-                generation_config={"temperature": 0.7, "max_output_tokens": 700},
-                stream=True
-            )
-            
-            for chunk in response:
-                if hasattr(chunk, 'text') and chunk.text:
-                    full_text += chunk.text
-                    q.put((judge_name, chunk.text, False, "생성 중", provider))
+        q.put((judge_name, "", False, "로딩", provider, model_id))
+        # 제공자별 동시 호출·요청 속도 제한을 프로세스 전체가 공유. 토큰을 받기 전의 429는 잠시 기다렸다 다시 시도
+        attempt = 0
+        while True:
+            try:
+                with SCHEDULER.slot(provider, cancelled=(PanelCancelled,)):
+                    telemetry["call_start"] = time.time()
+                    full_text = _stream_completion(provider, judge_info, system_prompt, user_prompt, emit, telemetry)
+                break
+            except Exception as e:
+                if is_rate_limited(e) and attempt < RATE_LIMIT_RETRIES and telemetry["first_token"] is None:
+                    attempt += 1
+                    q.put((judge_name, "", False, f"대기 중 (요청 한도, 재시도 {attempt})", provider, model_id))
+                    continue
+                raise
         
         if not full_text or len(full_text.strip()) < 10:
             raise Exception("생성된 내용이 없거나 응답이 너무 짧습니다")
             
-        q.put((judge_name, full_text, True, "완료", provider, round(time.time() - start_time, 2)))
+        telemetry["state"] = "완료"
+        q.put((judge_name, full_text, True, "완료", provider, model_id, round(time.time() - start_time, 2)))
         
+    except PanelCancelled:
+        return
     except Exception as e:
         error_msg = f"오류: {str(e)}"
-        st.error(f"{judge_name} 평가 실패: {error_msg}")
+        telemetry.update(state="오류", error=f"{type(e).__name__}: {e}")
+        # 심사 스레드는 스크립트 컨텍스트가 없으므로 st.error 대신 로그로 남기고, 화면에는 대체 점수와 "오류" 상태로 표시
+        print(f"{judge_name} 평가 실패: {error_msg}")
         fallback_response=f"Musicality: 25/40\nMarketability: 25/40\nNarrative: 23/40\nTotal: 73\nComment: 기술적 문제로 평가를 완료할 수 없었습니다."
-        q.put((judge_name, fallback_response, True, "오류", judge_info.get("provider", "UNKNOWN"), round(time.time() - start_time, 2)))
+        try:
+            q.put((judge_name, fallback_response, True, "오류", provider, model_id, round(time.time() - start_time, 2)))
+        except PanelCancelled:
+            pass
+    finally:
+        end_time = time.time()
+        call_start = telemetry["call_start"] or end_time
+        first_token = telemetry["first_token"]
+        record_judge_call(
+            judge_name, provider, model_id,
+            queue_wait=round(call_start - (queued_at or start_time), 3),
+            ttft=None if first_token is None else round(first_token - call_start, 3),
+            latency=round(end_time - call_start, 3),
+            tokens=telemetry["usage"] or telemetry["chunks"],
+            state=telemetry["state"],
+            fallback=telemetry["state"] == "오류",
+            error=telemetry["error"],
+        )
 
 
 @st.cache_data(ttl=600)
@@ -245,16 +326,43 @@ def get_lastfm_data(artist, title):
         st.warning(f"Last.fm API 예기치 못한 오류 ({artist} - {title}): {str(e)}")
         return None, []
 
+def song_context(song):
+    return f"Artist: {song['artist']}, Title: {song['title']}\nLyrics: {song['review']}"
+
+
+def start_judge_panel(song,tags,q,grade="GOOD"):
+    # 심사위원별 스트리밍 스레드를 시작하고 토큰/완료 튜플을 q로 전달함
+    song_ctx=song_context(song)
+    threads=[]
+    queued_at=time.time()
+    for jn,ji in JUDGES.items():
+        t=threading.Thread(target=stream_judge_task,args=(jn,ji,song_ctx,tags,grade,q,queued_at),daemon=True)
+        t.start()
+        threads.append(t)
+    return threads
+
+
+def evaluate_song(song,tags,grade="GOOD"):
+    # UI 없이 심사위원 전원의 결과를 모아 반환함 (배치 실행용)
+    q=queue.Queue()
+    start_judge_panel(song,tags,q,grade)
+    results={}
+    while len(results)<len(JUDGES):
+        name,chunk_txt,is_done,state,provider,model,*rest=q.get()
+        if not is_done:
+            continue
+        scores,comment=parse_ai_response(chunk_txt)
+        results[name]={"scores":scores,"comment":comment,"elapsed":rest[0],"provider":provider,"model":model,"state":state}
+    return results
+
+
 def run_judge_panel(song,tags,img_col,s_col,h_col,m_col):
     areas={"Simon Cowell":s_col.empty(),"Howie Mandel":h_col.empty(),"Mel B":m_col.empty()}
     judge_outputs={name:"" for name in JUDGES.keys()}
     judge_status={name:{"provider":"","state":"대기 중","elapsed":0} for name in JUDGES.keys()}
     q=queue.Queue()
     final_results={}
-    song_ctx=f"Artist: {song['artist']}, Title: {song['title']}\nLyrics: {song['review']}"
-
-    for jn,ji in JUDGES.items():
-        threading.Thread(target=stream_judge_task,args=(jn,ji,song_ctx,tags,"GOOD",q),daemon=True).start()
+    start_judge_panel(song,tags,q)
 
     finished=0
     while finished<3:
@@ -263,9 +371,9 @@ def run_judge_panel(song,tags,img_col,s_col,h_col,m_col):
         judge_status[name].update({"provider":provider,"state":state})
         if is_done:
             finished+=1
-            judge_status[name]["elapsed"]=res_tuple[5]
+            judge_status[name]["elapsed"]=res_tuple[6]
             scores,comment=parse_ai_response(chunk_txt)
-            final_results[name]={"scores":scores,"comment":comment,"elapsed":res_tuple[5]}
+            final_results[name]={"scores":scores,"comment":comment,"elapsed":res_tuple[6]}
         else:
             judge_outputs[name]+=chunk_txt
 
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+from anomalies import PLATFORM_COLS, detect_anomalies
+
+
+def _metrics(artists=3, days=120, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=days)
+    frames = []
+    for a in range(1, artists + 1):
+        data = {"artist_id": a, "date": dates}
+        for c in PLATFORM_COLS:
+            data[c] = 1e6 + np.cumsum(rng.normal(5000, 500, size=days))
+        frames.append(pd.DataFrame(data))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_spike_and_zero_are_flagged():
+    df = _metrics()
+    day = df["date"] == pd.Timestamp("2024-03-15")
+    df.loc[day & (df["artist_id"] == 2), "spotify_streams"] += 200000
+    df.loc[day & (df["artist_id"] == 3), "youtube_views"] = 0
+    out = detect_anomalies(df)
+    kinds = {(r.artist_id, r.platform, r.date, r.kind) for r in out.itertuples(index=False)}
+    assert (2, "spotify_streams", pd.Timestamp("2024-03-15"), "spike") in kinds
+    assert (3, "youtube_views", pd.Timestamp("2024-03-15"), "zero") in kinds
+
+
+def test_chunking_does_not_change_result():
+    df = _metrics(seed=1)
+    df.loc[df.index[::37], "soundcloud_plays"] *= 1.3
+    pdt.assert_frame_equal(detect_anomalies(df, chunk=7), detect_anomalies(df))
+
+
+def test_since_limits_rows_but_keeps_baseline():
+    df = _metrics(seed=2)
+    df.loc[(df["artist_id"] == 1) & (df["date"] == pd.Timestamp("2024-04-01")), "youtube_views"] += 300000
+    full = detect_anomalies(df)
+    part = detect_anomalies(df, since={1: pd.Timestamp("2024-03-25").date(), 2: None, 3: None})
+    expected = full[(full["artist_id"] != 1) | (full["date"] >= pd.Timestamp("2024-03-25"))].reset_index(drop=True)
+    pdt.assert_frame_equal(part.reset_index(drop=True), expected)
@@ -0,0 +1,45 @@
+import queue
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("openai")
+
+from api import ClosableQueue  # noqa: E402
+from services import PanelCancelled  # noqa: E402
+
+
+def test_put_honours_timeout_when_full():
+    q = ClosableQueue(1)
+    q.put("a")
+    t0 = time.monotonic()
+    with pytest.raises(queue.Full):
+        q.put("b", timeout=0.2)
+    assert time.monotonic() - t0 < 0.45
+
+
+def test_put_non_blocking_when_full():
+    q = ClosableQueue(1)
+    q.put("a")
+    with pytest.raises(queue.Full):
+        q.put("b", block=False)
+
+
+def test_close_releases_blocked_producer():
+    q = ClosableQueue(1)
+    q.put("a")
+    raised = []
+
+    def producer():
+        try:
+            q.put("b")
+        except PanelCancelled:
+            raised.append(True)
+
+    t = threading.Thread(target=producer)
+    t.start()
+    q.close()
+    t.join(2)
+    assert raised == [True]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from correlation import CoMoments, MIN_SAMPLES, PLATFORM_COLS
+
+
+def _sample(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, len(PLATFORM_COLS))) * [1e6, 2e5, 3e4] + [5e6, 1e6, 2e5]
+
+
+def _assert_same(a, b):
+    assert a.n == b.n
+    np.testing.assert_allclose(a.mean, b.mean, rtol=1e-9)
+    np.testing.assert_allclose(a.m2, b.m2, rtol=1e-7)
+
+
+def test_merge_matches_concatenation():
+    x, y = _sample(40, 1), _sample(25, 2)
+    merged = CoMoments.from_array(x).merge(CoMoments.from_array(y))
+    _assert_same(merged, CoMoments.from_array(np.vstack([x, y])))
+
+
+def test_merge_is_order_independent():
+    parts = [CoMoments.from_array(_sample(n, s)) for s, n in enumerate((5, 30, 12))]
+    forward = parts[0].merge(parts[1]).merge(parts[2])
+    backward = parts[2].merge(parts[1].merge(parts[0]))
+    _assert_same(forward, backward)
+
+
+def test_subtract_inverts_merge():
+    x, y = _sample(40, 3), _sample(25, 4)
+    total = CoMoments.from_array(np.vstack([x, y]))
+    _assert_same(total.subtract(CoMoments.from_array(y)), CoMoments.from_array(x))
+
+
+def test_replace_artist_contribution():
+    # 카탈로그에서 옛 기여분을 빼고 다시 계산한 값을 더하면 처음부터 합친 것과 같아야 함
+    a, b_old, b_new = _sample(30, 5), _sample(20, 6), _sample(22, 7)
+    catalog = CoMoments.from_array(a).merge(CoMoments.from_array(b_old))
+    catalog = catalog.subtract(CoMoments.from_array(b_old)).merge(CoMoments.from_array(b_new))
+    _assert_same(catalog, CoMoments.from_array(np.vstack([a, b_new])))
+
+
+def test_empty_parts():
+    x = CoMoments.from_array(_sample(15, 8))
+    empty = CoMoments()
+    _assert_same(x.merge(empty), x)
+    _assert_same(empty.merge(x), x)
+    _assert_same(x.subtract(empty), x)
+    assert x.subtract(x).n == 0
+    assert CoMoments.from_array(np.empty((0, len(PLATFORM_COLS)))).n == 0
+
+
+def test_merge_does_not_alias_other():
+    x = CoMoments.from_array(_sample(15, 9))
+    merged = CoMoments().merge(x)
+    merged.m2[0, 0] = 0
+    assert x.m2[0, 0] != 0
+
+
+@pytest.mark.parametrize("n, expected", [(MIN_SAMPLES, False), (MIN_SAMPLES + 1, True)])
+def test_corr_needs_min_samples(n, expected):
+    assert (CoMoments.from_array(_sample(n, 10)).corr() is not None) == expected
+
+
+def test_corr_matches_numpy():
+    x = _sample(200, 11)
+    corr = CoMoments.from_array(x[:120]).merge(CoMoments.from_array(x[120:])).corr()
+    np.testing.assert_allclose(corr.values, np.corrcoef(x, rowvar=False), atol=1e-9)
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from forecasting import forecast_batch, fit_linear, series_matrix
+
+START = date(2024, 1, 1)
+DAYS = 120
+PER_DAY = 1000.0
+
+
+def _calendar(observed_days):
+    # _load_series와 같은 모양: 첫 관측일부터 마지막 관측일까지 하루 한 칸, 관측 없는 날은 NaN
+    v = np.full(max(observed_days) + 1, np.nan)
+    for d in observed_days:
+        v[d] = 2e6 + PER_DAY * d
+    return v
+
+
+def _rows(points, model):
+    return {day: base for _, _, m, day, base, _, _ in points if m == model}
+
+
+def test_linear_slope_is_per_day_on_gapped_series():
+    gapped = _calendar([d for d in range(DAYS) if d % 3 != 1])
+    y, lengths = series_matrix([gapped])
+    slope, preds = fit_linear(y, lengths, horizon=5)
+    assert slope[0] == pytest.approx(PER_DAY)
+    assert preds[0, 0] == pytest.approx(2e6 + PER_DAY * DAYS)
+
+
+def test_gapped_and_contiguous_series_forecast_the_same_dates_and_trend():
+    full = _calendar(range(DAYS))
+    gapped = _calendar([d for d in range(DAYS) if d % 2 == 0 or d == DAYS - 1])
+    last = START + timedelta(days=DAYS - 1)
+    keys = [(1, "youtube_views"), (2, "youtube_views")]
+    models, points = forecast_batch(keys, [full, gapped], [last, last], horizon=10, paths=50)
+
+    by_artist = {a: [p for p in points if p[0] == a] for a, _ in keys}
+    for a in (1, 2):
+        linear = _rows(by_artist[a], "linear")
+        damped = _rows(by_artist[a], "damped")
+        assert sorted(linear) == [last + timedelta(days=h) for h in range(1, 11)]
+        assert linear[last + timedelta(days=10)] == pytest.approx(2e6 + PER_DAY * (DAYS + 9))
+        # 감쇠 추세도 하루당 증가량이어야 함 (빠진 날을 하루로 세지 않으면 약 2배가 됨)
+        step = (damped[last + timedelta(days=10)] - damped[last + timedelta(days=1)]) / 9
+        assert step == pytest.approx(PER_DAY, rel=0.15)
+
+    n_obs = {m[0]: m[8] for m in models if m[2] == "damped"}
+    assert n_obs == {1: DAYS, 2: DAYS // 2 + 1}
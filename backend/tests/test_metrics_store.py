@@ -0,0 +1,73 @@
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import metrics_store
+from metrics_store import MetricsStore
+
+
+def _arrays(n_rows=4):
+    artist_ids = np.array([1], dtype=np.int64)
+    offsets = np.array([0, n_rows], dtype=np.int64)
+    dates = (np.datetime64("2024-01-01") + np.arange(n_rows)).astype("datetime64[ns]")
+    values = np.arange(3 * n_rows, dtype=np.int64).reshape(3, n_rows)
+    return artist_ids, offsets, dates, values
+
+
+def _exists(name):
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    return True
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    state = {"generation": 1}
+    monkeypatch.setattr(metrics_store, "get_generation", lambda: state["generation"])
+    monkeypatch.setattr(metrics_store, "_load_arrays", lambda: _arrays())
+    monkeypatch.setattr(metrics_store, "CHECK_SECONDS", 0.0)
+    monkeypatch.setattr(metrics_store, "SHM_PREFIX", f"icttest{id(state) % 100000}")
+    monkeypatch.setenv("PG_DB", "music_test")
+    # 한 프로세스 안에서 두 "프로세스"를 흉내 내므로 붙을 때의 등록 해제는 건너뜀 (만든 쪽의 unlink가 해제함)
+    monkeypatch.setattr(metrics_store, "resource_tracker", SimpleNamespace(unregister=lambda *_: None))
+    return state
+
+
+def _name(generation):
+    return f"{metrics_store.SHM_PREFIX}_{metrics_store._db_identity()}_{generation}"
+
+
+def test_attaching_process_unlinks_its_previous_segment(catalog):
+    a, b = MetricsStore(enabled=True, use_shm=True), MetricsStore(enabled=True, use_shm=True)
+    try:
+        assert a.snapshot().source == "shm:created"
+        assert b.snapshot().source == "shm:attached"
+        catalog["generation"] = 2
+        assert b.snapshot().source == "shm:created"
+        # a는 새 세대에 붙기만 하지만 자기가 만든 1세대 세그먼트는 지워야 함
+        assert a.snapshot().source == "shm:attached"
+        assert not _exists(_name(1))
+        assert _exists(_name(2))
+    finally:
+        a.close()
+        b.close()
+    assert not _exists(_name(2))
+
+
+def test_segment_name_depends_on_database(catalog, monkeypatch):
+    a = MetricsStore(enabled=True, use_shm=True)
+    try:
+        a.snapshot()
+        monkeypatch.setenv("PG_DB", "music_other")
+        other = MetricsStore(enabled=True, use_shm=True)
+        try:
+            assert other.snapshot().source == "shm:created"
+        finally:
+            other.close()
+    finally:
+        a.close()
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from rolling_stats import RollingState, VOL_WINDOW
+
+
+def _values(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1e6 * np.cumprod(1 + rng.normal(0.01, 0.05, size=n))
+
+
+def _push_all(state, values, start=0):
+    for i, v in enumerate(values, start):
+        state.push(date(2024, 1, 1) + timedelta(days=i), v)
+    return state
+
+
+def _restore(state):
+    # DB에 저장되는 필드만으로 다시 만든 상태
+    return RollingState(state.last_date, state.last_value, state.n_rows, list(state.returns), list(state.pos_deltas))
+
+
+def test_volatility_matches_window_std():
+    values = _values(200)
+    state = _push_all(RollingState(), values)
+    returns = values[1:] / values[:-1] - 1
+    expected = round(float(np.std(returns[-VOL_WINDOW:], ddof=1) * 100), 2)
+    assert state.volatility() == expected
+
+
+def test_resume_from_saved_state_matches_full_replay():
+    values = _values(300, seed=1)
+    full = _push_all(RollingState(), values)
+    resumed = _push_all(_restore(_push_all(RollingState(), values[:170])), values[170:], start=170)
+    assert resumed.volatility() == full.volatility()
+    assert resumed.momentum() == full.momentum()
+    assert resumed.n_rows == full.n_rows
+
+
+def test_running_sums_stay_in_sync_with_window():
+    # 큰 값과 작은 값을 번갈아 넣어도 누적 합이 창의 실제 합에서 벗어나지 않아야 함
+    values = np.where(np.arange(2000) % 2, 1e6, 5e8)
+    state = _push_all(RollingState(), values)
+    assert abs(state.ret_sum - sum(state.returns)) < 1e-9
+    assert abs(state.recent_sum + state.prev_sum - sum(state.pos_deltas)) <= 1e-6 * sum(state.pos_deltas)
@@ -0,0 +1,172 @@
+import threading
+import time as real_time
+
+import pytest
+
+import scheduler
+from scheduler import ProviderLimiter, ProviderScheduler, TokenBucket
+
+
+class FakeClock:
+    """scheduler 모듈의 time 대신 쓰는 가짜 시계. sleep은 기다리지 않고 시각만 앞으로 보냄."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, "time", fake)
+    return fake
+
+
+def _limiter(initial=8, max_concurrency=16, rpm=0):
+    return ProviderLimiter("TEST", rpm, max_concurrency, initial=initial)
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = real_time.monotonic() + timeout
+    while not predicate():
+        if real_time.monotonic() > deadline:
+            return False
+        real_time.sleep(0.01)
+    return True
+
+
+def _wake(limiter):
+    # 가짜 시계를 앞으로 돌린 뒤 일시 정지 중인 대기자가 시각을 다시 확인하게 함
+    with limiter.cond:
+        limiter.cond.notify_all()
+
+
+def test_throttled_halves_limit_and_pauses(clock):
+    limiter = _limiter(initial=8)
+    limiter.acquire()
+    limiter.release("throttled", pause=5.0)
+    assert limiter.limit == 4.0
+    assert limiter.paused_until == clock.now + 5.0
+    assert limiter.stats()["paused_for"] == 5.0
+
+
+def test_single_decrease_per_pause_window(clock):
+    # 동시에 나간 호출 6개가 429를 받는 경우: 일시 정지 중에는 새로 acquire하지 않으므로 모두 미리 얻어 둠
+    limiter = _limiter(initial=8)
+    for _ in range(6):
+        limiter.acquire()
+    for _ in range(4):
+        limiter.release("throttled", pause=2.0)
+    assert limiter.limit == 4.0
+    assert limiter.throttled == 4
+    clock.advance(1.0)
+    limiter.release("throttled", pause=2.0)
+    assert limiter.limit == 4.0
+    clock.advance(1.0)
+    limiter.release("throttled", pause=2.0)
+    assert limiter.limit == 2.0
+
+
+def test_limit_never_drops_below_one(clock):
+    limiter = _limiter(initial=1)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release("throttled", pause=1.0)
+        clock.advance(1.0)
+    assert limiter.limit == 1.0
+
+
+def test_additive_increase_is_about_one_per_window(clock):
+    limiter = _limiter(initial=4, max_concurrency=16)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release("ok")
+    assert 4.8 < limiter.limit < 5.0
+    for _ in range(200):
+        limiter.acquire()
+        limiter.release("ok")
+    assert limiter.limit == 16
+
+
+def test_error_and_cancel_keep_limit(clock):
+    limiter = _limiter(initial=4)
+    for outcome in ("error", "cancelled"):
+        limiter.acquire()
+        limiter.release(outcome)
+    assert limiter.limit == 4.0
+    assert limiter.errors == 1
+    assert limiter.paused_until == 0.0
+
+
+def test_release_wakes_waiter_blocked_on_limit(clock):
+    limiter = _limiter(initial=1)
+    limiter.acquire()
+    done = threading.Event()
+    t = threading.Thread(target=lambda: (limiter.acquire(), done.set()), daemon=True)
+    t.start()
+    assert _wait_until(lambda: limiter.stats()["waiting"] == 1)
+    assert not done.is_set()
+    limiter.release("ok")
+    assert done.wait(2.0)
+    assert limiter.in_flight == 1
+    assert limiter.waiting == 0
+
+
+def test_paused_waiter_released_after_pause(clock):
+    limiter = _limiter(initial=4)
+    limiter.acquire()
+    limiter.release("throttled", pause=30.0)
+    done = threading.Event()
+    t = threading.Thread(target=lambda: (limiter.acquire(), done.set()), daemon=True)
+    t.start()
+    assert _wait_until(lambda: limiter.stats()["waiting"] == 1)
+    clock.advance(10.0)
+    _wake(limiter)
+    assert not done.wait(0.1)
+    clock.advance(20.0)
+    _wake(limiter)
+    assert done.wait(2.0)
+
+
+def test_token_bucket_spaces_starts(clock):
+    bucket = TokenBucket(60, burst=2)
+    start = clock.now
+    for _ in range(4):
+        bucket.acquire()
+    # 처음 2번은 버스트, 나머지 2번은 1초 간격
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_slot_maps_exceptions_to_outcomes(clock):
+    sched = ProviderScheduler({"TEST": (0, 8)})
+    limiter = sched.provider("TEST")
+    limiter.limit = 8.0
+
+    class Cancelled(Exception):
+        pass
+
+    with pytest.raises(Cancelled):
+        with sched.slot("TEST", cancelled=(Cancelled,)):
+            raise Cancelled()
+    assert (limiter.errors, limiter.throttled, limiter.limit) == (0, 0, 8.0)
+    with pytest.raises(ValueError):
+        with sched.slot("TEST"):
+            raise ValueError()
+    assert limiter.errors == 1
+    with pytest.raises(RateLimitError):
+        with sched.slot("TEST"):
+            raise RateLimitError()
+    assert (limiter.throttled, limiter.limit) == (1, 4.0)
+    assert limiter.in_flight == 0
@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import hashlib
+import functools
+import contextvars
+from contextlib import contextmanager
+
+_RERUN = contextvars.ContextVar("trace_rerun", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s|(?<!:):[A-Za-z_]\w*|\?")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Span:
+    __slots__ = ("name", "kind", "start", "duration", "rows", "fingerprint", "sql", "error")
+
+    def __init__(self, name, kind, sql=None):
+        self.name = name
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.rows = None
+        self.sql = None
+        self.fingerprint = None
+        self.error = None
+        if sql is not None:
+            self.sql, self.fingerprint = fingerprint(sql)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "ms": round(self.duration * 1000, 3),
+            "rows": self.rows,
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "error": self.error,
+        }
+
+
+class Rerun:
+    """Streamlit 재실행 한 번 동안 기록된 스팬 모음입니다."""
+
+    def __init__(self, label=""):
+        self.id = f"{int(time.time() * 1000):x}"
+        self.label = label
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.spans = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.t0
+
+
+def fingerprint(sql):
+    """리터럴과 플레이스홀더를 ?로 정규화한 SQL과 그 짧은 해시를 반환합니다."""
+    norm = _STRING_LITERAL.sub("?", str(sql))
+    norm = _PLACEHOLDER.sub("?", norm)
+    norm = _NUMBER_LITERAL.sub("?", norm)
+    norm = _WHITESPACE.sub(" ", norm).strip().rstrip(";").strip()
+    return norm, hashlib.md5(norm.lower().encode("utf-8")).hexdigest()[:10]
+
+
+def start_rerun(label=""):
+    """현재 컨텍스트(세션 스크립트 스레드)에서 새 재실행 수집을 시작합니다."""
+    rerun = Rerun(label)
+    _RERUN.set(rerun)
+    return rerun
+
+
+def current_rerun():
+    return _RERUN.get()
+
+
+@contextmanager
+def span(name, kind="code", sql=None):
+    """수집 중인 재실행이 있으면 구간 시간을 기록합니다. 없으면 아무것도 하지 않습니다."""
+    rerun = _RERUN.get()
+    if rerun is None:
+        yield None
+        return
+    s = Span(name, kind, sql)
+    try:
+        yield s
+    except Exception as e:
+        s.error = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        rerun.spans.append(s)
+
+
+def traced(kind="analytics", name=None):
+    """함수 호출을 스팬으로 감싸는 데코레이터입니다. 결과가 DataFrame/배열/리스트이면 길이를 행 수로 기록합니다."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _RERUN.get() is None:
+                return fn(*args, **kwargs)
+            with span(label, kind) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, (list, tuple)) or hasattr(result, "shape"):
+                    s.rows = len(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def summarize(rerun):
+    """(kind, name, fingerprint)별 호출 수·총 시간·최대 시간·행 수를 총 시간 내림차순으로 집계합니다."""
+    groups = {}
+    for s in rerun.spans:
+        key = (s.kind, s.name, s.fingerprint)
+        g = groups.setdefault(key, {"kind": s.kind, "name": s.name, "fingerprint": s.fingerprint, "sql": s.sql, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "errors": 0})
+        ms = s.duration * 1000
+        g["calls"] += 1
+        g["total_ms"] += ms
+        g["max_ms"] = max(g["max_ms"], ms)
+        g["rows"] += s.rows or 0
+        g["errors"] += 1 if s.error else 0
+    out = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)
+    for g in out:
+        g["total_ms"] = round(g["total_ms"], 2)
+        g["max_ms"] = round(g["max_ms"], 2)
+    return out
+
+
+def to_jsonl(rerun):
+    """재실행의 스팬을 한 줄에 하나씩 JSON으로 직렬화합니다."""
+    lines = []
+    for s in rerun.spans:
+        d = s.as_dict()
+        d.update({"rerun": rerun.id, "label": rerun.label, "ts": rerun.started_at})
+        lines.append(json.dumps(d, ensure_ascii=False))
+    lines.append(json.dumps({"rerun": rerun.id, "label": rerun.label, "ts": rerun.started_at, "kind": "rerun", "name": "total", "ms": round(rerun.elapsed() * 1000, 3)}, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def _prom_label(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def to_prometheus(rerun):
+    """집계 결과를 Prometheus 텍스트 노출 형식으로 변환합니다."""
+    lines = [
+        "# HELP music_span_seconds_total 재실행 중 구간별 누적 실행 시간",
+        "# TYPE music_span_seconds_total counter",
+    ]
+    rows = summarize(rerun)
+    for g in rows:
+        labels = f'kind="{_prom_label(g["kind"])}",name="{_prom_label(g["name"])}",fingerprint="{_prom_label(g["fingerprint"] or "")}"'
+        lines.append(f"music_span_seconds_total{{{labels}}} {g['total_ms'] / 1000:.6f}")
+    lines += ["# HELP music_span_calls_total 구간별 호출 수", "# TYPE music_span_calls_total counter"]
+    for g in rows:
+        labels = f'kind="{_prom_label(g["kind"])}",name="{_prom_label(g["name"])}",fingerprint="{_prom_label(g["fingerprint"] or "")}"'
+        lines.append(f"music_span_calls_total{{{labels}}} {g['calls']}")
+    lines += ["# HELP music_span_rows_total 구간별 반환 행 수", "# TYPE music_span_rows_total counter"]
+    for g in rows:
+        labels = f'kind="{_prom_label(g["kind"])}",name="{_prom_label(g["name"])}",fingerprint="{_prom_label(g["fingerprint"] or "")}"'
+        lines.append(f"music_span_rows_total{{{labels}}} {g['rows']}")
+    lines += [
+        "# HELP music_rerun_seconds 재실행 전체 소요 시간",
+        "# TYPE music_rerun_seconds gauge",
+        f'music_rerun_seconds{{label="{_prom_label(rerun.label)}"}} {rerun.elapsed():.6f}',
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def export_rerun(rerun, path=None):
+    """TRACE_EXPORT_PATH(또는 path)가 설정되어 있으면 재실행 스팬을 JSON lines 파일에 덧붙입니다."""
+    path = path or os.getenv("TRACE_EXPORT_PATH")
+    if not path:
+        return False
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl(rerun))
+    return True
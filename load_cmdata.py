@@ -1,8 +1,18 @@
-import os, re, glob
+import os, re, sys, glob
+from itertools import repeat
 import pandas as pd
 import psycopg2
+from psycopg2.extras import execute_values
 
-CM_PATH = "/home/azureuser/project1/backend/cmdata"
+# daily_metrics 집계는 엑셀 동기화와 같은 증분 단계를 사용 (rollup.py는 db/config를 import하지 않음)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from rollup import ensure_changes_table, ensure_period_tables, record_changes, rollup_changes
+
+CM_PATH = os.getenv("CM_PATH", "/home/azureuser/project1/backend/cmdata")
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "50000"))
+# backend/db.py의 INGEST_LOCK_KEY와 같은 값: 수집 워커·압축 작업과 동시에 실행되지 않도록 함
+INGEST_LOCK_KEY = 72010326
+MOMENTS_LOCK_KEY = 72010327  # backend/correlation.py와 같은 값
 
 def split_filename(fp):
     base = os.path.splitext(os.path.basename(fp))[0]
@@ -22,20 +32,21 @@ def pretty_artist(s):
     return s
 
 def metric_type_from(platform_raw, metric_raw):
+    # 대시보드·엑셀 수집 경로와 같은 플랫폼 표기(YouTube/Spotify/SoundCloud)를 사용
     p = str(platform_raw).strip().lower()
     m = str(metric_raw).strip().lower()
     if "soundcloud" in p:
-        return "soundcloud_plays"
+        return "SoundCloud"
     if "spotify" in p:
-        return "spotify_streams"
+        return "Spotify"
     if "youtube" in p:
-        return "youtube_views"
+        return "YouTube"
     if "plays" in m:
-        return "soundcloud_plays"
+        return "SoundCloud"
     if "streams" in m:
-        return "spotify_streams"
+        return "Spotify"
     if "views" in m:
-        return "youtube_views"
+        return "YouTube"
     return f"{p}_{m}".replace("-", "_").replace(" ", "_")
 
 def detect_cols(df):
@@ -78,6 +89,21 @@ def parse_korean_date_series(s: pd.Series) -> pd.Series:
         dt = pd.to_datetime(s, errors="coerce")
     return dt.dt.date
 
+def read_chunks(fp):
+    """CSV를 CHUNK_ROWS 행씩 읽어 (date, value) 청크를 내보냅니다. 열은 첫 청크의 헤더로 한 번만 판별합니다."""
+    date_col = val_col = None
+    for chunk in pd.read_csv(fp, chunksize=CHUNK_ROWS):
+        if date_col is None:
+            date_col, val_col = detect_cols(chunk)
+            if date_col not in chunk.columns or val_col not in chunk.columns:
+                return
+        tmp = pd.DataFrame({
+            "date": parse_korean_date_series(chunk[date_col]),
+            "value": pd.to_numeric(chunk[val_col], errors="coerce"),
+        })
+        # 한 번의 INSERT ... ON CONFLICT 안에서 같은 키가 두 번 나오면 안 되므로 청크 안에서는 마지막 값만 남김
+        yield tmp.dropna(subset=["date", "value"]).drop_duplicates(subset=["date"], keep="last")
+
 host = os.getenv("PG_HOST", "127.0.0.1")
 port = int(os.getenv("PG_PORT", "5432"))
 user = os.getenv("PG_USER", "postgres")
@@ -92,15 +118,26 @@ if not files:
 conn = psycopg2.connect(host=host, port=port, user=user, password=pw, dbname=db)
 conn.autocommit = False
 cur = conn.cursor()
+cur.execute("SELECT pg_advisory_lock(%s);", (INGEST_LOCK_KEY,))
 
 # artist_growth_data가 이미 존재하더라도, 최소 인덱스는 보장
 cur.execute("""
 CREATE UNIQUE INDEX IF NOT EXISTS idx_artist_growth_unique
 ON artist_growth_data (artist_name, metric_type, date);
 """)
+cur.execute("""
+CREATE TABLE IF NOT EXISTS data_generations (
+  scope TEXT PRIMARY KEY,
+  generation BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+""")
+ensure_changes_table(cur)
+ensure_period_tables(cur)
 conn.commit()
 
 rows_growth = 0
+touched = set()
 
 for fp in files:
     meta = split_filename(fp)
@@ -112,62 +149,62 @@ for fp in files:
     track_name = str(track_raw).strip()
     mtype = metric_type_from(platform_raw, metric_raw)
 
-    df = pd.read_csv(fp)
-    if df is None or df.empty:
-        continue
-
-    date_col, val_col = detect_cols(df)
-    if date_col not in df.columns or val_col not in df.columns:
-        continue
-
-    tmp = df[[date_col, val_col]].copy()
-    tmp.columns = ["date", "value"]
-
-    tmp["date"] = parse_korean_date_series(tmp["date"])
-    tmp["value"] = pd.to_numeric(tmp["value"], errors="coerce")
-
-    tmp = tmp.dropna(subset=["date", "value"])
-    if tmp.empty:
-        continue
-
-    cur.execute("INSERT INTO artists(name) VALUES(%s) ON CONFLICT (name) DO NOTHING;", (artist_name,))
-
-    data = [(artist_name, track_name, mtype, r["date"], float(r["value"])) for _, r in tmp.iterrows()]
-    cur.executemany(
-        """
-        INSERT INTO artist_growth_data (artist_name, track_name, metric_type, date, value)
-        VALUES (%s,%s,%s,%s,%s)
-        ON CONFLICT (artist_name, metric_type, date) DO UPDATE SET
-          value=EXCLUDED.value,
-          track_name=EXCLUDED.track_name;
-        """,
-        data
-    )
-    rows_growth += len(data)
+    wrote = 0
+    for tmp in read_chunks(fp):
+        if tmp.empty:
+            continue
+        if not wrote:
+            cur.execute("INSERT INTO artists(name) VALUES(%s) ON CONFLICT (name) DO NOTHING;", (artist_name,))
+        execute_values(
+            cur,
+            """
+            INSERT INTO artist_growth_data (artist_name, track_name, metric_type, date, value)
+            VALUES %s
+            ON CONFLICT (artist_name, metric_type, date) DO UPDATE SET
+              value=EXCLUDED.value,
+              track_name=EXCLUDED.track_name;
+            """,
+            zip(repeat(artist_name), repeat(track_name), repeat(mtype), tmp["date"], tmp["value"].astype(float)),
+            page_size=1000,
+        )
+        record_changes(cur, artist_name, tmp["date"].unique())
+        wrote += len(tmp)
+    if wrote:
+        rows_growth += wrote
+        touched.add(artist_name)
 
 conn.commit()
 print("artist_growth_data upserts:", rows_growth)
 
-cur.execute("""
-INSERT INTO daily_metrics (artist_id, date, youtube_views, spotify_streams, soundcloud_plays)
-SELECT
-  a.id as artist_id,
-  g.date as date,
-  MAX(CASE WHEN g.metric_type='youtube_views' THEN g.value ELSE NULL END)::bigint as youtube_views,
-  MAX(CASE WHEN g.metric_type='spotify_streams' THEN g.value ELSE NULL END)::bigint as spotify_streams,
-  MAX(CASE WHEN g.metric_type='soundcloud_plays' THEN g.value ELSE NULL END)::bigint as soundcloud_plays
-FROM artist_growth_data g
-JOIN artists a ON a.name = g.artist_name
-GROUP BY a.id, g.date
-ON CONFLICT (artist_id, date) DO UPDATE SET
-  youtube_views = COALESCE(EXCLUDED.youtube_views, daily_metrics.youtube_views),
-  spotify_streams = COALESCE(EXCLUDED.spotify_streams, daily_metrics.spotify_streams),
-  soundcloud_plays = COALESCE(EXCLUDED.soundcloud_plays, daily_metrics.soundcloud_plays);
-""")
-rows_daily = cur.rowcount
+# 이번 실행에서 쓴 (아티스트, 날짜)만 daily_metrics로 다시 집계
+rollup = rollup_changes(cur)
+conn.commit()
+print("daily_metrics keys:", rollup["keys"], "upserts:", rollup["upserted"], "deleted:", rollup["deleted"], "periods:", rollup["periods"])
+
+# 값이 바뀐 아티스트의 상관관계 누적기·롤링 지표 상태를 무효화. 카탈로그 누적기("*")도 지워 다음 동기화가 전체를 재구성하게 함
+# (앱 시작 시에도 채워지며, `python backend/correlation.py`·`python backend/rolling_stats.py`로 바로 채울 수도 있음)
+touched_ids = [a_id for a_id, _ in rollup["touched"].values()]
+cur.execute("SELECT to_regclass('platform_moments') IS NOT NULL, to_regclass('rolling_state') IS NOT NULL;")
+has_moments, has_rolling = cur.fetchone()
+if touched_ids and has_moments:
+    cur.execute("SELECT pg_advisory_xact_lock(%s);", (MOMENTS_LOCK_KEY,))
+    cur.execute("DELETE FROM platform_moments WHERE scope = ANY(%s);", ([str(a_id) for a_id in touched_ids] + ["*"],))
+if touched_ids and has_rolling:
+    cur.execute("DELETE FROM rolling_state WHERE artist_id = ANY(%s);", (touched_ids,))
+conn.commit()
+
+# 대시보드 캐시 무효화를 위해 변경된 아티스트와 전체 카탈로그의 세대 번호를 올림
+cur.executemany(
+    """
+    INSERT INTO data_generations (scope, generation) VALUES (%s, 1)
+    ON CONFLICT (scope) DO UPDATE SET generation = data_generations.generation + 1, updated_at = NOW();
+    """,
+    [(s,) for s in sorted(touched | {"*"})]
+)
 conn.commit()
-print("daily_metrics upserts:", rows_daily)
 
+cur.execute("SELECT pg_advisory_unlock(%s);", (INGEST_LOCK_KEY,))
+conn.commit()
 cur.close()
 conn.close()
 print("done")